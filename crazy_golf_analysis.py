@@ -1,35 +1,38 @@
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from statistics import mean, median, mode, stdev
 import os
+import argparse
+import glob
+import json
+import math
+import sys
+import time
 
-def read_scores_from_file(filename):
+from golf_analytics import trend_analysis
+from golf_engine import compute_analysis
+from golf_db import ScoreDatabase, is_database
+from golf_instrument import stage
+from golf_simulate import positive_int
+from golf_sketch import distribution_lines
+from golf_store import STORE_EXTENSION, RoundStore, open_round_store
+
+# matplotlib, pandas and seaborn (via golf_render) are only imported when a
+# chart is requested, so the stats and trends commands start quickly.
+
+def read_scores_from_file(filename, strict=False):
     """
     Read scores from a text file.
     Expected format:
     PlayerName: score1, score2, score3, ...
+
+    A player listed more than once keeps every round; later rounds are
+    stored under 'PlayerName (round 2)', 'PlayerName (round 3)', ...
+    With strict=True malformed lines raise ScoreParseError.
+    
+    Returns a golf_store.RoundStore, a compact read-only mapping of the
+    same shape as the {player: [scores]} dict.
     """
-    scores = {}
     try:
-        with open(filename, 'r') as file:
-            for line in file:
-                line = line.strip()
-                if line.startswith('#') or not line:  # Skip comments and empty lines
-                    continue
-                if ':' in line:
-                    name, scores_str = line.split(':', 1)
-                    name = name.strip()
-                    # Parse scores - handle both comma and space separation
-                    score_list = []
-                    for score in scores_str.replace(',', ' ').split():
-                        try:
-                            score_list.append(int(score))
-                        except ValueError:
-                            continue
-                    if score_list:
-                        scores[name] = score_list
+        scores = RoundStore.from_file(filename, strict=strict)
         
         if not scores:
             print("No valid scores found in file. Using default data.")
@@ -42,6 +45,26 @@ def read_scores_from_file(filename):
         create_example_file(filename)
         return get_default_scores()
 
+def load_scores(filename, **filters):
+    """
+    Load scores for analysis, preferring the binary round store.
+    A .grs file is used directly (memory-mapped) and so is an up-to-date
+    .grs sitting next to a text file; otherwise the text file is parsed.
+    Create the store with: python golf_store.py import golf_scores.txt
+    A SQLite score database (see golf_db.py) returns the rounds matching
+    filters (player, course, since, until).
+    """
+    if is_database(filename):
+        with ScoreDatabase(filename) as db:
+            return db.scores(**filters)
+    if filename.endswith(STORE_EXTENSION):
+        return open_round_store(filename)
+    store_file = os.path.splitext(filename)[0] + STORE_EXTENSION
+    if (os.path.exists(filename) and os.path.exists(store_file)
+            and os.path.getmtime(store_file) >= os.path.getmtime(filename)):
+        return open_round_store(store_file)
+    return read_scores_from_file(filename)
+
 def get_default_scores():
     """Return the original hardcoded scores as fallback."""
     return {
@@ -71,460 +94,490 @@ Player 4: 2, 2, 2, 2, 2, 2, 3, 3, 3, 2, 2, 5, 5, 3, 5, 3, 2, 2
     except Exception as e:
         print(f"Could not create example file: {e}")
 
-def analyze_scores(scores):
-    print("CRAZY GOLF SCORE ANALYSIS")
-    print("=" * 50)
+def print_analysis(analysis):
+    """Print the console report for a dict produced by compute_analysis."""
+    results = analysis['results']
+    # Collected and written in one go: a print per line dominates the run
+    # time with many players
+    lines = []
+    write = lines.append
+    write("CRAZY GOLF SCORE ANALYSIS")
+    write("=" * 50)
     
     # Basic statistics
-    print("\nPLAYER SUMMARY:")
-    results = {}
-    for player, player_scores in scores.items():
-        total = sum(player_scores)
-        avg = mean(player_scores)
-        best = min(player_scores)
-        worst = max(player_scores)
-        consistency = stdev(player_scores)
-        
-        results[player] = {
-            'total': total,
-            'average': avg,
-            'best_hole': best,
-            'worst_hole': worst,
-            'consistency': consistency
-        }
-        
-        print(f"\n{player}:")
-        print(f"  Total Score: {total}")
-        print(f"  Average: {avg:.2f}")
-        print(f"  Best Hole: {best}")
-        print(f"  Worst Hole: {worst}")
-        print(f"  Consistency (std dev): {consistency:.2f}")
+    write("\nPLAYER SUMMARY:")
+    for player, stats in results.items():
+        write(f"\n{player}:")
+        write(f"  Total Score: {stats['total']}")
+        write(f"  Average: {stats['average']:.2f}")
+        write(f"  Best Hole: {stats['best_hole']}")
+        write(f"  Worst Hole: {stats['worst_hole']}")
+        write(f"  Consistency (std dev): {stats['consistency']:.2f}")
     
     # Rankings
-    print("\nRANKINGS:")
-    sorted_players = sorted(results.items(), key=lambda x: x[1]['total'])
-    for i, (player, stats) in enumerate(sorted_players, 1):
-        print(f"{i}. {player} - {stats['total']} strokes")
+    write("\nRANKINGS:")
+    for i, (player, total) in enumerate(analysis['rankings'], 1):
+        # golf_batch ranks pooled players on their average round total
+        write(f"{i}. {player} - {total:.2f} strokes per round" if isinstance(total, float)
+              else f"{i}. {player} - {total} strokes")
     
     # Hole difficulty analysis
-    print("\nHOLE DIFFICULTY ANALYSIS:")
-    hole_averages = []
-    for hole in range(18):
-        hole_scores = [scores[player][hole] for player in scores.keys()]
-        avg_score = mean(hole_scores)
-        hole_averages.append(avg_score)
-        print(f"Hole {hole + 1}: {avg_score:.2f} average")
-    
-    hardest_hole = hole_averages.index(max(hole_averages)) + 1
-    easiest_hole = hole_averages.index(min(hole_averages)) + 1
-    print(f"\nHardest Hole: #{hardest_hole} (avg: {max(hole_averages):.2f})")
-    print(f"Easiest Hole: #{easiest_hole} (avg: {min(hole_averages):.2f})")
+    write("\nHOLE DIFFICULTY ANALYSIS:")
+    for hole, avg_score in enumerate(analysis['hole_averages'], 1):
+        write(f"Hole {hole}: {avg_score:.2f} average")
     
-    # Performance insights
-    print("\nPERFORMANCE INSIGHTS:")
-    most_consistent = min(results.items(), key=lambda x: x[1]['consistency'])
-    least_consistent = max(results.items(), key=lambda x: x[1]['consistency'])
+    if analysis['hardest_hole'] is not None:
+        hardest_hole, hardest_avg = analysis['hardest_hole']
+        easiest_hole, easiest_avg = analysis['easiest_hole']
+        write(f"\nHardest Hole: #{hardest_hole} (avg: {hardest_avg:.2f})")
+        write(f"Easiest Hole: #{easiest_hole} (avg: {easiest_avg:.2f})")
     
-    print(f"Most Consistent: {most_consistent[0]} (std dev: {most_consistent[1]['consistency']:.2f})")
-    print(f"Least Consistent: {least_consistent[0]} (std dev: {least_consistent[1]['consistency']:.2f})")
+    # Performance insights
+    write("\nPERFORMANCE INSIGHTS:")
+    if analysis['most_consistent'] is not None:
+        most_consistent = analysis['most_consistent']
+        least_consistent = analysis['least_consistent']
+        write(f"Most Consistent: {most_consistent[0]} (std dev: {most_consistent[1]:.2f})")
+        write(f"Least Consistent: {least_consistent[0]} (std dev: {least_consistent[1]:.2f})")
     
     # Hole-in-one analysis
-    print("\nACE ANALYSIS:")
-    for player, player_scores in scores.items():
-        aces = player_scores.count(1)
-        if aces > 0:
-            ace_holes = [i+1 for i, score in enumerate(player_scores) if score == 1]
-            print(f"{player}: {aces} hole-in-one(s) on hole(s) {ace_holes}")
-    
-    return results, hole_averages
+    write("\nACE ANALYSIS:")
+    for player, ace_holes in analysis['aces'].items():
+        write(f"{player}: {len(ace_holes)} hole-in-one(s) on hole(s) {ace_holes}")
+    
+    # Skill and difficulty fitted jointly, so each is corrected for the other
+    model = analysis.get('skill_model')
+    if model is not None:
+        write("\nPLAYER-ADJUSTED HOLE DIFFICULTY (expected score for an average player):")
+        for hole, (expected, raw) in enumerate(zip(model['hole_difficulty'], analysis['hole_averages']), 1):
+            write(f"Hole {hole}: {expected:.2f} (raw average {raw:.2f})")
+        write("\nPLAYER SKILL (strokes per hole against an average player, lower is better):")
+        for i, (player, skill) in enumerate(sorted(model['skill'].items(), key=lambda item: item[1]), 1):
+            write(f"{i}. {player}: {skill:+.2f}")
+    
+    distributions = analysis.get('distributions')
+    if distributions is not None:
+        write("")
+        lines.extend(distribution_lines(distributions))
+    sys.stdout.write('\n'.join(lines) + '\n')
 
-def create_visualizations(results, hole_averages, scores):
-    plt.style.use('seaborn-v0_8')
-    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
-    
-    # Total scores comparison
-    players = list(results.keys())
-    totals = [results[player]['total'] for player in players]
-    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
-    
-    ax1.bar(players, totals, color=colors)
-    ax1.set_title('Total Scores Comparison', fontsize=14, fontweight='bold')
-    ax1.set_ylabel('Total Strokes')
-    ax1.set_xlabel('Players')
-    for i, v in enumerate(totals):
-        ax1.text(i, v + 0.5, str(v), ha='center', fontweight='bold')
-    
-    # Score distribution by player
-    all_scores = []
-    player_labels = []
-    for player, player_scores in scores.items():
-        all_scores.extend(player_scores)
-        player_labels.extend([player] * len(player_scores))
-    
-    df = pd.DataFrame({'Player': player_labels, 'Score': all_scores})
-    sns.boxplot(data=df, x='Player', y='Score', ax=ax2, palette=colors)
-    ax2.set_title('Score Distribution by Player', fontsize=14, fontweight='bold')
-    
-    # Hole difficulty
-    holes = list(range(1, 19))
-    ax3.plot(holes, hole_averages, marker='o', linewidth=2, markersize=6, color='#E74C3C')
-    ax3.set_title('Hole Difficulty (Average Score)', fontsize=14, fontweight='bold')
-    ax3.set_xlabel('Hole Number')
-    ax3.set_ylabel('Average Score')
-    ax3.set_xticks(holes)
-    ax3.grid(True, alpha=0.3)
-    
-    # Player performance over holes
-    for i, (player, player_scores) in enumerate(scores.items()):
-        ax4.plot(holes, player_scores, marker='o', label=player, linewidth=2, color=colors[i])
-    ax4.set_title('Player Performance by Hole', fontsize=14, fontweight='bold')
-    ax4.set_xlabel('Hole Number')
-    ax4.set_ylabel('Strokes')
-    ax4.set_xticks(holes)
-    ax4.legend()
-    ax4.grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig(os.path.join(os.path.expanduser('~'), 'Downloads', 'crazy_golf_analysis.png'), 
-                dpi=300, bbox_inches='tight')
-    plt.show()
+def analyze_scores(scores):
+    """Compute the full analysis with the NumPy engine and print the report."""
+    analysis = compute_analysis(scores)
+    print_analysis(analysis)
+    return analysis['results'], analysis['hole_averages']
 
-def create_additional_visualizations(scores):
-    plt.style.use('seaborn-v0_8')
-    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
-    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
-    
-    # 1. Score frequency heatmap
-    score_matrix = []
-    players = list(scores.keys())
-    for player in players:
-        player_freq = [0] * 7  # scores 1-6 plus position for score >6
-        for score in scores[player]:
-            if score <= 6:
-                player_freq[score-1] += 1
-            else:
-                player_freq[6] += 1
-        score_matrix.append(player_freq)
-    
-    score_labels = ['1', '2', '3', '4', '5', '6', '6+']
-    sns.heatmap(score_matrix, annot=True, fmt='d', cmap='YlOrRd', 
-                xticklabels=score_labels, yticklabels=players, ax=ax1)
-    ax1.set_title('Score Frequency Heatmap', fontsize=14, fontweight='bold')
-    ax1.set_xlabel('Score')
-    ax1.set_ylabel('Player')
-    
-    # 2. Cumulative score progression
-    holes = list(range(1, 19))
-    for i, (player, player_scores) in enumerate(scores.items()):
-        cumulative = np.cumsum(player_scores)
-        ax2.plot(holes, cumulative, marker='o', label=player, linewidth=2, color=colors[i])
-    
-    ax2.set_title('Cumulative Score Progression', fontsize=14, fontweight='bold')
-    ax2.set_xlabel('Hole Number')
-    ax2.set_ylabel('Cumulative Strokes')
-    ax2.set_xticks(holes)
-    ax2.legend()
-    ax2.grid(True, alpha=0.3)
-    
-    # 3. Performance consistency radar chart (variance by hole segments)
-    from math import pi
-    
-    # Calculate performance in 3 segments (holes 1-6, 7-12, 13-18)
-    segments = ['Holes 1-6', 'Holes 7-12', 'Holes 13-18']
-    segment_data = {}
-    
-    for player, player_scores in scores.items():
-        seg1 = mean(player_scores[0:6])
-        seg2 = mean(player_scores[6:12])
-        seg3 = mean(player_scores[12:18])
-        segment_data[player] = [seg1, seg2, seg3]
-    
-    angles = [n / float(len(segments)) * 2 * pi for n in range(len(segments))]
-    angles += angles[:1]  # Complete the circle
-    
-    ax3 = plt.subplot(223, projection='polar')
-    for i, (player, values) in enumerate(segment_data.items()):
-        values += values[:1]  # Complete the circle
-        ax3.plot(angles, values, 'o-', linewidth=2, label=player, color=colors[i])
-        ax3.fill(angles, values, alpha=0.25, color=colors[i])
-    
-    ax3.set_xticks(angles[:-1])
-    ax3.set_xticklabels(segments)
-    ax3.set_title('Performance by Course Segment\n(Lower = Better)', fontsize=12, fontweight='bold', pad=20)
-    ax3.legend(loc='upper right', bbox_to_anchor=(1.3, 1.0))
-    
-    # 4. Bounce-back analysis (performance after bad holes)
-    bounce_back_data = {'Player': [], 'After Bad Hole': [], 'After Good Hole': []}
-    
-    for player, player_scores in scores.items():
-        bad_hole_recoveries = []
-        good_hole_followups = []
+def _render_layout(layout, results, hole_averages, scores, show, mode, output_path, panels_dir, cache):
+    """
+    Save a golf_render layout, on screen with pyplot or headless on Agg.
+    With a golf_cache.ResultCache, an identical earlier render is reused;
+    on screen the figure is drawn once and a cache miss is saved from it.
+    """
+    if output_path is None:
+        from golf_render import default_output_path
         
-        for i in range(len(player_scores) - 1):
-            current_score = player_scores[i]
-            next_score = player_scores[i + 1]
-            
-            if current_score >= 4:  # Bad hole (4+ strokes)
-                bad_hole_recoveries.append(next_score)
-            elif current_score <= 2:  # Good hole (1-2 strokes)
-                good_hole_followups.append(next_score)
+        output_path = default_output_path(layout)
+    
+    def produce(render):
+        if cache is None:
+            render(output_path)
+            return
+        from golf_cache import analysis_key, cached_render
         
-        if bad_hole_recoveries:
-            bounce_back_data['Player'].append(player)
-            bounce_back_data['After Bad Hole'].append(mean(bad_hole_recoveries))
-            bounce_back_data['After Good Hole'].append(mean(good_hole_followups) if good_hole_followups else 0)
-    
-    x = np.arange(len(bounce_back_data['Player']))
-    width = 0.35
-    
-    ax4.bar(x - width/2, bounce_back_data['After Bad Hole'], width, 
-            label='After Bad Hole (4+)', color='#E74C3C', alpha=0.8)
-    ax4.bar(x + width/2, bounce_back_data['After Good Hole'], width, 
-            label='After Good Hole (1-2)', color='#27AE60', alpha=0.8)
-    
-    ax4.set_title('Mental Resilience Analysis', fontsize=14, fontweight='bold')
-    ax4.set_xlabel('Player')
-    ax4.set_ylabel('Average Next Hole Score')
-    ax4.set_xticks(x)
-    ax4.set_xticklabels(bounce_back_data['Player'])
-    ax4.legend()
-    ax4.grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig(os.path.join(os.path.expanduser('~'), 'Downloads', 'crazy_golf_additional_analysis.png'), 
-                dpi=300, bbox_inches='tight')
-    plt.show()
-
-def performance_trends(scores):
-    print("\nPERFORMANCE TRENDS:")
-    
-    # Calculate running averages for each player
-    for player, player_scores in scores.items():
-        running_avg = []
-        for i in range(len(player_scores)):
-            running_avg.append(mean(player_scores[:i+1]))
+        cached_render(cache, analysis_key(scores), layout, mode, output_path, render)
+    
+    def save(path):
+        # Only imported on a cache miss, so a cached chart never loads matplotlib
+        from golf_render import render_report
         
-        first_9 = mean(player_scores[:9])
-        last_9 = mean(player_scores[9:])
-        trend = "improving" if last_9 < first_9 else "declining" if last_9 > first_9 else "stable"
+        render_report(results, hole_averages, scores, path, layout=layout, mode=mode)
+    
+    if not show:
+        produce(save)
+    if panels_dir is not None:
+        from golf_render import render_panels
         
-        print(f"{player}: First 9 avg: {first_9:.2f}, Last 9 avg: {last_9:.2f} - {trend}")
-
-def create_comprehensive_visualization(results, hole_averages, scores):
+        render_panels(results, hole_averages, scores, panels_dir, layout=layout, mode=mode)
+    if not show:
+        return output_path
+    
+    import matplotlib.pyplot as plt
+    from golf_render import LAYOUTS, RENDER_MODES, draw_layout
+    
     plt.style.use('seaborn-v0_8')
-    fig = plt.figure(figsize=(20, 16))
-    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
-    
-    # 1. Total scores comparison
-    ax1 = plt.subplot(3, 3, 1)
-    players = list(results.keys())
-    totals = [results[player]['total'] for player in players]
-    
-    ax1.bar(players, totals, color=colors)
-    ax1.set_title('Total Scores Comparison', fontsize=12, fontweight='bold')
-    ax1.set_ylabel('Total Strokes')
-    for i, v in enumerate(totals):
-        ax1.text(i, v + 0.5, str(v), ha='center', fontweight='bold')
-    
-    # 2. Score distribution by player
-    ax2 = plt.subplot(3, 3, 2)
-    all_scores = []
-    player_labels = []
-    for player, player_scores in scores.items():
-        all_scores.extend(player_scores)
-        player_labels.extend([player] * len(player_scores))
-    
-    df = pd.DataFrame({'Player': player_labels, 'Score': all_scores})
-    sns.boxplot(data=df, x='Player', y='Score', ax=ax2, palette=colors)
-    ax2.set_title('Score Distribution by Player', fontsize=12, fontweight='bold')
-    
-    # 3. Hole difficulty
-    ax3 = plt.subplot(3, 3, 3)
-    holes = list(range(1, 19))
-    ax3.plot(holes, hole_averages, marker='o', linewidth=2, markersize=4, color='#E74C3C')
-    ax3.set_title('Hole Difficulty (Average Score)', fontsize=12, fontweight='bold')
-    ax3.set_xlabel('Hole Number')
-    ax3.set_ylabel('Average Score')
-    ax3.set_xticks(holes[::2])  # Show every other hole number to avoid crowding
-    ax3.grid(True, alpha=0.3)
-    
-    # 4. Player performance over holes
-    ax4 = plt.subplot(3, 3, 4)
-    for i, (player, player_scores) in enumerate(scores.items()):
-        ax4.plot(holes, player_scores, marker='o', label=player, linewidth=2, color=colors[i], markersize=3)
-    ax4.set_title('Player Performance by Hole', fontsize=12, fontweight='bold')
-    ax4.set_xlabel('Hole Number')
-    ax4.set_ylabel('Strokes')
-    ax4.set_xticks(holes[::2])
-    ax4.legend(fontsize=8)
-    ax4.grid(True, alpha=0.3)
-    
-    # 5. Score frequency heatmap
-    ax5 = plt.subplot(3, 3, 5)
-    score_matrix = []
-    for player in players:
-        player_freq = [0] * 7
-        for score in scores[player]:
-            if score <= 6:
-                player_freq[score-1] += 1
-            else:
-                player_freq[6] += 1
-        score_matrix.append(player_freq)
-    
-    score_labels = ['1', '2', '3', '4', '5', '6', '6+']
-    sns.heatmap(score_matrix, annot=True, fmt='d', cmap='YlOrRd', 
-                xticklabels=score_labels, yticklabels=players, ax=ax5)
-    ax5.set_title('Score Frequency Heatmap', fontsize=12, fontweight='bold')
-    
-    # 6. Cumulative score progression
-    ax6 = plt.subplot(3, 3, 6)
-    for i, (player, player_scores) in enumerate(scores.items()):
-        cumulative = np.cumsum(player_scores)
-        ax6.plot(holes, cumulative, marker='o', label=player, linewidth=2, color=colors[i], markersize=3)
-    
-    ax6.set_title('Cumulative Score Progression', fontsize=12, fontweight='bold')
-    ax6.set_xlabel('Hole Number')
-    ax6.set_ylabel('Cumulative Strokes')
-    ax6.set_xticks(holes[::2])
-    ax6.legend(fontsize=8)
-    ax6.grid(True, alpha=0.3)
-    
-    # 7. Performance consistency radar chart
-    ax7 = plt.subplot(3, 3, 7, projection='polar')
-    segments = ['Holes 1-6', 'Holes 7-12', 'Holes 13-18']
-    segment_data = {}
-    
-    for player, player_scores in scores.items():
-        seg1 = mean(player_scores[0:6])
-        seg2 = mean(player_scores[6:12])
-        seg3 = mean(player_scores[12:18])
-        segment_data[player] = [seg1, seg2, seg3]
-    
-    angles = [n / float(len(segments)) * 2 * np.pi for n in range(len(segments))]
-    angles += angles[:1]
-    
-    for i, (player, values) in enumerate(segment_data.items()):
-        values += values[:1]
-        ax7.plot(angles, values, 'o-', linewidth=2, label=player, color=colors[i])
-        ax7.fill(angles, values, alpha=0.25, color=colors[i])
-    
-    ax7.set_xticks(angles[:-1])
-    ax7.set_xticklabels(segments, fontsize=8)
-    ax7.set_title('Performance by Course Segment', fontsize=12, fontweight='bold', pad=20)
-    ax7.legend(loc='upper right', bbox_to_anchor=(1.2, 1.0), fontsize=8)
-    
-    # 8. Mental resilience analysis
-    ax8 = plt.subplot(3, 3, 8)
-    bounce_back_data = {'Player': [], 'After Bad Hole': [], 'After Good Hole': []}
-    
-    for player, player_scores in scores.items():
-        bad_hole_recoveries = []
-        good_hole_followups = []
-        
-        for i in range(len(player_scores) - 1):
-            current_score = player_scores[i]
-            next_score = player_scores[i + 1]
-            
-            if current_score >= 4:
-                bad_hole_recoveries.append(next_score)
-            elif current_score <= 2:
-                good_hole_followups.append(next_score)
-        
-        if bad_hole_recoveries:
-            bounce_back_data['Player'].append(player)
-            bounce_back_data['After Bad Hole'].append(mean(bad_hole_recoveries))
-            bounce_back_data['After Good Hole'].append(mean(good_hole_followups) if good_hole_followups else 0)
-    
-    x = np.arange(len(bounce_back_data['Player']))
-    width = 0.35
-    
-    ax8.bar(x - width/2, bounce_back_data['After Bad Hole'], width, 
-            label='After Bad Hole (4+)', color='#E74C3C', alpha=0.8)
-    ax8.bar(x + width/2, bounce_back_data['After Good Hole'], width, 
-            label='After Good Hole (1-2)', color='#27AE60', alpha=0.8)
-    
-    ax8.set_title('Mental Resilience Analysis', fontsize=12, fontweight='bold')
-    ax8.set_xlabel('Player')
-    ax8.set_ylabel('Avg Next Score')
-    ax8.set_xticks(x)
-    ax8.set_xticklabels(bounce_back_data['Player'])
-    ax8.legend(fontsize=8)
-    ax8.grid(True, alpha=0.3)
-    
-    # 9. Streak analysis - longest consecutive good/bad holes
-    ax9 = plt.subplot(3, 3, 9)
-    
-    streak_data = {'Player': [], 'Good Streaks': [], 'Bad Streaks': []}
-    
-    for player, player_scores in scores.items():
-        # Find longest streaks of good holes (score <= 2) and bad holes (score >= 4)
-        current_good_streak = 0
-        current_bad_streak = 0
-        max_good_streak = 0
-        max_bad_streak = 0
-        
-        for score in player_scores:
-            if score <= 2:  # Good hole
-                current_good_streak += 1
-                current_bad_streak = 0
-                max_good_streak = max(max_good_streak, current_good_streak)
-            elif score >= 4:  # Bad hole
-                current_bad_streak += 1
-                current_good_streak = 0
-                max_bad_streak = max(max_bad_streak, current_bad_streak)
-            else:  # Neutral hole (score = 3)
-                current_good_streak = 0
-                current_bad_streak = 0
-        
-        streak_data['Player'].append(player)
-        streak_data['Good Streaks'].append(max_good_streak)
-        streak_data['Bad Streaks'].append(max_bad_streak)
-    
-    x = np.arange(len(streak_data['Player']))
-    width = 0.35
-    
-    ax9.bar(x - width/2, streak_data['Good Streaks'], width, 
-            label='Longest Good Streak (≤2)', color='#27AE60', alpha=0.8)
-    ax9.bar(x + width/2, streak_data['Bad Streaks'], width, 
-            label='Longest Bad Streak (≥4)', color='#E74C3C', alpha=0.8)
-    
-    ax9.set_title('Consistency Streaks Analysis', fontsize=12, fontweight='bold')
-    ax9.set_xlabel('Player')
-    ax9.set_ylabel('Consecutive Holes')
-    ax9.set_xticks(x)
-    ax9.set_xticklabels(streak_data['Player'])
-    ax9.legend(fontsize=8)
-    ax9.grid(True, alpha=0.3)
-    
-    # Add value labels on bars
-    for i, (good, bad) in enumerate(zip(streak_data['Good Streaks'], streak_data['Bad Streaks'])):
-        if good > 0:
-            ax9.text(i - width/2, good + 0.1, str(good), ha='center', fontsize=8)
-        if bad > 0:
-            ax9.text(i + width/2, bad + 0.1, str(bad), ha='center', fontsize=8)
-
-    plt.tight_layout(pad=2.0)
-    plt.savefig(os.path.join(os.path.expanduser('~'), 'Downloads', 'crazy_golf_all_analysis.png'), 
-                dpi=300, bbox_inches='tight')
+    fig = plt.figure(figsize=LAYOUTS[layout]['figsize'])
+    draw_layout(fig, layout, results, hole_averages, scores)
+    
+    def save_figure(path):
+        with stage('savefig'):
+            fig.savefig(path, **RENDER_MODES[mode])
+    
+    produce(save_figure)
     plt.show()
+    return output_path
 
-# Remove the old visualization functions and replace the main execution
-if __name__ == "__main__":
+def create_visualizations(results, hole_averages, scores, show=True, mode='full',
+                          output_path=None, panels_dir=None, cache=None):
+    return _render_layout('summary', results, hole_averages, scores, show, mode, output_path,
+                          panels_dir, cache)
+
+def create_additional_visualizations(scores, show=True, mode='full', output_path=None, panels_dir=None,
+                                     cache=None):
+    analysis = compute_analysis(scores)
+    return _render_layout('additional', analysis['results'], analysis['hole_averages'], scores,
+                          show, mode, output_path, panels_dir, cache)
+
+def print_trends(trends):
+    """Print the report for a golf_analytics.trend_analysis dict."""
+    lines = []
+    write = lines.append
+    write("\nPERFORMANCE TRENDS:")
+    
+    # Front/back comparison for each round (front and back nine on 18 holes)
+    holes = trends['round_holes']
+    splits = np.broadcast_to(trends['split'], holes.shape)
+    comparison = trends['holes']['comparison']
+    for player, split, back, first, last, trend in zip(trends['rounds'], splits.tolist(), (holes - splits).tolist(),
+                                                       comparison['first'], comparison['last'],
+                                                       comparison['trend']):
+        write(f"{player}: First {split} avg: {first:.2f}, Last {back} avg: {last:.2f} - {trend}")
+    
+    played = trends['rounds_played']
+    if played.size and played.max() > 1:
+        history = trends['history']
+        latest = (np.arange(played.size), played - 1)
+        columns = zip(trends['players'], played.tolist(), history['running_mean'][latest].tolist(),
+                      history['rolling_mean'][latest].tolist(), history['ewma'][latest].tolist(),
+                      history['comparison']['trend'])
+        write("\nROUND-BY-ROUND TRENDS (round totals):")
+        for player, rounds, running, rolling, weighted, trend in columns:
+            if rounds < 2:
+                continue
+            write(f"{player}: {rounds} rounds, running avg: {running:.1f}, "
+                  f"rolling avg: {rolling:.1f}, EWMA: {weighted:.1f} - {trend}")
+    sys.stdout.write('\n'.join(lines) + '\n')
+
+def performance_trends(scores, window=3, alpha=0.3, split=None):
+    """
+    Print and return golf_analytics.trend_analysis(scores): running, rolling
+    (window) and exponentially weighted (alpha) means per round and per
+    player history, and the before/after split comparison.
+    """
+    trends = trend_analysis(scores, window=window, alpha=alpha, split=split)
+    print_trends(trends)
+    return trends
+
+def create_comprehensive_visualization(results, hole_averages, scores, show=True, mode='full',
+                                       output_path=None, panels_dir=None, cache=None):
+    """
+    Nine-panel report. show=False renders headlessly on Agg without opening
+    a window; mode='preview' is a fast low-DPI render; panels_dir also
+    saves every panel as its own image; cache (a golf_cache.ResultCache)
+    reuses the saved image when the scores and options are unchanged.
+    """
+    return _render_layout('comprehensive', results, hole_averages, scores, show, mode, output_path,
+                          panels_dir, cache)
+
+def analysis_to_json(analysis):
+    """Serialise a compute_analysis or trend_analysis dict as JSON (NaN becomes null)."""
+    def clean(value):
+        if isinstance(value, np.ndarray):
+            value = value.tolist()
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        if isinstance(value, dict):
+            return {key: clean(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [clean(item) for item in value]
+        return value
+    
+    return json.dumps(clean(analysis), indent=2)
+
+def watch_score_file(scores_file, interval=1.0, as_json=False):
+    """Re-print the analysis every time new rounds are appended to scores_file."""
+    from golf_incremental import watch_scores
+    
+    def refresh(stats):
+        if as_json:
+            print(analysis_to_json(stats.report()), flush=True)
+            return
+        print(f"\n[{time.strftime('%H:%M:%S')}] {stats.n_rounds} rounds loaded")
+        print_analysis(stats.report())
+    
+    print(f"Watching {scores_file} for new scores (Ctrl+C to stop)...", file=sys.stderr)
+    try:
+        watch_scores(scores_file, refresh, interval=interval)
+    except KeyboardInterrupt:
+        print("\nStopped watching.", file=sys.stderr)
+
+COMMANDS = ('stats', 'trends', 'leaderboard', 'simulate', 'plot', 'all')
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Crazy golf score analyser",
+        epilog="Without a command, runs 'all': stats, trends and the full chart report.")
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    
+    def add_command(name, help_text):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('scores_file', nargs='?',
+                             help="score file (.txt, .grs or a .db score database), "
+                                  "or a directory/glob of score files")
+        command.add_argument('--course', help="score databases only: rounds on this course")
+        command.add_argument('--since', metavar='DATE', help="score databases only: rounds from YYYY-MM-DD")
+        command.add_argument('--until', metavar='DATE', help="score databases only: rounds up to YYYY-MM-DD")
+        command.add_argument('--profile', action='store_true',
+                             help="record time and memory of each stage in a JSON run report")
+        command.add_argument('--profile-stage', metavar='STAGE',
+                             help="also capture cProfile and allocation details for STAGE")
+        command.add_argument('--profile-report', metavar='PATH',
+                             help="run report location (default: next to the output image)")
+        return command
+    
+    def add_plot_options(command):
+        command.add_argument('--headless', action='store_true',
+                             help="render the report without opening a window")
+        command.add_argument('--preview', action='store_true',
+                             help="fast low-resolution render instead of 300 dpi")
+        command.add_argument('--panels', metavar='DIR',
+                             help="also save every chart panel as its own image in DIR")
+        command.add_argument('--out', metavar='PATH',
+                             help="output image (or directory when plotting many files)")
+    
+    def add_stats_options(command):
+        command.add_argument('--json', action='store_true', help="print the analysis as JSON")
+        command.add_argument('--watch', action='store_true',
+                             help="keep running and refresh the report as lines are appended")
+        command.add_argument('--interval', type=float, default=1.0,
+                             help="seconds between checks in --watch mode")
+    
+    def add_report_options(command):
+        command.add_argument('--report', metavar='PATH',
+                             help="also write the results as a JSON file or a CSV/Parquet directory")
+        command.add_argument('--report-format', choices=('json', 'csv', 'parquet'),
+                             help="report format (default: json for *.json, otherwise csv)")
+        command.add_argument('--quiet', action='store_true',
+                             help="no console report; with stats --report, streams the file "
+                                  "instead of loading it")
+    
+    stats = add_command('stats', "player summaries, rankings, hole difficulty and aces")
+    add_stats_options(stats)
+    trends = add_command('trends', "running, rolling and weighted trends per round and per player")
+    trends.add_argument('--window', type=int, default=3,
+                        help="holes (and rounds) in each rolling average")
+    trends.add_argument('--alpha', type=float, default=0.3,
+                        help="weight of the newest value in the exponentially weighted average")
+    trends.add_argument('--split', type=int, default=None,
+                        help="compare holes before and after this one (default: half the course)")
+    trends.add_argument('--json', action='store_true', help="print the trends as JSON")
+    add_report_options(trends)
+    leaderboard = add_command('leaderboard', "ranking with countback tie-breaks (back 9, last 6, last 3)")
+    leaderboard.add_argument('--top', type=int, default=10, help="entries to show")
+    leaderboard.add_argument('--player', action='append', default=[], help="also show this player's rank")
+    leaderboard.add_argument('--season', action='store_true',
+                             help="add up each player's rounds instead of ranking rounds separately")
+    simulate = add_command('simulate', "Monte Carlo win chances and expected ranks from each player's scores")
+    simulate.add_argument('--simulations', type=positive_int, default=100000, help="tournaments to simulate")
+    simulate.add_argument('--per-hole', action='store_true',
+                          help="use each player's per-hole distributions instead of one per player")
+    simulate.add_argument('--seed', type=int, default=0)
+    simulate.add_argument('--workers', type=positive_int, default=None,
+                          help="worker processes (default: CPU count)")
+    simulate.add_argument('--top', type=int, default=10, help="players to show")
+    add_plot_options(add_command('plot', "render the chart report"))
+    everything = add_command('all', "stats, trends and charts (the default)")
+    add_stats_options(everything)
+    add_plot_options(everything)
+    add_report_options(stats)
+    add_report_options(everything)
+    
+    for command in (stats, commands.choices['plot'], everything):
+        command.add_argument('--workers', type=int, default=None,
+                             help="worker processes when analysing a directory or glob")
+        command.add_argument('--no-cache', action='store_true',
+                             help="always recompute instead of reusing cached results")
+        command.add_argument('--cache-dir', metavar='DIR',
+                             help="cache directory (default ~/.cache/crazy_golf)")
+        command.add_argument('--cache-size-mb', type=float, default=512,
+                             help="evict least recently used cache entries beyond this size")
+    return parser
+
+def open_cache(args):
+    """The ResultCache selected by the command-line options, or None."""
+    if getattr(args, 'no_cache', True):
+        return None
+    from golf_cache import ResultCache
+    
+    return ResultCache(args.cache_dir, max_bytes=int(args.cache_size_mb * 1024 * 1024))
+
+def database_filters(args):
+    """The --course/--since/--until filters for a score database."""
+    return {'course': args.course, 'since': args.since, 'until': args.until}
+
+def write_report_file(args, analysis=None, trends=None):
+    """Write the --report file for a command's analysis and/or trends."""
+    from golf_report import write_report
+    
+    with stage('write_report'):
+        write_report(args.report, analysis, trends, args.report_format)
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv.insert(0, 'all')
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
     # Read scores from file - use current directory or user's home directory
-    scores_file = "golf_scores.txt"
-    if not os.path.exists(scores_file):
+    scores_file = args.scores_file or "golf_scores.txt"
+    if args.scores_file is None and not os.path.exists(scores_file):
         scores_file = os.path.join(os.path.expanduser('~'), 'Documents', 'golf_scores.txt')
     
-    scores = read_scores_from_file(scores_file)
+    if getattr(args, 'watch', False):
+        watch_score_file(scores_file, interval=args.interval, as_json=args.json)
+        return
     
-    print(f"Loaded scores for {len(scores)} players:")
-    for player, player_scores in scores.items():
-        print(f"  {player}: {len(player_scores)} holes")
-    print()
+    if not (args.profile or args.profile_stage):
+        run_command(args, parser, scores_file)
+        return
     
-    results, hole_averages = analyze_scores(scores)
-    performance_trends(scores)
-    create_comprehensive_visualization(results, hole_averages, scores)
+    from golf_instrument import Instrument, report_path
     
-    print(f"\nComplete analysis with all graphs saved to crazy_golf_all_analysis.png in Downloads folder")
-    print(f"To analyze different scores, edit the file: {scores_file}")
+    with Instrument(profile_stage=args.profile_stage) as instrument:
+        output_path = run_command(args, parser, scores_file)
+    report_file = args.profile_report or report_path(output_path or 'crazy_golf_run')
+    instrument.write_report(report_file)
+    print(f"Run report written to {report_file}", file=sys.stderr)
+
+def run_command(args, parser, scores_file):
+    """Run a parsed command; returns the path of the saved image, if any."""
+    many_files = os.path.isdir(scores_file) or glob.has_magic(scores_file)
+    
+    if many_files:
+        if args.command in ('trends', 'leaderboard', 'simulate'):
+            parser.error(f"{args.command} needs a single score file")
+        if args.command in ('stats', 'all'):
+            from golf_batch import analyze_score_files
+            
+            with stage('batch_analysis'):
+                analysis, files = analyze_score_files([scores_file], workers=args.workers)
+            if args.report:
+                write_report_file(args, analysis)
+            if args.json and not args.quiet:
+                print(analysis_to_json(analysis))
+            elif not args.quiet:
+                print(f"Merged {len(files)} score files\n")
+                print_analysis(analysis)
+        if args.command in ('plot', 'all'):
+            from golf_batch import find_score_files
+            from golf_render import render_groups
+            
+            output_dir = args.out or 'reports'
+            with stage('batch_render'):
+                rendered = render_groups(find_score_files([scores_file]), output_dir,
+                                         mode='preview' if args.preview else 'full',
+                                         panels=args.panels is not None, workers=args.workers,
+                                         cache=open_cache(args))
+            print(f"Rendered {len(rendered)} reports into {output_dir}")
+        return None
+    
+    database = is_database(scores_file)
+    if database and not os.path.exists(scores_file):
+        parser.error(f"score database {scores_file} not found")
+    if args.command == 'stats' and args.quiet and args.report and not database:
+        from golf_report import stream_score_file
+        
+        with stage('stream_report'):
+            stream_score_file(scores_file, args.report, args.report_format)
+        return None
+    
+    if database and args.command == 'stats':
+        # Aggregated in SQL; the rounds themselves never leave the database
+        scores = None
+    else:
+        with stage('load_scores'):
+            scores = load_scores(scores_file, **database_filters(args)) if database else load_scores(scores_file)
+        if database and not scores:
+            parser.error(f"no rounds in {scores_file} match the filters")
+    quiet = getattr(args, 'quiet', False)
+    
+    if args.command == 'all' and not (args.json or quiet):
+        print(f"Loaded scores for {len(scores)} players:")
+        for player, player_scores in scores.items():
+            print(f"  {player}: {len(player_scores)} holes")
+        print()
+    
+    if args.command == 'leaderboard':
+        from golf_leaderboard import Leaderboard, print_leaderboard
+        
+        print_leaderboard(Leaderboard.from_scores(scores, season=args.season), args.top, args.player)
+        return None
+    
+    if args.command == 'simulate':
+        from golf_simulate import print_simulation, simulate_tournament
+        
+        with stage('simulate_tournament'):
+            simulation = simulate_tournament(scores, args.simulations, args.per_hole, args.seed, args.workers)
+        print_simulation(simulation, args.top)
+        return None
+    
+    if args.command == 'trends':
+        shortest = min(map(len, scores.values()), default=0)
+        if args.split is not None and not 1 <= args.split < shortest:
+            parser.error(f"--split {args.split} leaves no holes on one side: "
+                         f"the shortest round has {shortest} holes")
+        with stage('performance_trends'):
+            trends = trend_analysis(scores, args.window, args.alpha, args.split)
+        if args.report:
+            write_report_file(args, trends=trends)
+        if args.json:
+            print(analysis_to_json(trends))
+        elif not quiet:
+            print_trends(trends)
+        return None
+    
+    cache = None if database else open_cache(args)
+    with stage('analysis'):
+        if database:
+            with ScoreDatabase(scores_file) as db:
+                analysis = db.analysis(**database_filters(args))
+            if analysis is None:
+                parser.error(f"no rounds in {scores_file} match the filters")
+        elif cache is None:
+            analysis = compute_analysis(scores)
+        else:
+            from golf_cache import cached_analysis
+            
+            analysis, _ = cached_analysis(scores, cache)
+    if args.command in ('stats', 'all') and not quiet:
+        with stage('report'):
+            if args.json:
+                print(analysis_to_json(analysis))
+            else:
+                print_analysis(analysis)
+    if args.command == 'stats':
+        if args.report:
+            write_report_file(args, analysis)
+        return None
+    
+    if args.command == 'all':
+        with stage('performance_trends'):
+            trends = trend_analysis(scores)
+        if not (args.json or quiet):
+            print_trends(trends)
+        if args.report:
+            write_report_file(args, analysis, trends)
+    with stage('visualization'):
+        output_path = create_comprehensive_visualization(analysis['results'], analysis['hole_averages'], scores,
+                                                         show=not args.headless,
+                                                         mode='preview' if args.preview else 'full',
+                                                         output_path=args.out, panels_dir=args.panels,
+                                                         cache=cache)
+    
+    if not quiet:
+        print(f"\nComplete analysis with all graphs saved to {output_path}")
+        print(f"To analyze different scores, edit the file: {scores_file}")
+    return output_path
+
+if __name__ == "__main__":
+    main()
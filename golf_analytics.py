@@ -0,0 +1,280 @@
+"""
+Vectorised per-player analytics shared by the charts and usable on their own.
+
+Every kernel takes the rounds x holes float matrix from
+golf_engine.score_matrix (NaN marks holes a round did not have), works for
+any number of holes, and returns one value per row:
+
+- score_frequencies: bincount histogram of scores 1..max_score plus "more"
+- bounce_back: mean next-hole score after bad and after good holes, from
+  shifted-array masks
+- longest_streaks: longest runs of good and bad holes, by run-length encoding
+- segment_means: mean score per course segment, from a reshape where the
+  holes split evenly
+- running_means, rolling_means, ewma: cumulative, windowed and
+  exponentially weighted averages along each row in linear time
+- compare_windows: the "improving/declining" verdict from the means
+  before and after a split point
+
+trend_analysis applies the trend kernels both along each round's holes
+and along each player's history of round totals.
+"""
+import numpy as np
+
+from golf_engine import score_matrix
+from golf_parser import round_player
+
+GOOD_HOLE = 2  # 1-2 strokes
+BAD_HOLE = 4   # 4+ strokes
+
+
+def score_frequencies(matrix, max_score=6):
+    """
+    Count scores 1..max_score per row, with everything above max_score in
+    a final column. Returns an int array of shape (rows, max_score + 1).
+    """
+    rows, cols = np.nonzero(~np.isnan(matrix))
+    bins = np.clip(matrix[rows, cols], 1, max_score + 1).astype(np.int64) - 1
+    width = max_score + 1
+    counts = np.bincount(rows * width + bins, minlength=matrix.shape[0] * width)
+    return counts.reshape(matrix.shape[0], width)
+
+
+def frequency_labels(max_score=6):
+    return [str(score) for score in range(1, max_score + 1)] + [f"{max_score}+"]
+
+
+def bounce_back(matrix, bad=BAD_HOLE, good=GOOD_HOLE):
+    """
+    Mean score on the hole after a bad (>= bad) or good (<= good) hole.
+
+    Returns a dict of per-row arrays: 'after_bad' and 'after_good' (NaN
+    where there was no such hole) and 'bad_count'/'good_count'.
+    """
+    current = matrix[:, :-1]
+    following = matrix[:, 1:]
+    both = ~np.isnan(current) & ~np.isnan(following)
+    after_bad = both & (current >= bad)
+    after_good = both & (current <= good)
+    following = np.where(both, following, 0.0)
+
+    bad_count = after_bad.sum(axis=1)
+    good_count = after_good.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'after_bad': (following * after_bad).sum(axis=1) / bad_count,
+            'after_good': (following * after_good).sum(axis=1) / good_count,
+            'bad_count': bad_count,
+            'good_count': good_count,
+        }
+
+
+def longest_runs(mask):
+    """Length of the longest run of True in each row of a boolean matrix."""
+    rows = mask.shape[0]
+    padded = np.zeros((rows, mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    start_rows, start_cols = np.nonzero(edges == 1)
+    _, end_cols = np.nonzero(edges == -1)
+
+    longest = np.zeros(rows, dtype=np.int64)
+    # Starts and ends come out row by row in the same order, so they pair up
+    np.maximum.at(longest, start_rows, end_cols - start_cols)
+    return longest
+
+
+def longest_streaks(matrix, good=GOOD_HOLE, bad=BAD_HOLE):
+    """Longest consecutive good (<= good) and bad (>= bad) holes per row."""
+    with np.errstate(invalid='ignore'):
+        return {
+            'good': longest_runs(matrix <= good),
+            'bad': longest_runs(matrix >= bad),
+        }
+
+
+def segment_bounds(n_holes, n_segments=3):
+    """Start/end (exclusive) hole indices splitting n_holes into segments."""
+    edges = np.linspace(0, n_holes, n_segments + 1).round().astype(np.int64)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+def segment_labels(n_holes, n_segments=3):
+    return [f"Holes {start + 1}-{end}" for start, end in segment_bounds(n_holes, n_segments)]
+
+
+def segment_means(matrix, n_segments=3):
+    """
+    Mean score per course segment (holes 1-6, 7-12, 13-18 for 18 holes).
+    Returns shape (rows, n_segments); NaN where a round has no holes in a
+    segment.
+    """
+    rows, n_holes = matrix.shape
+    if n_holes < n_segments:
+        return np.full((rows, n_segments), np.nan)
+    with np.errstate(invalid='ignore'):
+        if n_holes and n_holes % n_segments == 0 and not np.isnan(matrix).any():
+            return matrix.reshape(rows, n_segments, n_holes // n_segments).mean(axis=2)
+
+        valid = ~np.isnan(matrix)
+        starts = [start for start, end in segment_bounds(n_holes, n_segments)]
+        sums = np.add.reduceat(np.where(valid, matrix, 0.0), starts, axis=1)
+        counts = np.add.reduceat(valid.astype(np.int64), starts, axis=1)
+        return sums / counts
+
+
+def player_analytics(scores, max_score=6, n_segments=3):
+    """
+    Run every kernel over a {player: [scores]} mapping at once.
+    Returns a dict with 'players', 'n_holes' and each kernel's output.
+    """
+    players, matrix = score_matrix(scores)
+    return {
+        'players': players,
+        'n_holes': matrix.shape[1],
+        'frequencies': score_frequencies(matrix, max_score),
+        'bounce_back': bounce_back(matrix),
+        'streaks': longest_streaks(matrix),
+        'segments': segment_means(matrix, n_segments),
+        'segment_labels': segment_labels(matrix.shape[1], n_segments),
+    }
+
+
+def running_means(matrix):
+    """Mean of each row so far at every column, skipping NaN."""
+    valid = ~np.isnan(matrix)
+    sums = np.cumsum(np.where(valid, matrix, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(valid, sums / counts, np.nan)
+
+
+def rolling_means(matrix, window):
+    """
+    Mean of the last window values at every column, from cumulative-sum
+    differences. NaN until a full window of values is available.
+    """
+    rows, cols = matrix.shape
+    result = np.full((rows, cols), np.nan)
+    if window < 1 or window > cols:
+        return result
+    valid = ~np.isnan(matrix)
+    sums = np.zeros((rows, cols + 1))
+    counts = np.zeros((rows, cols + 1), dtype=np.int64)
+    np.cumsum(np.where(valid, matrix, 0.0), axis=1, out=sums[:, 1:])
+    np.cumsum(valid, axis=1, out=counts[:, 1:])
+    window_sums = sums[:, window:] - sums[:, :-window]
+    full = (counts[:, window:] - counts[:, :-window]) == window
+    result[:, window - 1:] = np.where(full, window_sums / window, np.nan)
+    return result
+
+
+def ewma(matrix, alpha):
+    """
+    Exponentially weighted moving average along each row, weight alpha on
+    the newest value. All rows advance together one column at a time;
+    NaN values leave the average unchanged.
+    """
+    result = np.full(matrix.shape, np.nan)
+    if matrix.shape[1] == 0:
+        return result
+    average = matrix[:, 0].copy()
+    result[:, 0] = average
+    for col in range(1, matrix.shape[1]):
+        value = matrix[:, col]
+        present = ~np.isnan(value)
+        started = ~np.isnan(average)
+        average = np.where(present & started, average + alpha * (value - average),
+                           np.where(present, value, average))
+        result[:, col] = np.where(present, average, np.nan)
+    return result
+
+
+def compare_windows(matrix, split):
+    """
+    Mean of each row before and from column split (an int or one split per
+    row) and the verdict: 'improving' when the later mean is lower,
+    'declining' when higher, otherwise 'stable'.
+    """
+    columns = np.arange(matrix.shape[1])
+    before = columns[None, :] < np.reshape(split, (-1, 1))
+    valid = ~np.isnan(matrix)
+    values = np.where(valid, matrix, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        first = (values * before).sum(axis=1) / (valid & before).sum(axis=1)
+        last = (values * ~before).sum(axis=1) / (valid & ~before).sum(axis=1)
+    trend = np.select([last < first, last > first], ['improving', 'declining'], 'stable')
+    return {'first': first, 'last': last, 'trend': trend.tolist()}
+
+
+def _trend_kernels(matrix, split, window, alpha):
+    return {
+        'running_mean': running_means(matrix),
+        'rolling_mean': rolling_means(matrix, window),
+        'ewma': ewma(matrix, alpha),
+        'comparison': compare_windows(matrix, split),
+    }
+
+
+def round_history(scores):
+    """
+    Each player's round totals in order: returns (players, totals) where
+    totals is a players x rounds float matrix padded with NaN.
+    """
+    return _round_history(*score_matrix(scores))
+
+
+def _round_history(rounds, matrix):
+    owners = [round_player(label) for label in rounds]
+    players = list(dict.fromkeys(owners))
+    index = {player: i for i, player in enumerate(players)}
+    owner_ids = np.fromiter((index[owner] for owner in owners), dtype=np.int64, count=len(owners))
+
+    order = np.argsort(owner_ids, kind='stable')
+    counts = np.bincount(owner_ids, minlength=len(players))
+    starts = np.cumsum(counts) - counts
+    position = np.empty_like(owner_ids)
+    position[order] = np.arange(owner_ids.size) - np.repeat(starts, counts)
+
+    totals = np.full((len(players), int(counts.max()) if counts.size else 0), np.nan)
+    totals[owner_ids, position] = np.nansum(matrix, axis=1)
+    return players, totals
+
+
+def trend_analysis(scores, window=3, alpha=0.3, split=None, round_window=None):
+    """
+    Trend kernels over every round at once.
+
+    'holes' follows each round hole by hole: running, rolling (window
+    holes) and exponentially weighted means, and the comparison of holes
+    before and after split (default: half of each round, front/back nine
+    on 18 holes; 'split' is one per round when course lengths differ).
+    'rounds' does the same along each player's round totals, with
+    round_window rounds (default window) and the first half of each
+    player's rounds compared to the second.
+    """
+    rounds, matrix = score_matrix(scores)
+    n_holes = matrix.shape[1]
+    round_holes = (~np.isnan(matrix)).sum(axis=1)
+    if split is None:
+        split = round_holes // 2
+        if split.size and (split == split[0]).all():
+            split = int(split[0])
+        elif not split.size:
+            split = n_holes // 2
+
+    players, totals = _round_history(rounds, matrix)
+    played = (~np.isnan(totals)).sum(axis=1)
+    return {
+        'rounds': rounds,
+        'n_holes': n_holes,
+        'round_holes': round_holes,
+        'window': window,
+        'alpha': alpha,
+        'split': split,
+        'holes': _trend_kernels(matrix, split, window, alpha),
+        'players': players,
+        'rounds_played': played,
+        'history': _trend_kernels(totals, played // 2,
+                                  window if round_window is None else round_window, alpha),
+    }
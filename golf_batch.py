@@ -0,0 +1,302 @@
+"""
+Batch analysis over many score files (one per course/session).
+
+Every file is reduced by a worker process to a compact PartialAggregate of
+integer counts, sums, sums of squares and score-frequency histograms, per
+player and per hole. Partials are merged in file order, and because every
+accumulator is an exact integer the merged result is identical whatever
+the number of workers.
+
+Unlike a single-file analysis, which keeps every round under its own label
+('Name', 'Name (round 2)', ...), rounds are pooled by player name across
+files: a player's total is every stroke they played, and players are
+ranked on their average round total, since they may have played different
+numbers of rounds.
+
+    python golf_batch.py scores/ --workers 8
+    python golf_batch.py "scores/2024-*.txt"
+"""
+import argparse
+import glob
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from golf_engine import countback_sums, empty_analysis, ranking_order
+from golf_model import ObservationCells, fit_cells, model_summary
+from golf_parser import iter_score_batches
+from golf_sketch import SketchSet
+
+
+def _pad(array, shape):
+    """Zero-pad an integer array up to shape (never shrinks)."""
+    if array.shape == tuple(shape):
+        return array
+    padded = np.zeros(shape, dtype=array.dtype)
+    padded[tuple(slice(0, n) for n in array.shape)] = array
+    return padded
+
+
+class PartialAggregate:
+    """
+    Mergeable statistics for a set of rounds.
+
+    Player arrays are indexed like ``players``; hole arrays by hole - 1;
+    histogram columns by score value; the cell arrays (the sufficient
+    statistics of golf_model) by player and hole. ``aces`` maps (player
+    index, hole index) to the number of holes-in-one there.
+    """
+
+    def __init__(self):
+        self.players = []
+        self._player_index = {}
+        self.player_rounds = np.zeros(0, dtype=np.int64)
+        self.player_count = np.zeros(0, dtype=np.int64)
+        self.player_sum = np.zeros(0, dtype=np.int64)
+        self.player_sumsq = np.zeros(0, dtype=np.int64)
+        self.player_hist = np.zeros((0, 0), dtype=np.int64)
+        self.hole_count = np.zeros(0, dtype=np.int64)
+        self.hole_sum = np.zeros(0, dtype=np.int64)
+        self.hole_sumsq = np.zeros(0, dtype=np.int64)
+        self.hole_hist = np.zeros((0, 0), dtype=np.int64)
+        self.cell_count = np.zeros((0, 0), dtype=np.int64)
+        self.cell_sum = np.zeros((0, 0), dtype=np.int64)
+        self.cell_sumsq = np.zeros((0, 0), dtype=np.int64)
+        self.aces = {}
+
+    def _player_ids(self, names):
+        index = self._player_index
+        ids = np.fromiter((index.setdefault(name, len(index)) for name in names),
+                          dtype=np.int64, count=len(names))
+        self.players = list(index)
+        return ids
+
+    def _resize(self, n_players, n_holes, n_values):
+        n_players = max(n_players, self.player_count.size)
+        n_holes = max(n_holes, self.hole_count.size)
+        n_values = max(n_values, self.player_hist.shape[1], self.hole_hist.shape[1])
+        self.player_rounds = _pad(self.player_rounds, (n_players,))
+        self.player_count = _pad(self.player_count, (n_players,))
+        self.player_sum = _pad(self.player_sum, (n_players,))
+        self.player_sumsq = _pad(self.player_sumsq, (n_players,))
+        self.player_hist = _pad(self.player_hist, (n_players, n_values))
+        self.hole_count = _pad(self.hole_count, (n_holes,))
+        self.hole_sum = _pad(self.hole_sum, (n_holes,))
+        self.hole_sumsq = _pad(self.hole_sumsq, (n_holes,))
+        self.hole_hist = _pad(self.hole_hist, (n_holes, n_values))
+        self.cell_count = _pad(self.cell_count, (n_players, n_holes))
+        self.cell_sum = _pad(self.cell_sum, (n_players, n_holes))
+        self.cell_sumsq = _pad(self.cell_sumsq, (n_players, n_holes))
+
+    def add_batch(self, batch):
+        """Fold a golf_parser.ScoreBatch in with bincount-based reductions."""
+        if not batch.names:
+            return
+        values = batch.scores.astype(np.int64)
+        if values.size and values.min() < 0:
+            # golf_parser never produces them; scores built by hand can
+            raise ValueError("negative scores cannot be aggregated")
+        lengths = np.diff(batch.offsets)
+        round_players = self._player_ids(batch.names)
+        pids = np.repeat(round_players, lengths)
+        holes = np.arange(values.size) - np.repeat(batch.offsets[:-1], lengths)
+
+        n_players = len(self.players)
+        n_holes = int(lengths.max())
+        n_values = int(values.max()) + 1 if values.size else 0
+        self._resize(n_players, n_holes, n_values)
+        n_values = self.player_hist.shape[1]
+        squares = values * values
+
+        self.player_rounds += np.bincount(round_players, minlength=n_players)
+        self.player_count += np.bincount(pids, minlength=n_players)
+        self.player_sum += np.bincount(pids, weights=values, minlength=n_players).astype(np.int64)
+        self.player_sumsq += np.bincount(pids, weights=squares, minlength=n_players).astype(np.int64)
+        self.player_hist += np.bincount(pids * n_values + values,
+                                        minlength=n_players * n_values).reshape(n_players, n_values)
+
+        n_holes = self.hole_count.size
+        self.hole_count += np.bincount(holes, minlength=n_holes)
+        self.hole_sum += np.bincount(holes, weights=values, minlength=n_holes).astype(np.int64)
+        self.hole_sumsq += np.bincount(holes, weights=squares, minlength=n_holes).astype(np.int64)
+        self.hole_hist += np.bincount(holes * n_values + values,
+                                      minlength=n_holes * n_values).reshape(n_holes, n_values)
+
+        cells = pids * n_holes + holes
+        n_cells = n_players * n_holes
+        self.cell_count += np.bincount(cells, minlength=n_cells).reshape(n_players, n_holes)
+        self.cell_sum += np.bincount(cells, weights=values,
+                                     minlength=n_cells).astype(np.int64).reshape(n_players, n_holes)
+        self.cell_sumsq += np.bincount(cells, weights=squares,
+                                       minlength=n_cells).astype(np.int64).reshape(n_players, n_holes)
+
+        ace = values == 1
+        keys, counts = np.unique(pids[ace] * n_holes + holes[ace], return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            cell = divmod(key, n_holes)
+            self.aces[cell] = self.aces.get(cell, 0) + count
+
+    def merge(self, other):
+        """Add another partial into this one in place and return self."""
+        mapping = self._player_ids(other.players)
+        self._resize(len(self.players), other.hole_count.size, other.player_hist.shape[1])
+        n_values = self.player_hist.shape[1]
+        hist = _pad(other.player_hist, (other.player_hist.shape[0], n_values))
+
+        np.add.at(self.player_rounds, mapping, other.player_rounds)
+        np.add.at(self.player_count, mapping, other.player_count)
+        np.add.at(self.player_sum, mapping, other.player_sum)
+        np.add.at(self.player_sumsq, mapping, other.player_sumsq)
+        np.add.at(self.player_hist, mapping, hist)
+
+        n_holes = other.hole_count.size
+        self.hole_count[:n_holes] += other.hole_count
+        self.hole_sum[:n_holes] += other.hole_sum
+        self.hole_sumsq[:n_holes] += other.hole_sumsq
+        self.hole_hist[:n_holes] += _pad(other.hole_hist, (n_holes, n_values))
+
+        cell_shape = (other.cell_count.shape[0], self.hole_count.size)
+        np.add.at(self.cell_count, mapping, _pad(other.cell_count, cell_shape))
+        np.add.at(self.cell_sum, mapping, _pad(other.cell_sum, cell_shape))
+        np.add.at(self.cell_sumsq, mapping, _pad(other.cell_sumsq, cell_shape))
+
+        for (player, hole), count in other.aces.items():
+            cell = (int(mapping[player]), hole)
+            self.aces[cell] = self.aces.get(cell, 0) + count
+        return self
+
+    def observation_cells(self):
+        """The player x hole cells as golf_model.ObservationCells."""
+        rows, cols = np.nonzero(self.cell_count)
+        return ObservationCells(self.players, list(range(1, self.hole_count.size + 1)), rows, cols,
+                                self.cell_count[rows, cols].astype(np.float64),
+                                self.cell_sum[rows, cols].astype(np.float64),
+                                self.cell_sumsq[rows, cols].astype(np.float64))
+
+    def sketches(self):
+        """The per-player and per-hole histograms as a golf_sketch.SketchSet."""
+        sketches = SketchSet()
+        sketches.add_histograms(self.players, self.player_hist, self.hole_hist)
+        return sketches
+
+    def to_analysis(self):
+        """
+        Build the compute_analysis-style report from the merged totals, with
+        rankings as (player, average round total) pairs in countback order.
+        """
+        if not self.players:
+            return empty_analysis()
+        counts = self.player_count.tolist()
+        sums = self.player_sum.tolist()
+        sumsqs = self.player_sumsq.tolist()
+        rounds = self.player_rounds.tolist()
+        hist = self.player_hist
+        present = hist > 0
+        best = np.argmax(present, axis=1).tolist()
+        worst = (hist.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)).tolist()
+
+        results = {}
+        for i, player in enumerate(self.players):
+            n, total, sumsq = counts[i], sums[i], sumsqs[i]
+            # Exact integer moments, so merge order cannot change the result
+            consistency = math.sqrt((n * sumsq - total * total) / (n * (n - 1))) if n > 1 else math.nan
+            results[player] = {
+                'total': total,
+                'average': total / n,
+                'best_hole': best[i],
+                'worst_hole': worst[i],
+                'consistency': consistency,
+                'rounds': rounds[i],
+            }
+
+        # Average round totals, tied ones broken by countback on the average
+        # back-half, last-third and last-sixth sums of the holes each played
+        per_round = self.player_rounds.astype(np.float64)
+        averages = self.player_sum / per_round
+        hole_sums = np.where(self.cell_count > 0, self.cell_sum, np.nan)
+        order = ranking_order(self.players, averages, countback_sums(hole_sums) / per_round[:, None])
+        averages = averages.tolist()
+        rankings = [(self.players[i], averages[i]) for i in order.tolist()]
+        hole_averages = [total / n for total, n in zip(self.hole_sum.tolist(), self.hole_count.tolist())]
+        hardest = hole_averages.index(max(hole_averages))
+        easiest = hole_averages.index(min(hole_averages))
+
+        consistent = [(player, stats['consistency']) for player, stats in results.items()
+                      if not math.isnan(stats['consistency'])]
+
+        aces = {}
+        for (player, hole), count in sorted(self.aces.items()):
+            aces.setdefault(self.players[player], []).extend([hole + 1] * count)
+
+        return {
+            'results': results,
+            'hole_averages': hole_averages,
+            'rankings': rankings,
+            'hardest_hole': (hardest + 1, hole_averages[hardest]),
+            'easiest_hole': (easiest + 1, hole_averages[easiest]),
+            'most_consistent': min(consistent, key=lambda item: item[1]) if consistent else None,
+            'least_consistent': max(consistent, key=lambda item: item[1]) if consistent else None,
+            'aces': aces,
+            'skill_model': model_summary(fit_cells(self.observation_cells())),
+            'distributions': self.sketches().summary(),
+        }
+
+
+def aggregate_file(path, strict=False):
+    """Worker entry point: reduce one score file to a PartialAggregate."""
+    partial = PartialAggregate()
+    for batch in iter_score_batches(path, strict=strict):
+        partial.add_batch(batch)
+    return partial
+
+
+def find_score_files(sources):
+    """Expand directories and glob patterns into a sorted list of score files."""
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            paths.update(glob.glob(os.path.join(source, '*.txt')))
+        else:
+            paths.update(glob.glob(source))
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def analyze_score_files(sources, workers=None, strict=False):
+    """
+    Aggregate every score file matched by sources (directories or globs).
+    workers=1 runs everything in this process; otherwise files are spread
+    over a ProcessPoolExecutor. Returns (analysis, files).
+    """
+    files = find_score_files(sources)
+    if not files:
+        raise FileNotFoundError(f"No score files found in {', '.join(sources)}")
+
+    merged = PartialAggregate()
+    if workers == 1 or len(files) == 1:
+        for path in files:
+            merged.merge(aggregate_file(path, strict))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for partial in executor.map(aggregate_file, files, [strict] * len(files)):
+                merged.merge(partial)
+    return merged.to_analysis(), files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse a directory or glob of crazy golf score files")
+    parser.add_argument('sources', nargs='+', help="directories and/or glob patterns")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--strict', action='store_true', help="fail on malformed lines")
+    args = parser.parse_args(argv)
+
+    from crazy_golf_analysis import print_analysis
+
+    analysis, files = analyze_score_files(args.sources, workers=args.workers, strict=args.strict)
+    print(f"Merged {len(files)} score files\n")
+    print_analysis(analysis)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Benchmarks for the crazy golf analyser.
+
+    python golf_bench.py startup              # import time and `stats` latency
+    python golf_bench.py stages               # per-stage time and memory vs data size
+    python golf_bench.py generate out.txt     # write a synthetic score file
+
+Each benchmark prints a summary, can save machine-readable results with
+--output, and exits with status 1 when a limit is exceeded so it can run
+in CI.
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, 'crazy_golf_analysis.py')
+HEAVY_MODULES = ('matplotlib', 'pandas', 'seaborn')
+
+STAGES = ('read_scores_from_file', 'analyze_scores', 'performance_trends', 'visualizations')
+DEFAULT_SIZES = (4, 1000, 100000)
+
+_IMPORT_PROBE = (
+    "import sys, time; start = time.perf_counter(); import crazy_golf_analysis; "
+    "elapsed = time.perf_counter() - start; "
+    "print(elapsed, ','.join(m for m in {heavy!r} if m in sys.modules))"
+)
+
+
+def _run(command):
+    return subprocess.run(command, cwd=HERE, capture_output=True, text=True, check=True)
+
+
+def bench_startup(scores_file='golf_scores.txt', repeats=5):
+    """
+    Time `import crazy_golf_analysis` in a fresh interpreter and the whole
+    `crazy_golf_analysis.py stats` command, each repeats times. Returns a
+    dict of median/min timings in seconds plus any plotting modules that
+    were imported when they should not have been.
+    """
+    probe = _IMPORT_PROBE.format(heavy=HEAVY_MODULES)
+    import_times = []
+    heavy_loaded = set()
+    for _ in range(repeats):
+        elapsed, loaded = _run([sys.executable, '-c', probe]).stdout.split(' ', 1)
+        import_times.append(float(elapsed))
+        heavy_loaded.update(name for name in loaded.strip().split(',') if name)
+
+    stats_times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _run([sys.executable, SCRIPT, 'stats', scores_file])
+        stats_times.append(time.perf_counter() - start)
+
+    return {
+        'benchmark': 'startup',
+        'python': sys.version.split()[0],
+        'repeats': repeats,
+        'import_median': statistics.median(import_times),
+        'import_min': min(import_times),
+        'stats_command_median': statistics.median(stats_times),
+        'stats_command_min': min(stats_times),
+        'heavy_modules_on_import': sorted(heavy_loaded),
+    }
+
+
+def synthetic_rounds(n_players, n_holes, n_rounds, seed=0):
+    """
+    Seeded synthetic league data: n_rounds rounds of n_holes holes shared
+    round-robin between n_players players. Each score is a Poisson draw
+    around the hole's par-like difficulty shifted by the player's skill,
+    clipped to 1-9 strokes. Returns (names, scores) where scores is a
+    uint8 array of shape (n_rounds, n_holes) and names labels each row.
+    """
+    rng = np.random.default_rng(seed)
+    skill = rng.normal(0.0, 0.4, n_players)
+    difficulty = rng.uniform(1.6, 3.4, n_holes)
+    players = np.arange(n_rounds) % n_players
+    expected = np.clip(difficulty[None, :] + skill[players, None] - 1.0, 0.05, None)
+    scores = np.clip(rng.poisson(expected) + 1, 1, 9).astype(np.uint8)
+    names = [f"Player {number + 1}" for number in range(n_players)]
+    return [names[player] for player in players.tolist()], scores
+
+
+def write_synthetic_file(path, n_players, n_holes, n_rounds, seed=0, chunk_rounds=100000):
+    """Write synthetic_rounds() to path in the golf_scores.txt format."""
+    names, scores = synthetic_rounds(n_players, n_holes, n_rounds, seed)
+    digits = scores + ord('0')
+    with open(path, 'w') as file:
+        file.write(f"# Synthetic scores: {n_players} players, {n_holes} holes, "
+                   f"{n_rounds} rounds, seed {seed}\n")
+        for start in range(0, n_rounds, chunk_rounds):
+            block = digits[start:start + chunk_rounds]
+            # "3,4,2,..." for every row of the block at once
+            text = np.full((block.shape[0], 2 * n_holes - 1), ord(','), dtype=np.uint8)
+            text[:, ::2] = block
+            rows = text.tobytes().decode('ascii')
+            width = text.shape[1]
+            file.write(''.join(f"{name}: {rows[i * width:(i + 1) * width]}\n"
+                               for i, name in enumerate(names[start:start + chunk_rounds])))
+    return path
+
+
+def _measure(function, repeats):
+    """Median wall/CPU seconds over repeats runs, then one traced run for peak memory."""
+    wall = []
+    cpu = []
+    for _ in range(repeats):
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        result = function()
+        cpu.append(time.process_time() - start_cpu)
+        wall.append(time.perf_counter() - start_wall)
+        del result
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': statistics.median(wall), 'cpu_seconds': statistics.median(cpu),
+            'peak_bytes': peak}
+
+
+def bench_stages(sizes=DEFAULT_SIZES, n_players=4, n_holes=18, seed=0, repeats=3,
+                 max_plot_rounds=100, stages=STAGES):
+    """
+    Time and memory-profile each pipeline stage on synthetic data of each
+    size (number of rounds). Stage output is discarded. The chart stage
+    renders headlessly in preview mode and is skipped above max_plot_rounds.
+    Returns a dict with one entry per (stage, rounds) in 'results'.
+    """
+    import crazy_golf_analysis as analysis
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir, open(os.devnull, 'w') as devnull:
+        for n_rounds in sizes:
+            path = write_synthetic_file(os.path.join(workdir, f"scores_{n_rounds}.txt"),
+                                        min(n_players, n_rounds), n_holes, n_rounds, seed)
+            output_path = os.path.join(workdir, 'report.png')
+            scores = analysis.read_scores_from_file(path)
+            work = {
+                'read_scores_from_file': lambda: analysis.read_scores_from_file(path),
+                'analyze_scores': lambda: analysis.analyze_scores(scores),
+                'performance_trends': lambda: analysis.performance_trends(scores),
+            }
+            if n_rounds <= max_plot_rounds:
+                report = analysis.compute_analysis(scores)
+                work['visualizations'] = lambda: analysis.create_comprehensive_visualization(
+                    report['results'], report['hole_averages'], scores, show=False, mode='preview',
+                    output_path=output_path)
+
+            for stage in stages:
+                entry = {'stage': stage, 'rounds': n_rounds}
+                if stage not in work:
+                    entry['skipped'] = f"more than {max_plot_rounds} rounds"
+                else:
+                    try:
+                        with contextlib.redirect_stdout(devnull):
+                            entry.update(_measure(work[stage], repeats))
+                    except Exception as error:
+                        entry['error'] = f"{type(error).__name__}: {error}"
+                results.append(entry)
+                print(_format_stage(entry))
+
+    return {
+        'benchmark': 'stages',
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'seed': seed,
+        'players': n_players,
+        'holes': n_holes,
+        'repeats': repeats,
+        'results': results,
+    }
+
+
+def _format_stage(entry):
+    label = f"{entry['stage']:<22} {entry['rounds']:>9} rounds: "
+    if 'seconds' in entry:
+        return (label + f"{entry['seconds'] * 1000:10.1f} ms wall {entry['cpu_seconds'] * 1000:10.1f} ms cpu "
+                f"{entry['peak_bytes'] / 1e6:9.1f} MB peak")
+    return label + (f"skipped ({entry['skipped']})" if 'skipped' in entry else f"error ({entry['error']})")
+
+
+def compare_to_baseline(results, baseline, threshold=0.25, min_seconds=0.005):
+    """
+    Regressions of results against a baseline produced by bench_stages:
+    a stage fails when its time or peak memory grows by more than
+    threshold (0.25 = 25%). Timings under min_seconds in both runs are too
+    noisy to judge and are ignored. Returns a list of messages.
+    """
+    previous = {(entry['stage'], entry['rounds']): entry
+                for entry in baseline.get('results', []) if 'seconds' in entry}
+    failures = []
+    for entry in results['results']:
+        old = previous.get((entry['stage'], entry['rounds']))
+        if old is None:
+            continue
+        if 'seconds' not in entry:
+            failures.append(f"{entry['stage']} at {entry['rounds']} rounds no longer runs: "
+                            f"{entry.get('error') or entry.get('skipped')}")
+            continue
+        if (max(entry['seconds'], old['seconds']) >= min_seconds
+                and entry['seconds'] > old['seconds'] * (1 + threshold)):
+            failures.append(f"{entry['stage']} at {entry['rounds']} rounds took {entry['seconds']:.4f}s "
+                            f"(baseline {old['seconds']:.4f}s)")
+        if entry['peak_bytes'] > old['peak_bytes'] * (1 + threshold) + 4096:
+            failures.append(f"{entry['stage']} at {entry['rounds']} rounds peaked at "
+                            f"{entry['peak_bytes']} bytes (baseline {old['peak_bytes']})")
+    return failures
+
+
+def _save(results, path):
+    if path:
+        with open(path, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crazy golf analyser benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    startup = commands.add_parser('startup', help="import time and stats command latency")
+    startup.add_argument('--scores-file', default='golf_scores.txt')
+    startup.add_argument('--repeats', type=int, default=5)
+    startup.add_argument('--max-seconds', type=float, default=0.5,
+                         help="fail if the median `stats` run takes longer than this")
+    startup.add_argument('--output', help="write results as JSON to this file")
+
+    stages = commands.add_parser('stages', help="time and memory of each stage across data sizes")
+    stages.add_argument('--sizes', type=lambda text: [int(size) for size in text.split(',')],
+                        default=list(DEFAULT_SIZES),
+                        help="comma-separated round counts (default %(default)s; up to 1000000)")
+    stages.add_argument('--players', type=int, default=4)
+    stages.add_argument('--holes', type=int, default=18)
+    stages.add_argument('--seed', type=int, default=0)
+    stages.add_argument('--repeats', type=int, default=3)
+    stages.add_argument('--stage', action='append', choices=STAGES, dest='stages',
+                        help="only run this stage (repeatable)")
+    stages.add_argument('--max-plot-rounds', type=int, default=100,
+                        help="skip the chart stage above this many rounds")
+    stages.add_argument('--baseline', help="earlier --output file to compare against")
+    stages.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed slowdown or memory growth versus the baseline (0.25 = 25%%)")
+    stages.add_argument('--output', help="write results as JSON to this file")
+
+    generate = commands.add_parser('generate', help="write a seeded synthetic score file")
+    generate.add_argument('path')
+    generate.add_argument('--players', type=int, default=4)
+    generate.add_argument('--holes', type=int, default=18)
+    generate.add_argument('--rounds', type=int, default=1000)
+    generate.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args(argv)
+    failures = []
+
+    if args.command == 'generate':
+        write_synthetic_file(args.path, args.players, args.holes, args.rounds, args.seed)
+        print(f"Wrote {args.rounds} rounds for {min(args.players, args.rounds)} players to {args.path}")
+
+    if args.command == 'stages':
+        results = bench_stages(args.sizes, args.players, args.holes, args.seed, args.repeats,
+                               args.max_plot_rounds, args.stages or STAGES)
+        if args.baseline:
+            with open(args.baseline, 'r') as file:
+                failures.extend(compare_to_baseline(results, json.load(file), args.threshold))
+        _save(results, args.output)
+
+    if args.command == 'startup':
+        results = bench_startup(args.scores_file, args.repeats)
+        print(f"import crazy_golf_analysis: {results['import_median'] * 1000:.1f} ms median "
+              f"({results['import_min'] * 1000:.1f} ms best)")
+        print(f"stats command:              {results['stats_command_median'] * 1000:.1f} ms median "
+              f"({results['stats_command_min'] * 1000:.1f} ms best)")
+        if results['heavy_modules_on_import']:
+            failures.append(f"plotting modules imported eagerly: {', '.join(results['heavy_modules_on_import'])}")
+        if results['stats_command_median'] > args.max_seconds:
+            failures.append(f"stats command took {results['stats_command_median']:.3f}s "
+                            f"(limit {args.max_seconds:.3f}s)")
+        _save(results, args.output)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Content-addressed cache for analysis results and rendered charts.
+
+Keys are hashes of the score data itself plus the options of each stage,
+so an unchanged score file hits the cache however it was loaded, and
+changing only a render option (say preview vs full) reuses the cached
+analysis and re-renders the chart alone. Entries are plain files in one
+directory; disk use is kept under a size limit by evicting the least
+recently used entries.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from golf_engine import compute_analysis
+
+# Bump when the analysis output or chart drawing changes so stale entries miss
+ANALYSIS_VERSION = 4
+RENDER_VERSION = 2
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'crazy_golf')
+
+
+def scores_digest(scores):
+    """Hash of player names and every score, independent of how they were loaded."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update('\n'.join(scores.keys()).encode('utf-8'))
+    csr = getattr(scores, 'csr', None)
+    if csr is not None:
+        offsets, values = csr
+        digest.update(np.diff(np.asarray(offsets, dtype=np.int64)).tobytes())
+        digest.update(np.ascontiguousarray(values[offsets[0]:offsets[-1]], dtype=np.int64).tobytes())
+    else:
+        digest.update(np.fromiter((len(values) for values in scores.values()), dtype=np.int64).tobytes())
+        for values in scores.values():
+            digest.update(np.asarray(values, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def stage_key(parent, stage, options=None):
+    """Key for a pipeline stage: its input key, its name and its options."""
+    payload = json.dumps([parent, stage, options or {}], sort_keys=True)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+
+def _restore_analysis(analysis):
+    # JSON turns tuples into lists; give the report back its original shape
+    analysis['rankings'] = [tuple(item) for item in analysis['rankings']]
+    for key in ('hardest_hole', 'easiest_hole', 'most_consistent', 'least_consistent'):
+        if analysis.get(key) is not None:
+            analysis[key] = tuple(analysis[key])
+    return analysis
+
+
+class ResultCache:
+    """A directory of cache entries limited to max_bytes with LRU eviction."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def get_path(self, key, suffix):
+        """Path of a cached file, marking it recently used, or None on a miss."""
+        path = self._path(key, suffix)
+        return path if self._touch(path) else None
+
+    def put_file(self, key, suffix, source_path):
+        """Copy source_path into the cache under key and return the cached path."""
+        path = self._path(key, suffix)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def get_json(self, key):
+        path = self.get_path(key, '.json')
+        if path is None:
+            return None
+        with open(path, 'r') as file:
+            return json.load(file)
+
+    def put_json(self, key, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(value, file)
+        os.replace(tmp_path, self._path(key, '.json'))
+        self.evict()
+
+    def size(self):
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                os.remove(entry.path)
+
+
+def analysis_key(scores, options=None, digest=None):
+    return stage_key(digest or scores_digest(scores), 'analysis',
+                     dict(options or {}, version=ANALYSIS_VERSION))
+
+
+def cached_analysis(scores, cache, options=None, digest=None):
+    """
+    compute_analysis(scores) through the cache. Returns (analysis, key);
+    the key identifies this analysis for later stages.
+    """
+    key = analysis_key(scores, options, digest)
+    analysis = cache.get_json(key)
+    if analysis is not None:
+        return _restore_analysis(analysis), key
+    analysis = compute_analysis(scores)
+    cache.put_json(key, analysis)
+    return analysis, key
+
+
+def render_key(parent_key, layout, mode):
+    return stage_key(parent_key, 'render', {'layout': layout, 'mode': mode, 'version': RENDER_VERSION})
+
+
+def cached_render(cache, parent_key, layout, mode, output_path, render):
+    """
+    Produce the chart at output_path: copied from the cache on a hit, or by
+    calling render(output_path) and storing the result on a miss. Returns
+    True on a cache hit.
+    """
+    key = render_key(parent_key, layout, mode)
+    cached = cache.get_path(key, '.png')
+    if cached is not None:
+        shutil.copyfile(cached, output_path)
+        return True
+    render(output_path)
+    cache.put_file(key, '.png', output_path)
+    return False
@@ -0,0 +1,445 @@
+"""
+SQLite storage for crazy golf rounds with player, course and date.
+
+golf_scores.txt only knows player names. A score database also records
+the course and the date of every round, and keeps one row per hole in an
+indexed ``holes`` table. Statistics over any subset of rounds are then
+computed as SQL aggregates, so only the aggregated rows ever reach Python:
+
+    with ScoreDatabase('golf.db') as db:
+        db.import_score_file('golf_scores.txt', course='Seaside', played_on='2026-10-04')
+        db.analysis(course='Seaside', since='2026-10-01')     # compute_analysis shape
+        db.hole_statistics(course='Seaside', hole=7, since='2026-10-01')
+
+    python golf_db.py import golf.db golf_scores.txt --course Seaside --date 2026-10-04
+    python golf_db.py stats golf.db --player Ann --since 2026-01-01
+    python golf_db.py holes golf.db --course Seaside --hole 7 --since 2026-10-01
+
+The analyser reads a database like any other score file:
+
+    python crazy_golf_analysis.py stats golf.db --course Seaside
+"""
+import argparse
+import datetime
+import math
+import os
+from itertools import groupby, repeat
+
+import numpy as np
+
+from golf_model import ObservationCells, fit_cells, model_summary
+from golf_parser import DEFAULT_BATCH_SIZE, iter_score_batches, round_label
+from golf_sketch import SketchSet
+
+DB_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    rounds INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    course_id INTEGER REFERENCES courses (id),
+    played_on TEXT,
+    label TEXT NOT NULL,
+    n_holes INTEGER NOT NULL
+);
+-- player, course and date are repeated on every hole so that filtered
+-- aggregates are answered from the holes indexes without a join
+CREATE TABLE IF NOT EXISTS holes (
+    round_id INTEGER NOT NULL REFERENCES rounds (id),
+    hole INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    player_id INTEGER NOT NULL,
+    course_id INTEGER,
+    played_on TEXT,
+    PRIMARY KEY (round_id, hole)
+) WITHOUT ROWID;
+"""
+
+# Created after the first bulk load (building an index over a full table
+# is much faster than updating it row by row) and maintained from then on.
+INDEXES = """
+CREATE INDEX IF NOT EXISTS holes_player ON holes (player_id, played_on);
+CREATE INDEX IF NOT EXISTS holes_course ON holes (course_id, hole, played_on);
+CREATE INDEX IF NOT EXISTS holes_date ON holes (played_on);
+CREATE INDEX IF NOT EXISTS rounds_player ON rounds (player_id, played_on);
+"""
+
+
+def is_database(path):
+    return path.endswith(DB_EXTENSIONS)
+
+
+def parse_date(value):
+    """Normalise a YYYY-MM-DD date (raises ValueError for anything else)."""
+    return datetime.date.fromisoformat(value).isoformat()
+
+
+def file_date(path):
+    """The date a score file was last modified, used when no date is given."""
+    return datetime.date.fromtimestamp(os.path.getmtime(path)).isoformat()
+
+
+class ScoreDatabase:
+    """
+    A SQLite score database (used as a context manager or closed
+    explicitly). The player and course tables are cached in memory while
+    importing, so only one process should import into a database at once.
+
+    The query methods take the same filters: player (a name or a list of
+    names, without 'round N' labels), course, and since/until dates
+    (inclusive, YYYY-MM-DD).
+    """
+
+    def __init__(self, path):
+        # sqlite3 is imported here so the analyser can check DB_EXTENSIONS
+        # without paying for it on every start
+        import sqlite3
+
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._players = None
+        self._courses = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        self.connection.close()
+
+    # Loading
+
+    def _load_ids(self):
+        if self._players is None:
+            self._players = {name: [player_id, rounds] for player_id, name, rounds
+                             in self.connection.execute("SELECT id, name, rounds FROM players")}
+            self._courses = dict(self.connection.execute("SELECT name, id FROM courses"))
+
+    def _course_id(self, course):
+        if course is None:
+            return None
+        if course not in self._courses:
+            self._courses[course] = self.connection.execute(
+                "INSERT INTO courses (name) VALUES (?)", (course,)).lastrowid
+        return self._courses[course]
+
+    def _insert_rounds(self, names, offsets, scores, course, played_on):
+        """Insert CSR rounds without committing; returns their labels."""
+        connection = self.connection
+        players = self._players
+        new_players = [name for name in dict.fromkeys(names) if name not in players]
+        if new_players:
+            first = connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM players").fetchone()[0]
+            connection.executemany("INSERT INTO players (id, name) VALUES (?, ?)",
+                                   zip(range(first, first + len(new_players)), new_players))
+            for player_id, name in enumerate(new_players, first):
+                players[name] = [player_id, 0]
+        course_id = self._course_id(course)
+
+        labels = []
+        player_ids = []
+        for name in names:
+            entry = players[name]
+            entry[1] += 1
+            labels.append(round_label(name, entry[1]))
+            player_ids.append(entry[0])
+
+        offsets = np.asarray(offsets, dtype=np.int64)
+        lengths = np.diff(offsets)
+        first = connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM rounds").fetchone()[0]
+        round_ids = np.arange(first, first + len(names))
+        connection.executemany(
+            "INSERT INTO rounds (id, player_id, course_id, played_on, label, n_holes) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            zip(round_ids.tolist(), player_ids, repeat(course_id), repeat(played_on), labels,
+                lengths.tolist()))
+
+        # One row per hole, built column-wise from the CSR layout
+        starts = np.repeat(offsets[:-1], lengths)
+        holes = np.arange(offsets[0], offsets[-1]) - starts + 1
+        values = np.asarray(scores[offsets[0]:offsets[-1]], dtype=np.int64)
+        connection.executemany(
+            "INSERT INTO holes (round_id, hole, score, player_id, course_id, played_on) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            zip(np.repeat(round_ids, lengths).tolist(), holes.tolist(), values.tolist(),
+                np.repeat(player_ids, lengths).tolist(), repeat(course_id), repeat(played_on)))
+
+        connection.executemany("UPDATE players SET rounds = ? WHERE id = ?",
+                               ((players[name][1], players[name][0]) for name in dict.fromkeys(names)))
+        return labels
+
+    def _write(self, batches, course, played_on):
+        self._load_ids()
+        labels = []
+        try:
+            with self.connection:
+                for names, offsets, scores in batches:
+                    labels.extend(self._insert_rounds(names, offsets, scores, course, played_on))
+        except BaseException:
+            # The cached ids may include rows that were rolled back
+            self._players = self._courses = None
+            raise
+        self.connection.executescript(INDEXES)
+        return labels
+
+    def add_rounds(self, names, offsets, scores, course=None, played_on=None):
+        """
+        Insert rounds in CSR form (round i is scores[offsets[i]:offsets[i + 1]],
+        as in golf_parser.ScoreBatch) in one transaction. Returns the labels
+        the rounds were stored under, 'Name (round N)' for repeat players.
+        """
+        return self._write([(names, offsets, scores)], course, parse_date(played_on) if played_on else None)
+
+    def import_score_file(self, path, course=None, played_on=None, strict=False,
+                          batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Import a golf_scores.txt-style file in a single transaction,
+        streaming it batch by batch. played_on defaults to the file's
+        modification date. Returns the number of rounds imported.
+        """
+        played_on = parse_date(played_on) if played_on else file_date(path)
+        batches = ((batch.names, batch.offsets, batch.scores)
+                   for batch in iter_score_batches(path, batch_size=batch_size, strict=strict))
+        return len(self._write(batches, course, played_on))
+
+    # Queries
+
+    def _filters(self, player=None, course=None, since=None, until=None, hole=None):
+        """WHERE clause and parameters over holes (aliased h) for the filters."""
+        clauses = []
+        params = []
+        if player is not None:
+            names = [player] if isinstance(player, str) else list(player)
+            clauses.append(f"h.player_id IN (SELECT id FROM players WHERE name IN "
+                           f"({', '.join('?' * len(names))}))")
+            params.extend(names)
+        if course is not None:
+            clauses.append("h.course_id = (SELECT id FROM courses WHERE name = ?)")
+            params.append(course)
+        if since is not None:
+            clauses.append("h.played_on >= ?")
+            params.append(parse_date(since))
+        if until is not None:
+            clauses.append("h.played_on <= ?")
+            params.append(parse_date(until))
+        if hole is not None:
+            clauses.append("h.hole = ?")
+            params.append(int(hole))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def players(self):
+        """[(player, rounds)] for every player in the database."""
+        return self.connection.execute("SELECT name, rounds FROM players ORDER BY id").fetchall()
+
+    def courses(self):
+        return [name for name, in self.connection.execute("SELECT name FROM courses ORDER BY id")]
+
+    def scores(self, player=None, course=None, since=None, until=None):
+        """The matching rounds as the analyser's {label: [scores]} dict."""
+        where, params = self._filters(player, course, since, until)
+        rows = self.connection.execute(
+            "SELECT h.round_id, r.label, h.score FROM holes h JOIN rounds r ON r.id = h.round_id"
+            f"{where} ORDER BY h.round_id, h.hole", params)
+        return {label: [score for _, _, score in group]
+                for (_, label), group in groupby(rows, key=lambda row: row[:2])}
+
+    def hole_statistics(self, player=None, course=None, since=None, until=None, hole=None):
+        """
+        Per-hole aggregates over the matching rounds: a list of dicts with
+        hole, rounds, average, consistency (sample std dev), best, worst
+        and aces, ordered by hole.
+        """
+        where, params = self._filters(player, course, since, until, hole)
+        rows = self.connection.execute(
+            "SELECT h.hole, COUNT(*), SUM(h.score), SUM(h.score * h.score), MIN(h.score), "
+            f"MAX(h.score), SUM(h.score = 1) FROM holes h{where} GROUP BY h.hole ORDER BY h.hole",
+            params)
+        return [{
+            'hole': number,
+            'rounds': n,
+            'average': total / n,
+            'consistency': _sample_std(n, total, sumsq),
+            'best': best,
+            'worst': worst,
+            'aces': aces,
+        } for number, n, total, sumsq, best, worst, aces in rows]
+
+    def observation_cells(self, player=None, course=None, since=None, until=None):
+        """
+        golf_model.ObservationCells for the matching scores, one per player
+        and hole number, aggregated in SQL.
+        """
+        where, params = self._filters(player, course, since, until)
+        rows = self.connection.execute(
+            "SELECT h.player_id, h.hole, COUNT(*), SUM(h.score), SUM(h.score * h.score) "
+            f"FROM holes h{where} GROUP BY h.player_id, h.hole", params).fetchall()
+        player_ids, holes, counts, sums, sumsqs = np.array(rows, dtype=np.int64).reshape(-1, 5).T
+        # Number the players that appear from 0, in database order
+        ids, cell_players = np.unique(player_ids, return_inverse=True)
+        names = dict(self.connection.execute("SELECT id, name FROM players"))
+        return ObservationCells([names[player_id] for player_id in ids.tolist()],
+                                list(range(1, int(holes.max(initial=0)) + 1)), cell_players, holes - 1,
+                                counts.astype(np.float64), sums.astype(np.float64),
+                                sumsqs.astype(np.float64))
+
+    def sketches(self, player=None, course=None, since=None, until=None):
+        """
+        golf_sketch.SketchSet of the matching scores, built from per-player
+        and per-hole score counts aggregated in SQL.
+        """
+        where, params = self._filters(player, course, since, until)
+        names = dict(self.connection.execute("SELECT id, name FROM players"))
+        sketches = SketchSet()
+        rows = self.connection.execute(
+            f"SELECT h.player_id, h.score, COUNT(*) FROM holes h{where} "
+            "GROUP BY h.player_id, h.score ORDER BY h.player_id", params).fetchall()
+        player_ids, values, counts = np.array(rows, dtype=np.int64).reshape(-1, 3).T
+        sketches.add_player_counts([names[player_id] for player_id in player_ids.tolist()], values, counts)
+        rows = self.connection.execute(
+            f"SELECT h.hole, h.score, COUNT(*) FROM holes h{where} GROUP BY h.hole, h.score", params).fetchall()
+        sketches.add_hole_counts(*np.array(rows, dtype=np.int64).reshape(-1, 3).T)
+        return sketches
+
+    def analysis(self, player=None, course=None, since=None, until=None):
+        """
+        compute_analysis-style statistics over the matching rounds, with
+        every per-round and per-hole figure aggregated in SQL. Returns None
+        when no round matches.
+        """
+        where, params = self._filters(player, course, since, until)
+        # Countback sums over the back half, last third and last sixth of each
+        # round, as in golf_engine.countback_sums
+        rows = self.connection.execute(
+            "SELECT r.label, COUNT(*), SUM(h.score), SUM(h.score * h.score), MIN(h.score), MAX(h.score), "
+            "SUM(CASE WHEN h.hole > r.n_holes - r.n_holes / 2 THEN h.score ELSE 0 END), "
+            "SUM(CASE WHEN h.hole > r.n_holes - r.n_holes / 3 THEN h.score ELSE 0 END), "
+            "SUM(CASE WHEN h.hole > r.n_holes - r.n_holes / 6 THEN h.score ELSE 0 END) "
+            f"FROM holes h JOIN rounds r ON r.id = h.round_id{where} "
+            "GROUP BY h.round_id ORDER BY h.round_id", params).fetchall()
+        if not rows:
+            return None
+
+        results = {}
+        for label, n, total, sumsq, best, worst, *_ in rows:
+            results[label] = {
+                'total': total,
+                'average': total / n,
+                'best_hole': best,
+                'worst_hole': worst,
+                'consistency': _sample_std(n, total, sumsq),
+            }
+        ranked = sorted(rows, key=lambda row: (row[2], row[6], row[7], row[8], row[0]))
+        rankings = [(row[0], row[2]) for row in ranked]
+
+        hole_rows = self.connection.execute(
+            f"SELECT h.hole, AVG(h.score) FROM holes h{where} GROUP BY h.hole", params).fetchall()
+        hole_avgs = np.full(max(number for number, _ in hole_rows), np.nan)
+        for number, average in hole_rows:
+            hole_avgs[number - 1] = average
+        hole_averages = hole_avgs.tolist()
+        hardest = int(np.nanargmax(hole_avgs))
+        easiest = int(np.nanargmin(hole_avgs))
+
+        consistency = np.array([stats['consistency'] for stats in results.values()])
+        if np.isnan(consistency).all():
+            most_consistent = least_consistent = None
+        else:
+            labels = list(results)
+            lo = int(np.nanargmin(consistency))
+            hi = int(np.nanargmax(consistency))
+            most_consistent = (labels[lo], results[labels[lo]]['consistency'])
+            least_consistent = (labels[hi], results[labels[hi]]['consistency'])
+
+        aces = {}
+        clause = f"{where} AND h.score = 1" if where else " WHERE h.score = 1"
+        for label, number in self.connection.execute(
+                f"SELECT r.label, h.hole FROM holes h JOIN rounds r ON r.id = h.round_id{clause} "
+                "ORDER BY h.round_id, h.hole", params):
+            aces.setdefault(label, []).append(number)
+
+        return {
+            'results': results,
+            'hole_averages': hole_averages,
+            'rankings': rankings,
+            'hardest_hole': (hardest + 1, hole_averages[hardest]),
+            'easiest_hole': (easiest + 1, hole_averages[easiest]),
+            'most_consistent': most_consistent,
+            'least_consistent': least_consistent,
+            'aces': aces,
+            'skill_model': model_summary(fit_cells(self.observation_cells(player, course, since, until))),
+            'distributions': self.sketches(player, course, since, until).summary(),
+        }
+
+
+def _sample_std(n, total, sumsq):
+    # Exact integer moments, as in golf_batch.PartialAggregate
+    return math.sqrt(max(n * sumsq - total * total, 0) / (n * (n - 1))) if n > 1 else math.nan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crazy golf SQLite score database")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_cmd = commands.add_parser('import', help="load a golf_scores.txt-style file")
+    import_cmd.add_argument('database')
+    import_cmd.add_argument('sources', nargs='+')
+    import_cmd.add_argument('--course', help="course the rounds were played on")
+    import_cmd.add_argument('--date', type=parse_date,
+                            help="YYYY-MM-DD the rounds were played (default: file date)")
+    import_cmd.add_argument('--strict', action='store_true', help="fail on malformed lines")
+
+    for name, help_text in (('stats', "analysis of the matching rounds"),
+                            ('holes', "per-hole difficulty of the matching rounds")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('database')
+        command.add_argument('--player', action='append', help="only this player's rounds")
+        command.add_argument('--course')
+        command.add_argument('--since', type=parse_date, help="first date, YYYY-MM-DD")
+        command.add_argument('--until', type=parse_date, help="last date, YYYY-MM-DD")
+        if name == 'holes':
+            command.add_argument('--hole', type=int)
+
+    args = parser.parse_args(argv)
+    with ScoreDatabase(args.database) as db:
+        if args.command == 'import':
+            for source in args.sources:
+                count = db.import_score_file(source, course=args.course, played_on=args.date,
+                                             strict=args.strict)
+                print(f"Imported {count} rounds from {source} into {args.database}")
+            return
+
+        filters = {'player': args.player, 'course': args.course, 'since': args.since, 'until': args.until}
+        if args.command == 'stats':
+            from crazy_golf_analysis import print_analysis
+
+            analysis = db.analysis(**filters)
+            if analysis is None:
+                parser.error("no rounds match")
+            print_analysis(analysis)
+        else:
+            holes = db.hole_statistics(hole=args.hole, **filters)
+            if not holes:
+                parser.error("no rounds match")
+            for stats in holes:
+                print(f"Hole {stats['hole']}: {stats['average']:.2f} average over {stats['rounds']} rounds "
+                      f"(std dev {stats['consistency']:.2f}, best {stats['best']}, worst {stats['worst']}, "
+                      f"{stats['aces']} aces)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Vectorised compute layer for the crazy golf analyser.
+
+All of the statistics reported by analyze_scores are computed here from a
+single players x holes NumPy matrix instead of per-player Python loops.
+Nothing in this module prints; presentation lives in crazy_golf_analysis.py.
+"""
+from itertools import chain
+
+import numpy as np
+
+from golf_model import fit_cells, matrix_cells, model_summary
+from golf_parser import pooled_rows
+from golf_sketch import SketchSet
+
+def padded_matrix(offsets, values):
+    """
+    Expand CSR rounds (round i is values[offsets[i]:offsets[i + 1]]) into a
+    rounds x holes float matrix, padding short rounds with NaN.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.diff(offsets)
+    n_holes = int(lengths.max()) if lengths.size else 0
+
+    matrix = np.full((lengths.size, n_holes), np.nan)
+    mask = np.arange(n_holes) < lengths[:, None]
+    matrix[mask] = values[offsets[0]:offsets[-1]] if lengths.size else ()
+    return matrix
+
+
+def score_matrix(scores):
+    """
+    Pack a {player: [score, ...]} dict into a players x holes float matrix.
+    Rounds shorter than the longest one are padded with NaN. Mappings that
+    expose their rounds in CSR form through a ``csr`` attribute (such as
+    golf_store.RoundFile) are expanded directly without iterating scores.
+    """
+    players = list(scores.keys())
+    csr = getattr(scores, 'csr', None)
+    if csr is not None:
+        return players, padded_matrix(*csr)
+
+    lengths = np.fromiter((len(s) for s in scores.values()), dtype=np.int64, count=len(players))
+    offsets = np.zeros(len(players) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    values = np.fromiter(chain.from_iterable(scores.values()), dtype=float, count=int(offsets[-1]))
+    return players, padded_matrix(offsets, values)
+
+
+def player_statistics(matrix):
+    """Per-row totals, averages, best/worst holes and sample std dev."""
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=1)
+    totals = np.nansum(matrix, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        averages = totals / counts
+        deviations = np.where(valid, matrix - averages[:, None], 0.0)
+        consistency = np.sqrt((deviations ** 2).sum(axis=1) / (counts - 1))
+    best = np.nanmin(matrix, axis=1)
+    worst = np.nanmax(matrix, axis=1)
+    return {
+        'total': totals.astype(np.int64),
+        'average': averages,
+        'best_hole': best.astype(np.int64),
+        'worst_hole': worst.astype(np.int64),
+        'consistency': consistency,
+    }
+
+
+def hole_statistics(matrix):
+    """Average score per hole, ignoring players who did not play it."""
+    with np.errstate(invalid='ignore'):
+        return np.nanmean(matrix, axis=0)
+
+
+def ace_locations(players, matrix):
+    """Return {player: [hole numbers]} for every player with at least one ace."""
+    rows, cols = np.nonzero(matrix == 1)
+    if rows.size == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    groups = np.split(cols + 1, starts[1:])
+    return {players[rows[s]]: g.tolist() for s, g in zip(starts, groups)}
+
+
+def countback_holes(n_holes):
+    """Holes summed for each countback stage: back 9, last 6, last 3 on 18 holes."""
+    return n_holes // 2, n_holes // 3, n_holes // 6
+
+
+def countback_sums(matrix):
+    """
+    Per-row sums of the back half, last third and last sixth of each round
+    (back 9, last 6 and last 3 on 18 holes), measured from the end of the
+    holes that round actually has. Returns an int array of shape (rows, 3).
+    """
+    rows = matrix.shape[0]
+    valid = ~np.isnan(matrix)
+    lengths = valid.sum(axis=1)
+    cumulative = np.zeros((rows, matrix.shape[1] + 1))
+    np.cumsum(np.where(valid, matrix, 0.0), axis=1, out=cumulative[:, 1:])
+    index = np.arange(rows)
+    totals = cumulative[index, lengths]
+    sums = np.empty((rows, 3), dtype=np.int64)
+    for stage, holes in enumerate(countback_holes(lengths)):
+        sums[:, stage] = totals - cumulative[index, lengths - holes]
+    return sums
+
+
+def ranking_order(players, totals, countback):
+    """
+    Indices ranking rows by total, then countback (lower back-half, last
+    third and last sixth sums win), then player name, so ties always come
+    out the same way.
+    """
+    return np.lexsort((np.array(players, dtype=str), countback[:, 2], countback[:, 1],
+                       countback[:, 0], totals))
+
+
+def empty_analysis():
+    """What compute_analysis returns for no rounds at all."""
+    return {
+        'results': {},
+        'hole_averages': [],
+        'rankings': [],
+        'hardest_hole': None,
+        'easiest_hole': None,
+        'most_consistent': None,
+        'least_consistent': None,
+        'aces': {},
+        'skill_model': None,
+        'distributions': None,
+    }
+
+
+def compute_analysis(scores):
+    """
+    Compute everything analyze_scores reports, without printing.
+
+    Returns a dict with the legacy 'results' and 'hole_averages' structures
+    plus 'rankings', 'hardest_hole', 'easiest_hole', 'most_consistent',
+    'least_consistent', 'aces', 'skill_model' (golf_model's joint
+    player-skill / hole-difficulty fit, see golf_model.model_summary) and
+    'distributions' (median, p90, p99 and most common score per player and
+    per hole, see golf_sketch.SketchSet.summary). With no rounds at all
+    the result is empty_analysis().
+    """
+    players, matrix = score_matrix(scores)
+    if not players:
+        return empty_analysis()
+    stats = player_statistics(matrix)
+    columns = {key: values.tolist() for key, values in stats.items()}
+
+    results = {}
+    for i, player in enumerate(players):
+        results[player] = {key: columns[key][i] for key in columns}
+
+    order = ranking_order(players, stats['total'], countback_sums(matrix))
+    rankings = [(players[i], columns['total'][i]) for i in order]
+
+    hole_avgs = hole_statistics(matrix)
+    hole_averages = hole_avgs.tolist()
+    hardest = int(np.argmax(hole_avgs))
+    easiest = int(np.argmin(hole_avgs))
+
+    consistency = stats['consistency']
+    if np.isnan(consistency).all():
+        most_consistent = least_consistent = None
+    else:
+        lo = int(np.nanargmin(consistency))
+        hi = int(np.nanargmax(consistency))
+        most_consistent = (players[lo], columns['consistency'][lo])
+        least_consistent = (players[hi], columns['consistency'][hi])
+
+    pooled = pooled_rows(scores)
+    sketches = SketchSet()
+    sketches.add_matrix(players, matrix, pooled)
+
+    return {
+        'results': results,
+        'hole_averages': hole_averages,
+        'rankings': rankings,
+        'hardest_hole': (hardest + 1, hole_averages[hardest]),
+        'easiest_hole': (easiest + 1, hole_averages[easiest]),
+        'most_consistent': most_consistent,
+        'least_consistent': least_consistent,
+        'aces': ace_locations(players, matrix),
+        'skill_model': model_summary(fit_cells(matrix_cells(players, matrix, pooled))),
+        'distributions': sketches.summary(),
+    }
@@ -0,0 +1,279 @@
+"""
+Incremental statistics for score files that keep growing.
+
+IncrementalStats keeps running per-player and per-hole accumulators
+(count, Welford mean/M2, min, max, aces) so each new round costs O(holes)
+instead of a full recomputation. The skill model and score distributions
+come from a golf_batch.PartialAggregate of the same rounds; the model is
+refitted on report(), warm-started from the previous fit. watch_scores tails a score file, parses
+only the bytes appended since the last poll and hands the refreshed
+analysis to a callback.
+"""
+import math
+import os
+import time
+
+import numpy as np
+
+from golf_batch import PartialAggregate
+from golf_engine import countback_sums, empty_analysis, padded_matrix, ranking_order
+from golf_model import fit_cells, model_summary
+from golf_parser import ScoreBatch, parse_score_lines, round_label
+
+
+class _PlayerAccumulator:
+    __slots__ = ('count', 'mean', 'm2', 'total', 'countback', 'best', 'worst', 'aces')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0
+        self.countback = (0, 0, 0)
+        self.best = None
+        self.worst = None
+        self.aces = []
+
+    def merge(self, count, mean, m2, total, countback, best, worst, aces):
+        """Combine another group of hole scores in (Chan et al. parallel update)."""
+        combined = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / combined
+        self.m2 += m2 + delta * delta * self.count * count / combined
+        self.count = combined
+        self.total += total
+        self.countback = tuple(old + new for old, new in zip(self.countback, countback))
+        self.best = best if self.best is None else min(self.best, best)
+        self.worst = worst if self.worst is None else max(self.worst, worst)
+        self.aces.extend(aces)
+
+    @property
+    def consistency(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+
+class IncrementalStats:
+    """
+    Running version of golf_engine.compute_analysis.
+
+    Rounds are labelled exactly as read_scores_from_file labels them
+    ('Name', 'Name (round 2)', ...), so report() matches a full re-analysis
+    of the same file.
+    """
+
+    def __init__(self):
+        self.players = {}
+        self.n_rounds = 0
+        self._round_counts = {}
+        self.hole_count = np.zeros(0, dtype=np.int64)
+        self.hole_mean = np.zeros(0)
+        self.hole_m2 = np.zeros(0)
+        self.hole_min = np.zeros(0)
+        self.hole_max = np.zeros(0)
+        self.hole_aces = np.zeros(0, dtype=np.int64)
+        self.cells = PartialAggregate()
+        self._fit = None
+
+    def _label(self, name):
+        count = self._round_counts.get(name, 0) + 1
+        self._round_counts[name] = count
+        self.n_rounds += 1
+        return round_label(name, count)
+
+    def _grow_holes(self, n_holes):
+        extra = n_holes - self.hole_count.size
+        if extra <= 0:
+            return
+        self.hole_count = np.append(self.hole_count, np.zeros(extra, dtype=np.int64))
+        self.hole_mean = np.append(self.hole_mean, np.zeros(extra))
+        self.hole_m2 = np.append(self.hole_m2, np.zeros(extra))
+        self.hole_min = np.append(self.hole_min, np.full(extra, np.inf))
+        self.hole_max = np.append(self.hole_max, np.full(extra, -np.inf))
+        self.hole_aces = np.append(self.hole_aces, np.zeros(extra, dtype=np.int64))
+
+    def add_round(self, name, scores):
+        """Add one round; cost is proportional to its number of holes."""
+        scores = np.asarray(scores, dtype=np.int64)
+        self.add_rounds([name], np.array([0, scores.size]), scores)
+
+    def add_batch(self, batch):
+        """Add every round of a golf_parser.ScoreBatch."""
+        self.add_rounds(batch.names, batch.offsets, batch.scores)
+
+    def add_rounds(self, names, offsets, scores):
+        """
+        Add rounds given in CSR form (round i is scores[offsets[i]:offsets[i + 1]]).
+        Returns the labels the rounds were stored under.
+        """
+        if not names:
+            return []
+        self.cells.add_batch(ScoreBatch(list(names), np.asarray(offsets), np.asarray(scores), None))
+        matrix = padded_matrix(offsets, scores)
+        valid = ~np.isnan(matrix)
+
+        # Per-hole: summarise the new rows, then merge into the running values
+        counts = valid.sum(axis=0)
+        played = counts > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(played, np.nansum(matrix, axis=0) / counts, 0.0)
+            m2 = np.nansum((matrix - means) ** 2, axis=0)
+        self._grow_holes(matrix.shape[1])
+        n_holes = matrix.shape[1]
+        old_count = self.hole_count[:n_holes]
+        combined = old_count + counts
+        delta = means - self.hole_mean[:n_holes]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.hole_mean[:n_holes] += np.where(played, delta * counts / combined, 0.0)
+            self.hole_m2[:n_holes] += np.where(played, m2 + delta ** 2 * old_count * counts / combined, 0.0)
+        self.hole_count[:n_holes] = combined
+        if played.any():
+            self.hole_min[:n_holes] = np.fmin(self.hole_min[:n_holes], np.nanmin(matrix, axis=0))
+            self.hole_max[:n_holes] = np.fmax(self.hole_max[:n_holes], np.nanmax(matrix, axis=0))
+        self.hole_aces[:n_holes] += (matrix == 1).sum(axis=0)
+
+        # Per-player: each round is summarised with whole-row operations
+        lengths = valid.sum(axis=1)
+        totals = np.nansum(matrix, axis=1)
+        row_means = totals / lengths
+        row_m2 = np.nansum((matrix - row_means[:, None]) ** 2, axis=1)
+        best = np.nanmin(matrix, axis=1)
+        worst = np.nanmax(matrix, axis=1)
+        countback = countback_sums(matrix).tolist()
+        ace_rows, ace_cols = np.nonzero(matrix == 1)
+        aces_by_row = [[] for _ in names]
+        for row, col in zip(ace_rows.tolist(), ace_cols.tolist()):
+            aces_by_row[row].append(col + 1)
+
+        labels = []
+        for i, name in enumerate(names):
+            label = self._label(name)
+            labels.append(label)
+            accumulator = self.players.get(label)
+            if accumulator is None:
+                accumulator = self.players[label] = _PlayerAccumulator()
+            accumulator.merge(int(lengths[i]), float(row_means[i]), float(row_m2[i]),
+                              int(totals[i]), countback[i], int(best[i]), int(worst[i]), aces_by_row[i])
+        return labels
+
+    def report(self):
+        """Return the same structure as golf_engine.compute_analysis."""
+        if not self.players:
+            return empty_analysis()
+        results = {}
+        for player, acc in self.players.items():
+            results[player] = {
+                'total': acc.total,
+                'average': acc.mean,
+                'best_hole': acc.best,
+                'worst_hole': acc.worst,
+                'consistency': acc.consistency,
+            }
+
+        players = list(results)
+        totals = [stats['total'] for stats in results.values()]
+        countback = np.array([acc.countback for acc in self.players.values()], dtype=np.int64).reshape(-1, 3)
+        rankings = [(players[i], totals[i]) for i in ranking_order(players, np.array(totals), countback)]
+
+        hole_averages = self.hole_mean.tolist()
+        if hole_averages:
+            hardest = int(np.argmax(self.hole_mean))
+            easiest = int(np.argmin(self.hole_mean))
+            hardest_hole = (hardest + 1, hole_averages[hardest])
+            easiest_hole = (easiest + 1, hole_averages[easiest])
+        else:
+            hardest_hole = easiest_hole = None
+
+        consistent = [(player, stats['consistency']) for player, stats in results.items()
+                      if not math.isnan(stats['consistency'])]
+        most_consistent = min(consistent, key=lambda item: item[1]) if consistent else None
+        least_consistent = max(consistent, key=lambda item: item[1]) if consistent else None
+        self._fit = fit_cells(self.cells.observation_cells(), previous=self._fit)
+
+        return {
+            'results': results,
+            'hole_averages': hole_averages,
+            'rankings': rankings,
+            'hardest_hole': hardest_hole,
+            'easiest_hole': easiest_hole,
+            'most_consistent': most_consistent,
+            'least_consistent': least_consistent,
+            'aces': {player: list(acc.aces) for player, acc in self.players.items() if acc.aces},
+            'skill_model': model_summary(self._fit),
+            'distributions': self.cells.sketches().summary(),
+        }
+
+
+class ScoreFileTail:
+    """
+    Follows a growing score file, returning only newly completed lines.
+    A trailing line without a newline is held back until its newline
+    arrives, however long the writer takes, or until a final read once the
+    writer is done. If the file shrinks (it was rewritten) the tail
+    restarts from the beginning and reset is set.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.position = 0
+        self.line_number = 1
+        self.pending = b''
+        self.reset = False
+
+    def read_new_lines(self, final=False):
+        self.reset = False
+        try:
+            size = os.path.getsize(self.filename)
+        except FileNotFoundError:
+            return []
+        if size < self.position:
+            self.position = 0
+            self.line_number = 1
+            self.pending = b''
+            self.reset = True
+
+        data = self.pending
+        if size > self.position:
+            with open(self.filename, 'rb') as file:
+                file.seek(self.position)
+                chunk = file.read(size - self.position)
+            self.position += len(chunk)
+            data += chunk
+        # A pause mid-line is not the end of it: keep the fragment back
+        cut = len(data) if final else data.rfind(b'\n') + 1
+        data, self.pending = data[:cut], data[cut:]
+
+        return data.decode('utf-8').splitlines()
+
+    def parse_new_batches(self, strict=False, final=False):
+        lines = self.read_new_lines(final)
+        first_line = self.line_number
+        self.line_number += len(lines)
+        return parse_score_lines(lines, strict=strict, first_line=first_line)
+
+
+def watch_scores(filename, on_update, interval=1.0, strict=False, max_polls=None):
+    """
+    Tail filename forever (or for max_polls polls), feeding appended rounds
+    into an IncrementalStats and calling on_update(stats) after each poll
+    that added rounds. Earlier parts of the file are never re-read unless
+    the file is truncated or replaced.
+    """
+    tail = ScoreFileTail(filename)
+    stats = IncrementalStats()
+    polls = 0
+    while max_polls is None or polls < max_polls:
+        before = stats.n_rounds
+        # Watching stops after the last poll, so it also takes an unterminated line
+        last = max_polls is not None and polls + 1 >= max_polls
+        batches = list(tail.parse_new_batches(strict=strict, final=last))
+        if tail.reset:
+            stats = IncrementalStats()
+            before = 0
+        for batch in batches:
+            stats.add_batch(batch)
+        if stats.n_rounds != before:
+            on_update(stats)
+        polls += 1
+        if max_polls is None or polls < max_polls:
+            time.sleep(interval)
+    return stats
@@ -0,0 +1,200 @@
+"""
+Stage-level instrumentation for the analysis and rendering pipeline.
+
+Code marks its stages with
+
+    with stage('analysis'):
+        ...
+
+which does nothing unless an Instrument is active. Inside
+
+    with Instrument(profile_stage='savefig') as instrument:
+        ...
+    instrument.write_report('report.profile.json')
+
+every stage records its wall time, CPU time and peak traced memory; stages
+opened inside other stages (chart panels inside the render) are reported
+with their full path, e.g. 'visualization/panel:hole_difficulty'. The
+stage named by profile_stage is additionally run under cProfile and
+tracemalloc snapshots, and its hottest functions and largest allocations
+are added to the report.
+"""
+import io
+import json
+import os
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+PROFILE_TOP = 25
+ALLOCATION_TOP = 15
+
+_NULL_STAGE = nullcontext()
+
+
+class _Disabled:
+    def stage(self, name):
+        return _NULL_STAGE
+
+
+_DISABLED = _Disabled()
+_active = _DISABLED
+
+
+def stage(name):
+    """Context manager timing a pipeline stage when instrumentation is active."""
+    return _active.stage(name)
+
+
+def report_path(output_path):
+    """Where the JSON run report for an output image goes: next to it."""
+    return os.path.splitext(output_path)[0] + '.profile.json'
+
+
+class _Stage:
+    __slots__ = ('instrument', 'name', 'path', 'wall', 'cpu', 'base', 'peak', 'profiler', 'snapshot')
+
+    def __init__(self, instrument, name):
+        self.instrument = instrument
+        self.name = name
+
+    def __enter__(self):
+        instrument = self.instrument
+        open_stages = instrument._open
+        self.path = '/'.join([s.name for s in open_stages] + [self.name])
+        self.profiler = None
+        self.snapshot = None
+        if instrument.trace_memory:
+            # Fold the peak so far into the enclosing stages before resetting it
+            current, peak = tracemalloc.get_traced_memory()
+            instrument.peak = max(instrument.peak, peak)
+            for outer in open_stages:
+                outer.peak = max(outer.peak, peak)
+            tracemalloc.reset_peak()
+            self.base = current
+            self.peak = current
+        open_stages.append(self)
+        if instrument._profiles(self):
+            if instrument.trace_memory:
+                self.snapshot = tracemalloc.take_snapshot()
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        instrument = self.instrument
+        if self.profiler is not None:
+            self.profiler.disable()
+        instrument._open.pop()
+
+        record = {'stage': self.path, 'wall_seconds': wall, 'cpu_seconds': cpu}
+        if instrument.trace_memory:
+            peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            outer = instrument._open[-1] if instrument._open else instrument
+            outer.peak = max(outer.peak, peak)
+            record['peak_bytes'] = peak - self.base
+        if self.profiler is not None:
+            record['profile'] = instrument._profile_details(self)
+        instrument.stages.append(record)
+        return False
+
+
+class Instrument:
+    """
+    Collects stage timings while active (used as a context manager).
+    profile_stage names a stage (by name, e.g. 'panel:score_frequency', or
+    full path) to capture with cProfile and tracemalloc; profile_dir also
+    saves its raw .prof file. Tracing memory slows Python-heavy stages
+    down; pass trace_memory=False for timings closest to an untraced run.
+    """
+
+    def __init__(self, profile_stage=None, profile_dir=None, trace_memory=True):
+        self.profile_stage = profile_stage
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.stages = []
+        self._open = []
+        self._previous = None
+        self._started_tracing = False
+        self._start = None
+        self.total_wall = self.total_cpu = self.total_peak = None
+        self.peak = 0
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def __enter__(self):
+        global _active
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            self.peak = 0
+        self._previous = _active
+        _active = self
+        self._start = (time.perf_counter(), time.process_time())
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        self.total_wall = time.perf_counter() - self._start[0]
+        self.total_cpu = time.process_time() - self._start[1]
+        if self.trace_memory:
+            self.total_peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        _active = self._previous
+        if self._started_tracing:
+            tracemalloc.stop()
+        return False
+
+    def _profiles(self, record):
+        return self.profile_stage is not None and self.profile_stage in (record.name, record.path)
+
+    def _profile_details(self, record):
+        details = {}
+        if record.snapshot is not None:
+            # Compare before pstats allocates anything of its own
+            ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            after = tracemalloc.take_snapshot().filter_traces(ignore)
+            changes = after.compare_to(record.snapshot.filter_traces(ignore), 'lineno')
+            details['allocations'] = [
+                {'where': str(change.traceback), 'size_bytes': change.size_diff, 'count': change.count_diff}
+                for change in changes[:ALLOCATION_TOP]
+            ]
+
+        # pstats pulls in dataclasses, inspect and re; only load it when asked to profile
+        import pstats
+
+        text = io.StringIO()
+        stats = pstats.Stats(record.profiler, stream=text)
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+        details['cprofile'] = text.getvalue().strip().splitlines()
+        if self.profile_dir is not None:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, record.path.replace('/', '__').replace(':', '-') + '.prof')
+            stats.dump_stats(path)
+            details['cprofile_file'] = path
+        return details
+
+    def report(self):
+        """The run report: every stage in the order it finished, plus totals."""
+        report = {
+            'memory_traced': self.trace_memory,
+            'total_wall_seconds': self.total_wall,
+            'total_cpu_seconds': self.total_cpu,
+            'stages': self.stages,
+        }
+        if self.trace_memory:
+            report['total_peak_bytes'] = self.total_peak
+        return report
+
+    def write_report(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+        return path
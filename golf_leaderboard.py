@@ -0,0 +1,231 @@
+"""
+Indexed leaderboard for a stream of rounds.
+
+Leaderboard keeps its entries in an indexable skip list ordered by
+(total, back-half sum, last-third sum, last-sixth sum, player): the same
+countback rule golf_engine.compute_analysis uses for RANKINGS, i.e. back
+9, last 6 and last 3 on an 18-hole course, then the player name so that
+ties are always broken the same way. Inserting or updating a player is
+O(log n), the rank of a player O(log n) and the top k O(k), so a season
+table of hundreds of thousands of players can take new rounds as they
+come in:
+
+    board = Leaderboard()
+    board.update('Ann', [3, 2, 4, ...])     # set a player's round
+    board.add('Ann', [2, 3, 3, ...])        # or accumulate a season
+    board.top(10), board.rank('Ann')
+
+    python golf_leaderboard.py golf_scores.txt --top 10 --player "Player 2"
+"""
+import argparse
+import random
+
+import numpy as np
+
+from golf_engine import countback_holes, countback_sums, score_matrix
+from golf_parser import round_player
+
+MAX_LEVELS = 32
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, levels):
+        self.key = key
+        self.next = [None] * levels
+        self.width = [1] * levels
+
+
+def countback_key(scores):
+    """(total, back-half, last-third, last-sixth) sums for one round."""
+    scores = [int(score) for score in scores]
+    n_holes = len(scores)
+    total = sum(scores)
+    return (total,) + tuple(sum(scores[n_holes - holes:]) if holes else 0
+                            for holes in countback_holes(n_holes))
+
+
+class Leaderboard:
+    """
+    Players ranked by total with countback tie-breaking.
+
+    Ranks are 1-based. seed fixes the skip list's random tower heights,
+    which affect speed only, never the order.
+    """
+
+    def __init__(self, seed=None):
+        self._head = _Node(None, MAX_LEVELS)
+        self._keys = {}
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_scores(cls, scores, season=False):
+        """
+        Build from a {player: [scores]} mapping. With season=True, rounds
+        labelled 'Name (round N)' are added up under 'Name'.
+        """
+        board = cls()
+        players, matrix = score_matrix(scores)
+        totals = np.nansum(matrix, axis=1).astype(np.int64)
+        sums = countback_sums(matrix)
+        for player, total, countback in zip(players, totals.tolist(), sums.tolist()):
+            if season:
+                board.add(round_player(player), sums=(total, *countback))
+            else:
+                board._set(player, (total, *countback))
+        return board
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, player):
+        return player in self._keys
+
+    def __iter__(self):
+        """Players from first to last."""
+        node = self._head.next[0]
+        while node is not None:
+            yield node.key[-1]
+            node = node.next[0]
+
+    def total(self, player):
+        return self._keys[player][0]
+
+    def countback(self, player):
+        """The player's (total, back-half, last-third, last-sixth) sums."""
+        return self._keys[player][:-1]
+
+    def update(self, player, scores=None, sums=None):
+        """Set a player's entry from a round's hole scores (or precomputed sums)."""
+        self._set(player, tuple(sums) if sums is not None else countback_key(scores))
+
+    def add(self, player, scores=None, sums=None):
+        """Add a round to a player's running totals, e.g. for a season table."""
+        new = tuple(sums) if sums is not None else countback_key(scores)
+        old = self._keys.get(player)
+        if old is not None:
+            new = tuple(a + b for a, b in zip(old[:-1], new))
+        self._set(player, new)
+
+    def remove(self, player):
+        self._unlink(self._keys.pop(player))
+
+    def _set(self, player, sums):
+        key = sums + (player,)
+        old = self._keys.get(player)
+        if old == key:
+            return
+        if old is not None:
+            self._unlink(old)
+        self._keys[player] = key
+        self._link(key)
+
+    def _find_chain(self, key):
+        """The last node before key on every level, and the steps taken on each."""
+        chain = [None] * MAX_LEVELS
+        steps = [0] * MAX_LEVELS
+        node = self._head
+        for level in range(MAX_LEVELS - 1, -1, -1):
+            following = node.next[level]
+            while following is not None and following.key < key:
+                steps[level] += node.width[level]
+                node = following
+                following = node.next[level]
+            chain[level] = node
+        return chain, steps
+
+    def _link(self, key):
+        chain, steps = self._find_chain(key)
+        levels = 1
+        while levels < MAX_LEVELS and self._random.random() < 0.5:
+            levels += 1
+        node = _Node(key, levels)
+        taken = 0
+        for level in range(levels):
+            previous = chain[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            node.width[level] = previous.width[level] - taken
+            previous.width[level] = taken + 1
+            taken += steps[level]
+        for level in range(levels, MAX_LEVELS):
+            chain[level].width[level] += 1
+
+    def _unlink(self, key):
+        chain, _ = self._find_chain(key)
+        node = chain[0].next[0]
+        for level in range(len(node.next)):
+            previous = chain[level]
+            previous.width[level] += node.width[level] - 1
+            previous.next[level] = node.next[level]
+        for level in range(len(node.next), MAX_LEVELS):
+            chain[level].width[level] -= 1
+
+    def rank(self, player):
+        """1-based position of player."""
+        key = self._keys[player]
+        position = 0
+        node = self._head
+        for level in range(MAX_LEVELS - 1, -1, -1):
+            following = node.next[level]
+            while following is not None and following.key <= key:
+                position += node.width[level]
+                node = following
+                following = node.next[level]
+        return position
+
+    def at(self, rank):
+        """(player, total) in 1-based position rank."""
+        if not 1 <= rank <= len(self):
+            raise IndexError(f"rank {rank} out of range 1..{len(self)}")
+        node = self._head
+        remaining = rank
+        for level in range(MAX_LEVELS - 1, -1, -1):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node.key[-1], node.key[0]
+
+    def top(self, k):
+        """The first k entries as [(player, total)], the same shape as RANKINGS."""
+        entries = []
+        node = self._head.next[0]
+        while node is not None and len(entries) < k:
+            entries.append((node.key[-1], node.key[0]))
+            node = node.next[0]
+        return entries
+
+
+def print_leaderboard(board, top=10, players=()):
+    """Print the top entries and the rank and countback of each of players."""
+    lines = [f"LEADERBOARD ({len(board)} {'players' if len(board) != 1 else 'player'}):"]
+    for rank, (player, total) in enumerate(board.top(top), 1):
+        lines.append(f"{rank}. {player} - {total} strokes")
+    for player in players:
+        if player not in board:
+            lines.append(f"{player}: not on the leaderboard")
+            continue
+        total, *countback = board.countback(player)
+        lines.append(f"{player}: rank {board.rank(player)} of {len(board)}, {total} strokes "
+                     f"(countback {'/'.join(str(value) for value in countback)})")
+    print('\n'.join(lines))
+
+
+def main(argv=None):
+    from crazy_golf_analysis import load_scores
+
+    parser = argparse.ArgumentParser(description="Crazy golf leaderboard with countback tie-breaks")
+    parser.add_argument('scores_file', nargs='?', default='golf_scores.txt')
+    parser.add_argument('--top', type=int, default=10, help="entries to show")
+    parser.add_argument('--player', action='append', default=[], help="also show this player's rank")
+    parser.add_argument('--season', action='store_true',
+                        help="add up each player's rounds instead of ranking rounds separately")
+    args = parser.parse_args(argv)
+
+    board = Leaderboard.from_scores(load_scores(args.scores_file), season=args.season)
+    print_leaderboard(board, args.top, args.player)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Joint player-skill and hole-difficulty model.
+
+A raw hole average is biased by who happened to play the hole, and a raw
+player average by which holes the player played. The model
+
+    score = mean + skill[player] + difficulty[hole] + noise
+
+separates the two. It is fitted by ridge-regularised alternating least
+squares: skills given difficulties, then difficulties given skills, until
+neither moves. Scores only enter through the sparse player x hole cells
+they fall in (how many scores and their sum), so each half-step is one
+np.bincount over the cells however many millions of scores there are,
+and a refit can warm-start from the previous fit:
+
+    fit = fit_scores(scores)
+    save_model(fit, 'model.json')
+    fit = fit_scores(new_scores, previous=load_model('model.json'))
+
+    python golf_model.py golf_scores.txt --warm-start model.json --save model.json
+
+Rounds of the same player ('Name', 'Name (round 2)', ...) share one skill.
+"""
+import argparse
+import json
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from golf_parser import pooled_rows
+
+DEFAULT_RIDGE = 1.0
+DEFAULT_TOLERANCE = 1e-6
+MAX_ITERATIONS = 500
+
+# Sufficient statistics per observed (player, hole) cell: cell i holds
+# counts[i] scores by players[player_ids[i]] on holes[hole_ids[i]].
+ObservationCells = namedtuple('ObservationCells',
+                              ['players', 'holes', 'player_ids', 'hole_ids', 'counts', 'sums', 'sumsqs'])
+
+
+def observation_cells(player_ids, hole_ids, scores, players, holes):
+    """Reduce individual scores to ObservationCells."""
+    player_ids = np.asarray(player_ids, dtype=np.int64)
+    hole_ids = np.asarray(hole_ids, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    n_holes = len(holes)
+    keys = player_ids * n_holes + hole_ids
+    n_cells = len(players) * n_holes
+    if n_cells <= 4 * keys.size:
+        # Dense bincount over every possible cell, then keep the observed ones
+        counts = np.bincount(keys, minlength=n_cells)
+        cells = np.flatnonzero(counts)
+        sums = np.bincount(keys, weights=scores, minlength=n_cells)[cells]
+        sumsqs = np.bincount(keys, weights=scores * scores, minlength=n_cells)[cells]
+        counts = counts[cells]
+    else:
+        cells, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse)
+        sums = np.bincount(inverse, weights=scores)
+        sumsqs = np.bincount(inverse, weights=scores * scores)
+    return ObservationCells(list(players), list(holes), cells // n_holes, cells % n_holes,
+                            counts.astype(np.float64), sums, sumsqs)
+
+
+def matrix_cells(labels, matrix, pooled=None):
+    """
+    ObservationCells for a golf_engine score matrix whose rows are labelled
+    by round; holes are numbered from 1. pooled is pooled_rows(labels), if
+    already known.
+    """
+    players, row_players = pooled or pooled_rows(labels)
+    rows, cols = np.nonzero(~np.isnan(matrix))
+    return observation_cells(row_players[rows], cols, matrix[rows, cols], players,
+                             list(range(1, matrix.shape[1] + 1)))
+
+
+def score_cells(scores):
+    """ObservationCells for a {player: [scores]} mapping."""
+    # golf_engine imports this module for compute_analysis
+    from golf_engine import score_matrix
+
+    return matrix_cells(*score_matrix(scores), pooled_rows(scores))
+
+
+def _warm_start(previous, players, holes):
+    skill = np.zeros(len(players))
+    difficulty = np.zeros(len(holes))
+    if previous is not None:
+        known = dict(zip(previous['players'], np.asarray(previous['skill'], dtype=float).tolist()))
+        skill[:] = [known.get(player, 0.0) for player in players]
+        known = dict(zip(previous['holes'], np.asarray(previous['difficulty'], dtype=float).tolist()))
+        difficulty[:] = [known.get(hole, 0.0) for hole in holes]
+    return skill, difficulty
+
+
+def _centred_ridge(residual_sums, counts, ridge):
+    """
+    Minimise sum((residual - x)^2) + ridge * x^2 per group subject to the
+    count-weighted sum of x being zero (solved with a Lagrange multiplier).
+    Groups with no observations stay at zero.
+    """
+    shrink = counts + ridge
+    seen = shrink > 0
+    shrink = np.where(seen, shrink, 1.0)
+    shift = (counts * residual_sums / shrink).sum() / (counts * counts / shrink).sum()
+    return np.where(seen, (residual_sums - shift * counts) / shrink, 0.0)
+
+
+def fit_cells(cells, previous=None, ridge=DEFAULT_RIDGE, tol=DEFAULT_TOLERANCE, max_iter=MAX_ITERATIONS):
+    """
+    Fit the model to ObservationCells.
+
+    Skills and difficulties are measured from the average player and hole
+    (their score-weighted means are zero, so 'mean' is the plain mean
+    score). ridge shrinks skills towards zero by that many observations,
+    which keeps players with one or two rounds from getting extreme
+    skills. Difficulties are not shrunk: every round that reaches a hole
+    scores it, so on a complete player x hole grid they are exactly the
+    raw hole averages minus the mean. previous is an earlier fit (from
+    fit_cells or load_model) to start from; players and holes it does not
+    know start at zero. Iteration stops once no estimate moves by more
+    than tol strokes.
+
+    Returns a dict with 'mean', 'players', 'skill' (strokes per hole
+    against an average player, lower is better), 'holes', 'difficulty'
+    (strokes above the mean), 'player_scores' and 'hole_scores' (number of
+    scores behind each estimate), 'iterations', 'converged' and 'rmse'.
+    """
+    p, h, n, s = cells.player_ids, cells.hole_ids, cells.counts, cells.sums
+    n_players = len(cells.players)
+    n_holes = len(cells.holes)
+    total_n = n.sum()
+    if total_n == 0:
+        raise ValueError("no scores to fit")
+    player_n = np.bincount(p, weights=n, minlength=n_players)
+    hole_n = np.bincount(h, weights=n, minlength=n_holes)
+    mean = s.sum() / total_n
+    centred = s - n * mean
+
+    skill, difficulty = _warm_start(previous, cells.players, cells.holes)
+    converged = False
+    iterations = 0
+    while iterations < max_iter:
+        iterations += 1
+        new_skill = _centred_ridge(np.bincount(p, weights=centred - n * difficulty[h], minlength=n_players),
+                                   player_n, ridge)
+        new_difficulty = _centred_ridge(np.bincount(h, weights=centred - n * new_skill[p], minlength=n_holes),
+                                        hole_n, 0.0)
+        change = max(np.abs(new_skill - skill).max(initial=0.0),
+                     np.abs(new_difficulty - difficulty).max(initial=0.0))
+        skill, difficulty = new_skill, new_difficulty
+        if change <= tol:
+            converged = True
+            break
+
+    # Residual sum of squares per cell: sum((y - f)^2) = sumsq - 2 f sum + n f^2
+    fitted = mean + skill[p] + difficulty[h]
+    residual = (cells.sumsqs - 2 * fitted * s + n * fitted * fitted).sum()
+    return {
+        'mean': float(mean),
+        'players': list(cells.players),
+        'skill': skill,
+        'player_scores': player_n.astype(np.int64),
+        'holes': list(cells.holes),
+        'difficulty': difficulty,
+        'hole_scores': hole_n.astype(np.int64),
+        'iterations': iterations,
+        'converged': converged,
+        'rmse': math.sqrt(max(residual, 0.0) / total_n),
+    }
+
+
+def fit_scores(scores, previous=None, ridge=DEFAULT_RIDGE, tol=DEFAULT_TOLERANCE):
+    """Fit the model to a {player: [scores]} mapping (see fit_cells)."""
+    return fit_cells(score_cells(scores), previous, ridge, tol)
+
+
+def model_summary(fit):
+    """
+    The fit as it sits in a compute_analysis dict: each player's skill and,
+    for holes numbered from 1, the score an average player is expected to
+    take (comparable with hole_averages).
+    """
+    mean = fit['mean']
+    difficulty = dict(zip(fit['holes'], fit['difficulty'].tolist()))
+    n_holes = max(fit['holes'], default=0)
+    return {
+        'mean': mean,
+        'skill': dict(zip(fit['players'], fit['skill'].tolist())),
+        'hole_difficulty': [mean + difficulty.get(hole, math.nan) for hole in range(1, n_holes + 1)],
+        'iterations': fit['iterations'],
+        'converged': fit['converged'],
+        'rmse': fit['rmse'],
+    }
+
+
+def save_model(fit, path):
+    """Write a fit to JSON so the next refit can warm-start from it."""
+    data = {key: value.tolist() if isinstance(value, np.ndarray) else value for key, value in fit.items()}
+    with open(path, 'w') as file:
+        json.dump(data, file)
+    return path
+
+
+def load_model(path):
+    with open(path, 'r') as file:
+        fit = json.load(file)
+    for key in ('skill', 'difficulty'):
+        fit[key] = np.asarray(fit[key], dtype=np.float64)
+    return fit
+
+
+def print_model(fit, top=None):
+    lines = [f"SKILL MODEL ({fit['iterations']} iterations"
+             f"{'' if fit['converged'] else ', not converged'}, residual std dev {fit['rmse']:.2f}):",
+             f"Mean score per hole: {fit['mean']:.2f}", "", "Hole difficulty (strokes above the mean):"]
+    for hole, difficulty, count in zip(fit['holes'], fit['difficulty'].tolist(), fit['hole_scores'].tolist()):
+        lines.append(f"Hole {hole}: {difficulty:+.2f} ({count} scores)")
+    lines += ["", "Player skill (strokes per hole against an average player, lower is better):"]
+    order = np.argsort(fit['skill'], kind='stable')
+    for rank, i in enumerate(order[:top].tolist(), 1):
+        lines.append(f"{rank}. {fit['players'][i]}: {fit['skill'][i]:+.2f} "
+                     f"({fit['player_scores'][i]} scores)")
+    print('\n'.join(lines))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit player skill and hole difficulty jointly")
+    parser.add_argument('scores_file', nargs='?', default='golf_scores.txt',
+                        help="score file (.txt, .grs) or score database (.db)")
+    parser.add_argument('--warm-start', metavar='PATH', help="start from a fit saved with --save")
+    parser.add_argument('--save', metavar='PATH', help="save the fit as JSON")
+    parser.add_argument('--ridge', type=float, default=DEFAULT_RIDGE,
+                        help="shrinkage of player skills towards zero, in observations")
+    parser.add_argument('--top', type=int, default=None, help="players to list")
+    args = parser.parse_args(argv)
+
+    previous = load_model(args.warm_start) if args.warm_start else None
+    from golf_db import ScoreDatabase, is_database
+
+    if is_database(args.scores_file):
+        with ScoreDatabase(args.scores_file) as db:
+            cells = db.observation_cells()
+    else:
+        from crazy_golf_analysis import load_scores
+
+        cells = score_cells(load_scores(args.scores_file))
+    fit = fit_cells(cells, previous, ridge=args.ridge)
+    print_model(fit, args.top)
+    if args.save:
+        save_model(fit, args.save)
+
+
+if __name__ == "__main__":
+    main()
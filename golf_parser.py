@@ -0,0 +1,221 @@
+"""
+Streaming parser for golf_scores.txt-style files.
+
+Lines look like ``PlayerName: score1, score2, ...`` (commas and/or spaces).
+Rounds are yielded in fixed-size ScoreBatch chunks so memory stays bounded
+no matter how large the file is, and a player name that appears more than
+once produces one round per line rather than overwriting earlier rounds.
+"""
+from collections import namedtuple
+from itertools import islice
+
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 10000
+
+# One chunk of parsed rounds in CSR layout: round i has the scores
+# scores[offsets[i]:offsets[i + 1]] and came from line line_numbers[i].
+ScoreBatch = namedtuple('ScoreBatch', ['names', 'offsets', 'scores', 'line_numbers'])
+
+_COMMA_TO_SPACE = bytes.maketrans(b',', b' ')
+_FAST_PATH_BYTES = b'0123456789 \t\n'
+_POWERS_OF_TEN = 10 ** np.arange(19, dtype=np.int64)
+# Scores are stored as int32; longer digit runs go through the slow path,
+# which rejects values out of range instead of letting them wrap
+_MAX_DIGITS = 9
+_MAX_SCORE = int(np.iinfo(np.int32).max)
+
+
+class ScoreParseError(ValueError):
+    """Raised in strict mode; .errors holds (line_number, message) pairs."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        details = '; '.join(f"line {number}: {message}" for number, message in errors)
+        super().__init__(f"{len(errors)} malformed line(s) in score file - {details}")
+
+
+def _bulk_convert(score_parts):
+    """
+    Convert every score string of a batch at once.
+
+    The batch is joined into a single byte buffer and decoded with NumPy:
+    digit runs are located with shifted masks, their values assembled with
+    a positional reduceat and the per-line counts found with searchsorted.
+    Returns (lengths, values), or None if the batch contains anything other
+    than unsigned integers so the caller can fall back to the slow path.
+    """
+    buf = '\n'.join(score_parts).encode('utf-8').translate(_COMMA_TO_SPACE)
+    if buf.translate(None, _FAST_PATH_BYTES):
+        return None
+
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    is_digit = (raw >= 48) & (raw <= 57)
+    run_start = is_digit.copy()
+    run_start[1:] &= ~is_digit[:-1]
+
+    token_positions = np.flatnonzero(run_start)
+    line_ends = np.searchsorted(token_positions, np.flatnonzero(raw == 10))
+    lengths = np.diff(np.concatenate(([0], line_ends, [token_positions.size])))
+
+    digits = raw[is_digit].astype(np.int64) - 48
+    if digits.size == token_positions.size:
+        # Every score is a single digit, the common case for crazy golf
+        return lengths, digits
+    starts = np.flatnonzero(run_start[is_digit])
+    run_lengths = np.diff(np.append(starts, digits.size))
+    if run_lengths.max() > _MAX_DIGITS:
+        return None
+    run_ids = np.repeat(np.arange(starts.size), run_lengths)
+    place = run_lengths[run_ids] - 1 - (np.arange(digits.size) - starts[run_ids])
+    values = np.add.reduceat(digits * _POWERS_OF_TEN[place], starts)
+    return lengths, values
+
+
+def _slow_convert(score_parts, line_numbers, strict, errors):
+    """Token-by-token conversion, only used for batches the fast path rejects."""
+    lengths = []
+    values = []
+    for part, number in zip(score_parts, line_numbers):
+        count = 0
+        for token in part.replace(',', ' ').split():
+            try:
+                value = int(token)
+            except ValueError:
+                problem = "invalid score"
+            else:
+                if 0 <= value <= _MAX_SCORE:
+                    values.append(value)
+                    count += 1
+                    continue
+                problem = "negative score" if value < 0 else "score out of range"
+            if strict:
+                errors.append((number, f"{problem} {token!r}"))
+        lengths.append(count)
+    return np.asarray(lengths, dtype=np.int64), np.asarray(values, dtype=np.int64)
+
+
+def _make_batch(names, score_parts, line_numbers, strict, errors):
+    """Build a ScoreBatch, appending strict-mode problems to errors."""
+    converted = _bulk_convert(score_parts)
+    if converted is None:
+        converted = _slow_convert(score_parts, line_numbers, strict, errors)
+    lengths, values = converted
+
+    empty = np.flatnonzero(lengths == 0)
+    if empty.size:
+        if strict:
+            errors.extend((line_numbers[i], "no scores") for i in empty)
+        keep = np.flatnonzero(lengths)
+        names = [names[i] for i in keep]
+        line_numbers = [line_numbers[i] for i in keep]
+        lengths = lengths[keep]
+
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return ScoreBatch(names, offsets, values.astype(np.int32), np.asarray(line_numbers, dtype=np.int64))
+
+
+def parse_score_lines(lines, batch_size=DEFAULT_BATCH_SIZE, strict=False, first_line=1):
+    """
+    Parse an iterable of text lines into ScoreBatch chunks of at most
+    batch_size rounds. Comments and blank lines are skipped. Scores are
+    whole numbers from 0 up. In strict mode lines without a colon, without
+    a name or without scores, and non-integer or negative scores, raise
+    ScoreParseError; otherwise they are dropped.
+    """
+    lines = iter(lines)
+    number = first_line
+    while True:
+        chunk = list(islice(lines, batch_size))
+        if not chunk:
+            return
+        stripped = [line.strip() for line in chunk]
+        records = [(n, line.partition(':'))
+                   for n, line in enumerate(stripped, number)
+                   if line and line[0] != '#']
+        number += len(chunk)
+
+        errors = []
+        names = []
+        score_parts = []
+        line_numbers = []
+        for n, (name, sep, scores_str) in records:
+            name = name.strip()
+            if sep and name:
+                names.append(name)
+                score_parts.append(scores_str)
+                line_numbers.append(n)
+            elif strict:
+                errors.append((n, "expected 'PlayerName: score1, score2, ...'"))
+
+        batch = _make_batch(names, score_parts, line_numbers, strict, errors) if names else None
+        if errors:
+            raise ScoreParseError(sorted(errors))
+        if batch is not None and batch.names:
+            yield batch
+
+
+def iter_score_batches(filename, batch_size=DEFAULT_BATCH_SIZE, strict=False):
+    """Stream a score file as ScoreBatch chunks without loading it whole."""
+    with open(filename, 'r') as file:
+        yield from parse_score_lines(file, batch_size=batch_size, strict=strict)
+
+
+def iter_rounds(batches):
+    """Yield (name, scores_array) for every round in a stream of batches."""
+    for batch in batches:
+        for i, name in enumerate(batch.names):
+            yield name, batch.scores[batch.offsets[i]:batch.offsets[i + 1]]
+
+
+def round_label(name, occurrence):
+    """
+    Display name for a player's occurrence-th round (1-based): 'Name',
+    'Name (round 2)', ... A name that already ends in ' (round N)' is
+    always given its occurrence ('Ann (round 2) (round 1)'), so no two
+    rounds share a label and round_player recovers the name exactly.
+    """
+    if occurrence == 1 and round_player(name) == name:
+        return name
+    return f"{name} (round {occurrence})"
+
+
+def round_player(label):
+    """Player name behind a round_label display name."""
+    if not label.endswith(')'):
+        return label
+    name, separator, occurrence = label.rpartition(' (round ')
+    return name if separator and occurrence[:-1].isdecimal() else label
+
+
+def pooled_rows(labels):
+    """
+    Pool round labels by player: returns (players, rows), the players in
+    order of first appearance and each label's index into them.
+
+    labels may also be a {player: [scores]} mapping. One that interns its
+    players (such as golf_store.RoundStore, with ``names`` and a
+    ``player_ids`` array) already holds the answer, so no label strings
+    are looked at.
+    """
+    player_ids = getattr(labels, 'player_ids', None)
+    if player_ids is not None:
+        return list(labels.names), np.asarray(player_ids, dtype=np.int64)
+    players = {}
+    rows = np.fromiter((players.setdefault(round_player(label), len(players)) for label in labels),
+                       dtype=np.int64, count=len(labels))
+    return list(players), rows
+
+
+def read_score_dict(filename, strict=False):
+    """
+    Read a whole score file into the analyser's {player: [scores]} dict.
+    Repeated players keep every round under round_label names.
+    """
+    scores = {}
+    round_counts = {}
+    for name, score_array in iter_rounds(iter_score_batches(filename, strict=strict)):
+        round_counts[name] = round_counts.get(name, 0) + 1
+        scores[round_label(name, round_counts[name])] = score_array.tolist()
+    return scores
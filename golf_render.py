@@ -0,0 +1,530 @@
+"""
+Chart rendering pipeline for crazy golf reports.
+
+Each chart is a panel function that draws onto an Axes it is given, and a
+layout says which panels go on which figure. Reports are built on plain
+matplotlib.figure.Figure objects rendered by the Agg canvas, so nothing
+here needs a display or calls show(); the interactive helpers in
+crazy_golf_analysis.py reuse the same panels on a pyplot figure.
+
+Reports with many players switch to a large-N mode (see LARGE_PLAYERS):
+per-player lines become quantile bands computed with NumPy, per-player
+panels show only the best and worst DETAIL_PLAYERS rounds, and the
+frequency heatmap shows holes instead of players, so the number of
+artists (and the render time) stays flat however many players there are.
+
+Many groups can be rendered in parallel:
+
+    python golf_render.py scores/ --out reports --preview --panels --workers 8
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib import colormaps, style
+from matplotlib.colors import to_hex
+from matplotlib.figure import Figure
+
+from golf_analytics import frequency_labels, player_analytics, score_frequencies
+from golf_engine import compute_analysis, countback_sums, ranking_order, score_matrix
+from golf_instrument import stage
+
+PLAYER_COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
+STYLE = 'seaborn-v0_8'
+
+# Above LARGE_PLAYERS rounds the report switches to quantile bands and
+# shows only the best and worst DETAIL_PLAYERS rounds in per-player panels.
+LARGE_PLAYERS = 20
+DETAIL_PLAYERS = 8
+BAND_QUANTILES = (10, 25, 50, 75, 90)
+BAND_COLOR = '#45B7D1'
+
+# 'preview' is a quick low-resolution render for checking a report;
+# 'full' matches the original 300 dpi output.
+RENDER_MODES = {
+    'preview': {'dpi': 50, 'bbox_inches': None},
+    'full': {'dpi': 300, 'bbox_inches': 'tight'},
+}
+PANEL_FIGSIZE = (8, 6)
+
+
+def player_colors(n):
+    """
+    n distinct colours: the original palette for up to four players, then
+    tab20, then evenly spaced samples of viridis.
+    """
+    if n <= len(PLAYER_COLORS):
+        return PLAYER_COLORS[:n]
+    if n <= 20:
+        return [to_hex(color) for color in colormaps['tab20'](np.arange(n))]
+    return [to_hex(color) for color in colormaps['viridis'](np.linspace(0, 1, n))]
+
+
+class ReportData:
+    """
+    Everything a panel draws from. The score matrix and the golf_analytics
+    kernels are computed on first use and shared by all panels of a report.
+    large forces the large-N mode on or off (default: more than
+    LARGE_PLAYERS rounds).
+    """
+    __slots__ = ('results', 'hole_averages', 'scores', 'large', '_matrix', '_analytics', '_selection')
+
+    def __init__(self, results, hole_averages, scores, large=None):
+        self.results = results
+        self.hole_averages = hole_averages
+        self.scores = scores
+        self.large = len(scores) > LARGE_PLAYERS if large is None else large
+        self._matrix = None
+        self._analytics = None
+        self._selection = None
+
+    @property
+    def matrix(self):
+        if self._matrix is None:
+            self._matrix = score_matrix(self.scores)[1]
+        return self._matrix
+
+    @property
+    def analytics(self):
+        if self._analytics is None:
+            self._analytics = player_analytics(self.scores)
+        return self._analytics
+
+    @property
+    def players(self):
+        return self.analytics['players']
+
+    @property
+    def selection(self):
+        """
+        Rows shown in per-player panels: every round, or in large-N mode the
+        DETAIL_PLAYERS best followed by the DETAIL_PLAYERS worst by ranking.
+        """
+        if self._selection is None:
+            matrix = self.matrix
+            if not self.large or matrix.shape[0] <= 2 * DETAIL_PLAYERS:
+                self._selection = np.arange(matrix.shape[0])
+            else:
+                totals = np.nansum(matrix, axis=1)
+                order = ranking_order(self.players, totals, countback_sums(matrix))
+                self._selection = np.concatenate([order[:DETAIL_PLAYERS], order[-DETAIL_PLAYERS:]])
+        return self._selection
+
+    def selected_players(self):
+        players = self.players
+        return [players[i] for i in self.selection.tolist()]
+
+
+def _title(ax, text, data, compact, **kwargs):
+    if data.large:
+        text += f" (best and worst {DETAIL_PLAYERS} of {len(data.players)})"
+    ax.set_title(text, fontsize=12 if compact else 14, fontweight='bold', **kwargs)
+
+
+def _quantile_bands(ax, x, values, compact, label):
+    """Median line with 25-75% and 10-90% bands of values over rows."""
+    low, q1, median, q3, high = np.nanpercentile(values, BAND_QUANTILES, axis=0)
+    ax.fill_between(x, low, high, color=BAND_COLOR, alpha=0.2, linewidth=0,
+                    label=f"{BAND_QUANTILES[0]}-{BAND_QUANTILES[-1]}%")
+    ax.fill_between(x, q1, q3, color=BAND_COLOR, alpha=0.4, linewidth=0,
+                    label=f"{BAND_QUANTILES[1]}-{BAND_QUANTILES[-2]}%")
+    ax.plot(x, median, marker='o', linewidth=2, color='#2C3E50', markersize=3 if compact else 6,
+            label=f"Median ({label})")
+
+
+def _box_stats(values, label):
+    """The statistics boxplot draws (1.5 IQR whiskers), without drawing outliers."""
+    values = values[~np.isnan(values)]
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    reach = 1.5 * (q3 - q1)
+    inside = values[(values >= q1 - reach) & (values <= q3 + reach)]
+    return {'label': label, 'med': median, 'q1': q1, 'q3': q3,
+            'whislo': inside.min(), 'whishi': inside.max(), 'fliers': []}
+
+
+def draw_total_scores(ax, data, compact):
+    players = data.selected_players() if data.large else list(data.results.keys())
+    totals = [data.results[player]['total'] for player in players]
+
+    ax.bar(players, totals, color=player_colors(len(players)))
+    _title(ax, 'Total Scores Comparison', data, compact)
+    if data.large:
+        ax.tick_params(axis='x', labelrotation=90)
+    ax.set_ylabel('Total Strokes')
+    if not compact:
+        ax.set_xlabel('Players')
+    for i, v in enumerate(totals):
+        ax.text(i, v + 0.5, str(v), ha='center', fontweight='bold')
+
+
+def draw_score_distribution(ax, data, compact):
+    if data.large:
+        # Box statistics straight from the matrix: all rounds, then the selection
+        matrix = data.matrix
+        selection = data.selection
+        stats = [_box_stats(matrix.ravel(), f"All {matrix.shape[0]}")]
+        stats += [_box_stats(matrix[i], data.players[i]) for i in selection.tolist()]
+        boxes = ax.bxp(stats, showfliers=False, patch_artist=True)
+        for box, color in zip(boxes['boxes'], [BAND_COLOR] + player_colors(len(selection))):
+            box.set_facecolor(color)
+        ax.tick_params(axis='x', labelrotation=90)
+        _title(ax, 'Score Distribution by Player', data, compact)
+        return
+
+    all_scores = []
+    player_labels = []
+    for player, player_scores in data.scores.items():
+        all_scores.extend(player_scores)
+        player_labels.extend([player] * len(player_scores))
+
+    with stage('dataframe'):
+        df = pd.DataFrame({'Player': player_labels, 'Score': all_scores})
+    sns.boxplot(data=df, x='Player', y='Score', hue='Player', ax=ax,
+                palette=player_colors(len(data.scores)), legend=False)
+    ax.set_title('Score Distribution by Player', fontsize=12 if compact else 14, fontweight='bold')
+
+
+def draw_hole_difficulty(ax, data, compact):
+    holes = list(range(1, len(data.hole_averages) + 1))
+    ax.plot(holes, data.hole_averages, marker='o', linewidth=2, markersize=4 if compact else 6, color='#E74C3C')
+    ax.set_title('Hole Difficulty (Average Score)', fontsize=12 if compact else 14, fontweight='bold')
+    ax.set_xlabel('Hole Number')
+    ax.set_ylabel('Average Score')
+    ax.set_xticks(holes[::2] if compact else holes)  # Every other hole when space is tight
+    ax.grid(True, alpha=0.3)
+
+
+def draw_performance_by_hole(ax, data, compact):
+    holes = list(range(1, len(data.hole_averages) + 1))
+    if data.large:
+        matrix = data.matrix
+        _quantile_bands(ax, np.arange(1, matrix.shape[1] + 1), matrix, compact,
+                        f"{matrix.shape[0]} rounds")
+    else:
+        colors = player_colors(len(data.scores))
+        for i, (player, player_scores) in enumerate(data.scores.items()):
+            ax.plot(list(range(1, len(player_scores) + 1)), player_scores, marker='o', label=player,
+                    linewidth=2, color=colors[i], markersize=3 if compact else 6)
+    ax.set_title('Player Performance by Hole', fontsize=12 if compact else 14, fontweight='bold')
+    ax.set_xlabel('Hole Number')
+    ax.set_ylabel('Strokes')
+    ax.set_xticks(holes[::2] if compact else holes)
+    ax.legend(fontsize=8 if compact else None)
+    ax.grid(True, alpha=0.3)
+
+
+def draw_score_frequency(ax, data, compact):
+    if data.large:
+        # One row per hole: the share of all rounds scoring each value there
+        counts = score_frequencies(data.matrix.T)
+        shares = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+        sns.heatmap(shares, annot=True, fmt='.0%', cmap='YlOrRd', annot_kws={'fontsize': 7},
+                    xticklabels=frequency_labels(), yticklabels=np.arange(1, len(shares) + 1), ax=ax)
+        ax.set_title(f'Score Frequency by Hole ({data.matrix.shape[0]} rounds)',
+                     fontsize=12 if compact else 14, fontweight='bold')
+        if not compact:
+            ax.set_xlabel('Score')
+            ax.set_ylabel('Hole')
+        return
+
+    analytics = data.analytics
+    sns.heatmap(analytics['frequencies'], annot=True, fmt='d', cmap='YlOrRd',
+                xticklabels=frequency_labels(), yticklabels=analytics['players'], ax=ax)
+    ax.set_title('Score Frequency Heatmap', fontsize=12 if compact else 14, fontweight='bold')
+    if not compact:
+        ax.set_xlabel('Score')
+        ax.set_ylabel('Player')
+
+
+def draw_cumulative_progression(ax, data, compact):
+    cumulative = np.cumsum(data.matrix, axis=1)
+    if data.large:
+        _quantile_bands(ax, np.arange(1, cumulative.shape[1] + 1), cumulative, compact,
+                        f"{cumulative.shape[0]} rounds")
+    else:
+        colors = player_colors(cumulative.shape[0])
+        for i, player in enumerate(data.analytics['players']):
+            holes = np.arange(1, cumulative.shape[1] + 1)
+            ax.plot(holes, cumulative[i], marker='o', label=player, linewidth=2, color=colors[i],
+                    markersize=3 if compact else 6)
+
+    holes = list(range(1, len(data.hole_averages) + 1))
+    ax.set_title('Cumulative Score Progression', fontsize=12 if compact else 14, fontweight='bold')
+    ax.set_xlabel('Hole Number')
+    ax.set_ylabel('Cumulative Strokes')
+    ax.set_xticks(holes[::2] if compact else holes)
+    ax.legend(fontsize=8 if compact else None)
+    ax.grid(True, alpha=0.3)
+
+
+def draw_course_segments(ax, data, compact):
+    # Mean score per course segment (holes 1-6, 7-12, 13-18 for 18 holes) on a polar axis
+    analytics = data.analytics
+    segments = analytics['segment_labels']
+    angles = np.linspace(0, 2 * np.pi, len(segments), endpoint=False)
+    angles = np.append(angles, angles[:1])  # Complete the circle
+
+    if data.large:
+        segment_means = analytics['segments']
+        closed = np.concatenate([segment_means, segment_means[:, :1]], axis=1)
+        _quantile_bands(ax, angles, closed, compact, f"{len(closed)} rounds")
+    else:
+        colors = player_colors(len(analytics['players']))
+        for i, player in enumerate(analytics['players']):
+            values = np.append(analytics['segments'][i], analytics['segments'][i][:1])
+            ax.plot(angles, values, 'o-', linewidth=2, label=player, color=colors[i])
+            ax.fill(angles, values, alpha=0.25, color=colors[i])
+
+    ax.set_xticks(angles[:-1])
+    if compact:
+        ax.set_xticklabels(segments, fontsize=8)
+        ax.set_title('Performance by Course Segment', fontsize=12, fontweight='bold', pad=20)
+        ax.legend(loc='upper right', bbox_to_anchor=(1.2, 1.0), fontsize=8)
+    else:
+        ax.set_xticklabels(segments)
+        ax.set_title('Performance by Course Segment\n(Lower = Better)', fontsize=12, fontweight='bold', pad=20)
+        ax.legend(loc='upper right', bbox_to_anchor=(1.3, 1.0))
+
+
+def draw_mental_resilience(ax, data, compact):
+    # Bounce-back analysis: only players who had at least one bad hole
+    analytics = data.analytics
+    bounce = analytics['bounce_back']
+    selection = data.selection
+    shown = selection[bounce['bad_count'][selection] > 0]
+    players = [analytics['players'][i] for i in shown.tolist()]
+    after_bad = bounce['after_bad'][shown]
+    after_good = np.nan_to_num(bounce['after_good'][shown])
+
+    x = np.arange(len(players))
+    width = 0.35
+
+    ax.bar(x - width/2, after_bad, width,
+           label='After Bad Hole (4+)', color='#E74C3C', alpha=0.8)
+    ax.bar(x + width/2, after_good, width,
+           label='After Good Hole (1-2)', color='#27AE60', alpha=0.8)
+
+    _title(ax, 'Mental Resilience Analysis', data, compact)
+    ax.set_xlabel('Player')
+    ax.set_ylabel('Avg Next Score' if compact else 'Average Next Hole Score')
+    ax.set_xticks(x)
+    ax.set_xticklabels(players, rotation=90 if data.large else None)
+    ax.legend(fontsize=8 if compact else None)
+    ax.grid(True, alpha=0.3)
+
+
+def draw_consistency_streaks(ax, data, compact):
+    # Longest streaks of good holes (score <= 2) and bad holes (score >= 4)
+    analytics = data.analytics
+    selection = data.selection
+    players = data.selected_players()
+    good_streaks = analytics['streaks']['good'][selection]
+    bad_streaks = analytics['streaks']['bad'][selection]
+
+    x = np.arange(len(players))
+    width = 0.35
+
+    ax.bar(x - width/2, good_streaks, width,
+           label='Longest Good Streak (≤2)', color='#27AE60', alpha=0.8)
+    ax.bar(x + width/2, bad_streaks, width,
+           label='Longest Bad Streak (≥4)', color='#E74C3C', alpha=0.8)
+
+    _title(ax, 'Consistency Streaks Analysis', data, compact)
+    ax.set_xlabel('Player')
+    ax.set_ylabel('Consecutive Holes')
+    ax.set_xticks(x)
+    ax.set_xticklabels(players, rotation=90 if data.large else None)
+    ax.legend(fontsize=8 if compact else None)
+    ax.grid(True, alpha=0.3)
+
+    # Add value labels on bars
+    for i, (good, bad) in enumerate(zip(good_streaks.tolist(), bad_streaks.tolist())):
+        if good > 0:
+            ax.text(i - width/2, good + 0.1, str(good), ha='center', fontsize=8)
+        if bad > 0:
+            ax.text(i + width/2, bad + 0.1, str(bad), ha='center', fontsize=8)
+
+
+# name: (draw function, needs a polar axis)
+PANELS = {
+    'total_scores': (draw_total_scores, False),
+    'score_distribution': (draw_score_distribution, False),
+    'hole_difficulty': (draw_hole_difficulty, False),
+    'performance_by_hole': (draw_performance_by_hole, False),
+    'score_frequency': (draw_score_frequency, False),
+    'cumulative_progression': (draw_cumulative_progression, False),
+    'course_segments': (draw_course_segments, True),
+    'mental_resilience': (draw_mental_resilience, False),
+    'consistency_streaks': (draw_consistency_streaks, False),
+}
+
+LAYOUTS = {
+    # create_comprehensive_visualization: every panel on one page
+    'comprehensive': {
+        'grid': (3, 3),
+        'figsize': (20, 16),
+        'panels': list(PANELS),
+        'compact': True,
+        'pad': 2.0,
+        'filename': 'crazy_golf_all_analysis.png',
+    },
+    # create_visualizations
+    'summary': {
+        'grid': (2, 2),
+        'figsize': (15, 12),
+        'panels': ['total_scores', 'score_distribution', 'hole_difficulty', 'performance_by_hole'],
+        'compact': False,
+        'pad': 1.08,
+        'filename': 'crazy_golf_analysis.png',
+    },
+    # create_additional_visualizations
+    'additional': {
+        'grid': (2, 2),
+        'figsize': (16, 12),
+        'panels': ['score_frequency', 'cumulative_progression', 'course_segments', 'mental_resilience'],
+        'compact': False,
+        'pad': 1.08,
+        'filename': 'crazy_golf_additional_analysis.png',
+    },
+}
+
+
+def default_output_path(layout):
+    return os.path.join(os.path.expanduser('~'), 'Downloads', LAYOUTS[layout]['filename'])
+
+
+def _draw_layout(fig, layout, data):
+    spec = LAYOUTS[layout]
+    rows, cols = spec['grid']
+    with style.context(STYLE):
+        for index, name in enumerate(spec['panels'], 1):
+            draw, polar = PANELS[name]
+            with stage(f'panel:{name}'):
+                ax = fig.add_subplot(rows, cols, index, projection='polar' if polar else None)
+                draw(ax, data, spec['compact'])
+        with stage('tight_layout'):
+            fig.tight_layout(pad=spec['pad'])
+    return fig
+
+
+def _render_panels(data, panels_dir, layout, mode):
+    spec = LAYOUTS[layout]
+    options = RENDER_MODES[mode]
+    os.makedirs(panels_dir, exist_ok=True)
+    paths = []
+    with style.context(STYLE):
+        for index, name in enumerate(spec['panels'], 1):
+            draw, polar = PANELS[name]
+            path = os.path.join(panels_dir, f"{index:02d}_{name}.png")
+            with stage(f'panel_file:{name}'):
+                fig = Figure(figsize=PANEL_FIGSIZE)
+                ax = fig.add_subplot(projection='polar' if polar else None)
+                draw(ax, data, False)
+                fig.tight_layout()
+                fig.savefig(path, **options)
+            paths.append(path)
+    return paths
+
+
+def draw_layout(fig, layout, results, hole_averages, scores):
+    """Draw every panel of a layout onto fig (a Figure or pyplot figure)."""
+    return _draw_layout(fig, layout, ReportData(results, hole_averages, scores))
+
+
+def render_panels(results, hole_averages, scores, panels_dir, layout='comprehensive', mode='full'):
+    """Save each panel of a layout as its own image; returns the paths."""
+    return _render_panels(ReportData(results, hole_averages, scores), panels_dir, layout, mode)
+
+
+def render_report(results, hole_averages, scores, output_path=None, layout='comprehensive',
+                  mode='full', panels_dir=None):
+    """
+    Render a layout headlessly on the Agg canvas and save it to output_path
+    (default: the layout's file in ~/Downloads). Never opens a window.
+    Returns the path of the saved image.
+    """
+    if output_path is None:
+        output_path = default_output_path(layout)
+    data = ReportData(results, hole_averages, scores)
+    with style.context(STYLE):
+        fig = Figure(figsize=LAYOUTS[layout]['figsize'])
+        _draw_layout(fig, layout, data)
+        with stage('savefig'):
+            fig.savefig(output_path, **RENDER_MODES[mode])
+    if panels_dir is not None:
+        _render_panels(data, panels_dir, layout, mode)
+    return output_path
+
+
+def _render_group(job):
+    """Worker entry point: analyse and render one group's score file."""
+    from golf_store import RoundStore
+
+    path, output_dir, layout, mode, panels, cache = job
+    group = os.path.splitext(os.path.basename(path))[0]
+    scores = RoundStore.from_file(path)
+    if not scores:
+        return None
+    output_path = os.path.join(output_dir, f"{group}.png")
+    panels_dir = os.path.join(output_dir, group) if panels else None
+    if cache is None:
+        analysis = compute_analysis(scores)
+        return render_report(analysis['results'], analysis['hole_averages'], scores, output_path,
+                             layout=layout, mode=mode, panels_dir=panels_dir)
+
+    from golf_cache import cached_analysis, cached_render
+
+    analysis, key = cached_analysis(scores, cache)
+    cached_render(cache, key, layout, mode, output_path,
+                  lambda target: render_report(analysis['results'], analysis['hole_averages'], scores,
+                                               target, layout=layout, mode=mode))
+    if panels_dir is not None:
+        render_panels(analysis['results'], analysis['hole_averages'], scores, panels_dir,
+                      layout=layout, mode=mode)
+    return output_path
+
+
+def render_groups(paths, output_dir, layout='comprehensive', mode='full', panels=False, workers=None,
+                  cache=None):
+    """
+    Render one report per score file into output_dir, spreading the work
+    over worker processes. Returns the list of images written. With a
+    golf_cache.ResultCache, files whose scores have not changed are copied
+    from the cache instead of being re-rendered.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(path, output_dir, layout, mode, panels, cache) for path in paths]
+    if workers == 1 or len(jobs) <= 1:
+        rendered = [_render_group(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rendered = list(executor.map(_render_group, jobs))
+    return [path for path in rendered if path is not None]
+
+
+def main(argv=None):
+    from golf_batch import find_score_files
+
+    parser = argparse.ArgumentParser(description="Render crazy golf reports without a display")
+    parser.add_argument('sources', nargs='+', help="score files, directories or glob patterns")
+    parser.add_argument('--out', default='reports', help="directory for the rendered images")
+    parser.add_argument('--layout', choices=list(LAYOUTS), default='comprehensive')
+    parser.add_argument('--preview', action='store_true', help="fast low-DPI render")
+    parser.add_argument('--panels', action='store_true', help="also save every panel separately")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    paths = find_score_files(args.sources)
+    if not paths:
+        parser.error("no score files found")
+    rendered = render_groups(paths, args.out, layout=args.layout,
+                             mode='preview' if args.preview else 'full',
+                             panels=args.panels, workers=args.workers)
+    print(f"Rendered {len(rendered)} reports into {args.out}")
+
+
+if __name__ == "__main__":
+    main()
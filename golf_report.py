@@ -0,0 +1,451 @@
+"""
+Structured report output for the crazy golf analyser.
+
+Reports are a set of tables (players, rankings, holes, aces, insights,
+skills, distributions and, when trends were computed, trends and
+trend_history), each written as whole columns at a time rather than line
+by line:
+
+- json: one file, {"table": [{"column": value, ...}, ...], ...}
+- csv: a directory with one <table>.csv per table
+- parquet: a directory with one <table>.parquet per table (needs pyarrow)
+
+Writers accept a table in any number of chunks, so stream_report can write
+the per-round report for millions of rounds batch by batch without holding
+it in memory:
+
+    python golf_report.py golf_scores.txt report.json
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import shutil
+import tempfile
+from json.encoder import encode_basestring_ascii
+
+import numpy as np
+
+from golf_analytics import compare_windows
+from golf_batch import PartialAggregate
+from golf_engine import padded_matrix, player_statistics
+from golf_model import fit_cells, model_summary
+from golf_parser import DEFAULT_BATCH_SIZE, ScoreBatch, iter_score_batches, round_label
+from golf_sketch import QUANTILES
+
+FORMATS = ('json', 'csv', 'parquet')
+_BUFFER_SIZE = 1 << 20
+_encode = json.JSONEncoder().encode
+
+
+def _column(values):
+    """A column as a plain list with NaN turned into None."""
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == 'f':
+            return np.where(np.isnan(values), None, values).tolist()
+        return values.tolist()
+    return [None if isinstance(value, float) and math.isnan(value) else value for value in values]
+
+
+def _json_column(values):
+    """A column as a list of JSON literals, with NumPy doing the number formatting."""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'iuf':
+        literals = values.astype(str)
+        if values.dtype.kind == 'f':
+            literals[~np.isfinite(values)] = 'null'
+        return literals.tolist()
+    return [encode_basestring_ascii(value) if isinstance(value, str) else _encode(value)
+            for value in _column(values)]
+
+
+class ReportWriter:
+    """Base class: collects tables written in chunks of whole columns."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write_rows(self, table, columns):
+        """Append rows to table; columns maps column name to equal-length sequences."""
+        raise NotImplementedError
+
+    def close(self):
+        """Finish the report, replacing any previous one at path."""
+
+    def abort(self):
+        """Drop everything written so far, leaving any previous report in place."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class JsonReportWriter(ReportWriter):
+    """
+    Tables go to temporary part files as they arrive and are joined into
+    one JSON document on close, so chunks of different tables can be
+    interleaved without buffering any of them in memory.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._parts_dir = tempfile.mkdtemp(prefix='golf_report_',
+                                           dir=os.path.dirname(os.path.abspath(path)))
+        self._parts = {}
+
+    def write_rows(self, table, columns):
+        names = list(columns)
+        # Encode column by column and fill a row template, instead of
+        # serialising a dict per row
+        template = '{' + ', '.join(f'{json.dumps(name)}: %s' for name in names) + '}'
+        encoded = [_json_column(columns[name]) for name in names]
+        text = ',\n'.join([template % row for row in zip(*encoded)])
+        if not text:
+            return
+        part = self._parts.get(table)
+        if part is None:
+            part = self._parts[table] = open(os.path.join(self._parts_dir, f"{len(self._parts)}.part"),
+                                             'w', buffering=_BUFFER_SIZE)
+        else:
+            part.write(',\n')
+        part.write(text)
+
+    def close(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', buffering=_BUFFER_SIZE) as output:
+            output.write('{')
+            for i, (table, part) in enumerate(self._parts.items()):
+                part.close()
+                output.write(f'{"," if i else ""}\n{json.dumps(table)}: [\n')
+                with open(part.name, 'r') as source:
+                    shutil.copyfileobj(source, output, _BUFFER_SIZE)
+                output.write('\n]')
+            output.write('\n}\n')
+        os.replace(tmp_path, self.path)
+        shutil.rmtree(self._parts_dir, ignore_errors=True)
+
+    def abort(self):
+        for part in self._parts.values():
+            part.close()
+        self._parts = {}
+        shutil.rmtree(self._parts_dir, ignore_errors=True)
+
+
+class CsvReportWriter(ReportWriter):
+    """
+    One CSV file per table in the directory path; NaN is an empty field.
+    Tables are written to <table>.csv.tmp and renamed into place on close.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        os.makedirs(path, exist_ok=True)
+        self._files = {}
+
+    def write_rows(self, table, columns):
+        names = list(columns)
+        entry = self._files.get(table)
+        if entry is None:
+            file = open(os.path.join(self.path, f"{table}.csv.tmp"), 'w', newline='', buffering=_BUFFER_SIZE)
+            entry = self._files[table] = (file, csv.writer(file))
+            entry[1].writerow(names)
+        entry[1].writerows(zip(*(_column(columns[name]) for name in names)))
+
+    def close(self):
+        for file, _ in self._files.values():
+            file.close()
+            os.replace(file.name, file.name[:-len('.tmp')])
+        self._files = {}
+
+    def abort(self):
+        for file, _ in self._files.values():
+            file.close()
+            os.remove(file.name)
+        self._files = {}
+
+
+class ParquetReportWriter(ReportWriter):
+    """
+    One Parquet file per table in the directory path; each chunk is a row
+    group. Tables are written to <table>.parquet.tmp and renamed on close.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as error:
+            raise ImportError("Parquet reports need pyarrow: pip install pyarrow") from error
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        os.makedirs(path, exist_ok=True)
+        self._writers = {}
+
+    def write_rows(self, table, columns):
+        names = list(columns)
+        data = self._pa.table({name: _column(columns[name]) for name in names})
+        if data.num_rows == 0:
+            return
+        writer = self._writers.get(table)
+        if writer is None:
+            writer = self._writers[table] = self._pq.ParquetWriter(
+                os.path.join(self.path, f"{table}.parquet.tmp"), data.schema)
+        writer.write_table(data.cast(writer.schema))
+
+    def close(self):
+        for table, writer in self._writers.items():
+            writer.close()
+            tmp_path = os.path.join(self.path, f"{table}.parquet.tmp")
+            os.replace(tmp_path, tmp_path[:-len('.tmp')])
+        self._writers = {}
+
+    def abort(self):
+        for table, writer in self._writers.items():
+            writer.close()
+            os.remove(os.path.join(self.path, f"{table}.parquet.tmp"))
+        self._writers = {}
+
+
+_WRITERS = {'json': JsonReportWriter, 'csv': CsvReportWriter, 'parquet': ParquetReportWriter}
+
+
+def resolve_format(path, report_format=None):
+    """The format for path: as given, or json for *.json and csv otherwise."""
+    if report_format is None:
+        report_format = 'json' if path.endswith('.json') else 'csv'
+    if report_format not in _WRITERS:
+        raise ValueError(f"unknown report format {report_format!r}; choose from {', '.join(FORMATS)}")
+    return report_format
+
+
+def open_report_writer(path, report_format=None):
+    return _WRITERS[resolve_format(path, report_format)](path)
+
+
+def analysis_tables(analysis):
+    """The tables of a compute_analysis dict as {table: {column: values}}."""
+    results = analysis['results']
+    players = list(results)
+    columns = ['total', 'average', 'best_hole', 'worst_hole', 'consistency']
+    if players and 'rounds' in results[players[0]]:
+        columns.append('rounds')
+    tables = {
+        'players': dict({'player': players},
+                        **{column: [results[player][column] for player in players] for column in columns}),
+        'rankings': {
+            'rank': list(range(1, len(analysis['rankings']) + 1)),
+            'player': [player for player, _ in analysis['rankings']],
+            'total': [total for _, total in analysis['rankings']],
+        },
+        'holes': {
+            'hole': list(range(1, len(analysis['hole_averages']) + 1)),
+            'average': list(analysis['hole_averages']),
+        },
+        'aces': {
+            'player': [player for player, holes in analysis['aces'].items() for _ in holes],
+            'hole': [hole for holes in analysis['aces'].values() for hole in holes],
+        },
+    }
+    insights = {'insight': [], 'subject': [], 'value': []}
+    for key in ('hardest_hole', 'easiest_hole', 'most_consistent', 'least_consistent'):
+        if analysis.get(key) is not None:
+            subject, value = analysis[key]
+            insights['insight'].append(key)
+            insights['subject'].append(str(subject))
+            insights['value'].append(float(value))
+    tables['insights'] = insights
+
+    model = analysis.get('skill_model')
+    if model is not None:
+        tables['holes']['adjusted'] = list(model['hole_difficulty'])
+        tables['skills'] = {'player': list(model['skill']), 'skill': list(model['skill'].values())}
+
+    distributions = analysis.get('distributions')
+    if distributions is not None:
+        tables['holes'].update(distribution_columns(distributions['holes']))
+        tables['distributions'] = dict({'player': list(distributions['players'])},
+                                       **distribution_columns(distributions['players'].values()))
+    return tables
+
+
+def distribution_columns(entries):
+    """Columns of golf_sketch summary entries: scores, median, p90, p99 and mode."""
+    entries = list(entries)
+    return {column: [entry[column] for entry in entries] for column in ('scores', *QUANTILES, 'mode')}
+
+
+def trend_tables(trends):
+    """The tables of a golf_analytics.trend_analysis dict."""
+    holes = trends['holes']['comparison']
+    history = trends['history']
+    played = trends['rounds_played']
+    rows = np.arange(played.size)
+    latest = np.maximum(played - 1, 0)
+    n_columns = history['running_mean'].shape[1]
+
+    def latest_of(matrix):
+        return matrix[rows, latest] if n_columns else np.full(played.size, np.nan)
+
+    return {
+        'trends': {
+            'round': trends['rounds'],
+            'first': holes['first'],
+            'last': holes['last'],
+            'trend': holes['trend'],
+        },
+        'trend_history': {
+            'player': trends['players'],
+            'rounds': played,
+            'running_mean': latest_of(history['running_mean']),
+            'rolling_mean': latest_of(history['rolling_mean']),
+            'ewma': latest_of(history['ewma']),
+            'first': history['comparison']['first'],
+            'last': history['comparison']['last'],
+            'trend': history['comparison']['trend'],
+        },
+    }
+
+
+def write_report(path, analysis=None, trends=None, report_format=None):
+    """Write an in-memory analysis and/or trends as a report; returns path."""
+    tables = analysis_tables(analysis) if analysis is not None else {}
+    if trends is not None:
+        tables.update(trend_tables(trends))
+    with open_report_writer(path, report_format) as writer:
+        for table, columns in tables.items():
+            writer.write_rows(table, columns)
+    return path
+
+
+def store_batches(store, batch_size=DEFAULT_BATCH_SIZE):
+    """ScoreBatch chunks over a golf_store.RoundFile, slicing its memory map."""
+    offsets, scores = store.csr
+    names = store.names
+    for start in range(0, store.n_rounds, batch_size):
+        stop = min(start + batch_size, store.n_rounds)
+        chunk_offsets = np.asarray(offsets[start:stop + 1], dtype=np.int64)
+        yield ScoreBatch([names[i] for i in store.player_ids[start:stop].tolist()],
+                         chunk_offsets - chunk_offsets[0],
+                         np.asarray(scores[chunk_offsets[0]:chunk_offsets[-1]], dtype=np.int32),
+                         None)
+
+
+def stream_report(batches, writer):
+    """
+    Write a per-round report from a stream of golf_parser.ScoreBatch chunks.
+
+    Each batch adds its rounds to the players table (with each round's
+    first-half/second-half trend) and its hole-in-ones to the aces table;
+    only per-hole sums, the round counts per name and the player x hole
+    sums behind the skill model (with the score histograms behind the
+    distributions) are kept between batches. The holes, insights, skills
+    and distributions tables are written at the end. Rankings
+    are left out since they need every round at once; sort the players
+    table by total instead. Returns the number of rounds written.
+    """
+    round_counts = {}
+    hole_sums = np.zeros(0, dtype=np.int64)
+    hole_counts = np.zeros(0, dtype=np.int64)
+    most = least = None
+    n_rounds = 0
+    cells = PartialAggregate()
+
+    for batch in batches:
+        if not batch.names:
+            continue
+        cells.add_batch(batch)
+        labels = []
+        for name in batch.names:
+            count = round_counts[name] = round_counts.get(name, 0) + 1
+            labels.append(round_label(name, count))
+        matrix = padded_matrix(batch.offsets, batch.scores)
+        stats = player_statistics(matrix)
+        lengths = np.diff(batch.offsets)
+        comparison = compare_windows(matrix, lengths // 2)
+        writer.write_rows('players', dict(
+            {'player': labels}, **stats,
+            first=comparison['first'], last=comparison['last'], trend=comparison['trend']))
+
+        ace_rows, ace_cols = np.nonzero(matrix == 1)
+        writer.write_rows('aces', {'player': [labels[row] for row in ace_rows.tolist()],
+                                   'hole': ace_cols + 1})
+
+        n_holes = matrix.shape[1]
+        if n_holes > hole_sums.size:
+            hole_sums = np.append(hole_sums, np.zeros(n_holes - hole_sums.size, dtype=np.int64))
+            hole_counts = np.append(hole_counts, np.zeros(n_holes - hole_counts.size, dtype=np.int64))
+        valid = ~np.isnan(matrix)
+        hole_sums[:n_holes] += np.where(valid, matrix, 0).sum(axis=0).astype(np.int64)
+        hole_counts[:n_holes] += valid.sum(axis=0)
+
+        consistency = stats['consistency']
+        if not np.isnan(consistency).all():
+            low, high = np.nanargmin(consistency), np.nanargmax(consistency)
+            if most is None or consistency[low] < most[1]:
+                most = (labels[low], float(consistency[low]))
+            if least is None or consistency[high] > least[1]:
+                least = (labels[high], float(consistency[high]))
+        n_rounds += len(labels)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        averages = hole_sums / hole_counts
+    model = model_summary(fit_cells(cells.observation_cells())) if n_rounds else None
+    distributions = cells.sketches().summary() if n_rounds else None
+    holes = {'hole': np.arange(1, averages.size + 1), 'average': averages}
+    if model is not None:
+        holes['adjusted'] = model['hole_difficulty']
+        holes.update(distribution_columns(distributions['holes']))
+    writer.write_rows('holes', holes)
+    insights = {'insight': [], 'subject': [], 'value': []}
+    if averages.size:
+        for key, index in (('hardest_hole', np.argmax(averages)), ('easiest_hole', np.argmin(averages))):
+            insights['insight'].append(key)
+            insights['subject'].append(str(index + 1))
+            insights['value'].append(float(averages[index]))
+    for key, entry in (('most_consistent', most), ('least_consistent', least)):
+        if entry is not None:
+            insights['insight'].append(key)
+            insights['subject'].append(entry[0])
+            insights['value'].append(entry[1])
+    writer.write_rows('insights', insights)
+    if model is not None:
+        writer.write_rows('skills', {'player': list(model['skill']), 'skill': list(model['skill'].values())})
+        writer.write_rows('distributions', dict({'player': list(distributions['players'])},
+                                                **distribution_columns(distributions['players'].values())))
+    return n_rounds
+
+
+def stream_score_file(source, path, report_format=None, batch_size=DEFAULT_BATCH_SIZE, strict=False):
+    """stream_report for a .txt score file or .grs store; returns the number of rounds."""
+    from golf_store import STORE_EXTENSION, open_round_store
+
+    if source.endswith(STORE_EXTENSION):
+        batches = store_batches(open_round_store(source), batch_size)
+    else:
+        batches = iter_score_batches(source, batch_size=batch_size, strict=strict)
+    with open_report_writer(path, report_format) as writer:
+        return stream_report(batches, writer)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a per-round crazy golf report without loading "
+                                                 "the whole score file")
+    parser.add_argument('source', help="score file (.txt or .grs)")
+    parser.add_argument('destination', help="report file (.json) or directory (csv/parquet)")
+    parser.add_argument('--format', choices=FORMATS, help="default: json for *.json, otherwise csv")
+    parser.add_argument('--strict', action='store_true', help="fail on malformed lines")
+    args = parser.parse_args(argv)
+
+    n_rounds = stream_score_file(args.source, args.destination, args.format, strict=args.strict)
+    print(f"Wrote a report of {n_rounds} rounds to {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+"""
+Local scoring service for tournaments.
+
+Scorers submit rounds over HTTP as they finish; every round is folded into
+a golf_incremental.IncrementalStats, so the statistics always match what
+analyze_scores would print for the same rounds. Clients connected on the
+WebSocket endpoint receive the leaderboard and hole difficulty whenever
+they change (at most every push interval, however fast rounds arrive).
+
+    python golf_service.py serve --port 8765
+    python golf_service.py bench --rounds 20000    # in-process load test
+
+Endpoints (all JSON):
+
+    POST /rounds       {"player": "Ann", "scores": [3, 2, ...]}, a list of
+                       those, or text/plain lines in golf_scores.txt format
+    GET  /leaderboard  top rounds by total with countback tie-breaks (?k=N),
+                       or one round's rank with ?player=NAME
+    GET  /holes        hole averages with the hardest and easiest hole
+    GET  /stats        the full analysis, as compute_analysis returns it
+    GET  /ws           WebSocket stream of {"type": "update", ...} messages
+
+Only the Python standard library and NumPy are used; the HTTP and
+WebSocket handling is deliberately minimal and meant for a trusted local
+network.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from golf_engine import countback_sums, padded_matrix
+from golf_incremental import IncrementalStats
+from golf_leaderboard import Leaderboard
+from golf_parser import ScoreParseError, parse_score_lines
+
+DEFAULT_PORT = 8765
+DEFAULT_TOP_K = 10
+PUSH_INTERVAL = 0.1
+MAX_BODY = 16 * 1024 * 1024
+MAX_SCORE = 255
+# A WebSocket client that falls this far behind is disconnected
+MAX_CLIENT_BUFFER = 1024 * 1024
+
+_WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class SubmissionError(ValueError):
+    """A submitted round that cannot be scored."""
+
+
+def parse_submission(body, content_type='application/json'):
+    """
+    Turn a POST /rounds body into ([names], offsets, scores) CSR arrays.
+    Accepts JSON ({"player", "scores"} or a list of them) or text lines in
+    the score file format.
+    """
+    if content_type.startswith('text/plain'):
+        try:
+            text = body.decode('utf-8')
+        except UnicodeDecodeError as error:
+            raise SubmissionError(f"body is not UTF-8: {error}")
+        try:
+            batches = list(parse_score_lines(text.splitlines(True), strict=True))
+        except ScoreParseError as error:
+            raise SubmissionError('; '.join(f"line {line}: {message}" for line, message in error.errors))
+        names = [name for batch in batches for name in batch.names]
+        lengths = np.concatenate([np.diff(batch.offsets) for batch in batches]) if batches else []
+        scores = np.concatenate([batch.scores for batch in batches]) if batches else []
+    else:
+        try:
+            payload = json.loads(body)
+        except ValueError as error:
+            raise SubmissionError(f"invalid JSON: {error}")
+        items = payload if isinstance(payload, list) else [payload]
+        names = []
+        lengths = []
+        values = []
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get('player'), str) \
+                    or not isinstance(item.get('scores'), list):
+                raise SubmissionError('each round needs a "player" name and a "scores" list')
+            names.append(item['player'].strip())
+            lengths.append(len(item['scores']))
+            values.extend(item['scores'])
+        if not all(type(value) is int for value in values):
+            raise SubmissionError("scores must be whole numbers")
+        # Checked before the conversion, which overflows beyond int64
+        if not all(1 <= value <= MAX_SCORE for value in values):
+            raise SubmissionError(f"scores must be between 1 and {MAX_SCORE}")
+        scores = np.array(values, dtype=np.int64)
+
+    lengths = np.asarray(lengths, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.int64)
+    if not names:
+        raise SubmissionError("no rounds submitted")
+    if any(not name for name in names):
+        raise SubmissionError("player names cannot be empty")
+    if (lengths == 0).any():
+        raise SubmissionError("a round needs at least one score")
+    if scores.size and (scores.min() < 1 or scores.max() > MAX_SCORE):
+        raise SubmissionError(f"scores must be between 1 and {MAX_SCORE}")
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return names, offsets, scores
+
+
+def _websocket_frame(payload, opcode=0x1):
+    header = bytes([0x80 | opcode])
+    size = len(payload)
+    if size < 126:
+        header += bytes([size])
+    elif size < 1 << 16:
+        header += bytes([126]) + struct.pack('>H', size)
+    else:
+        header += bytes([127]) + struct.pack('>Q', size)
+    return header + payload
+
+
+async def _read_websocket_frame(reader):
+    """Read one frame; returns (opcode, payload), unmasking client frames."""
+    first, second = await reader.readexactly(2)
+    size = second & 0x7F
+    if size == 126:
+        size = struct.unpack('>H', await reader.readexactly(2))[0]
+    elif size == 127:
+        size = struct.unpack('>Q', await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(size)
+    if mask:
+        payload = bytes(np.frombuffer(payload, dtype=np.uint8) ^ np.resize(np.frombuffer(mask, np.uint8), size))
+    return first & 0x0F, payload
+
+
+async def _read_message(reader):
+    """
+    Read an HTTP/1.1 request or response; returns (start line, headers,
+    body) or None at end of stream.
+    """
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            key, _, value = line.partition(':')
+            headers[key.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY:
+        raise SubmissionError("request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return lines[0], headers, body
+
+
+class ScoringService:
+    """
+    Live statistics for submitted rounds plus the HTTP/WebSocket front end.
+    submit() can also be called directly when embedding the service.
+    """
+
+    def __init__(self, top_k=DEFAULT_TOP_K, push_interval=PUSH_INTERVAL):
+        self.stats = IncrementalStats()
+        self.board = Leaderboard()
+        self.top_k = top_k
+        self.push_interval = push_interval
+        self.submissions = 0
+        self._pending = []
+        self._pending_rounds = 0
+        self._flush_scheduled = False
+        self._clients = set()
+        self._changed = None
+        self._pusher = None
+
+    def submit(self, names, offsets, scores):
+        """
+        Add rounds in CSR form; returns the number of rounds added.
+
+        Inside a running event loop, submissions are queued and folded into
+        the statistics together once per loop iteration, so a burst of
+        single-round requests costs one vectorised update instead of one
+        each. Every read flushes first.
+        """
+        self._pending.append((names, offsets, scores))
+        self._pending_rounds += len(names)
+        self.submissions += 1
+        if not self._flush_scheduled:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.flush()
+            else:
+                loop.call_soon(self.flush)
+                self._flush_scheduled = True
+        return len(names)
+
+    @property
+    def n_rounds(self):
+        return self.stats.n_rounds + self._pending_rounds
+
+    def flush(self):
+        """Fold queued submissions into the statistics."""
+        self._flush_scheduled = False
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        self._pending_rounds = 0
+        if len(pending) == 1:
+            names, offsets, scores = pending[0]
+        else:
+            names = [name for batch_names, _, _ in pending for name in batch_names]
+            lengths = np.concatenate([np.diff(offsets) for _, offsets, _ in pending])
+            offsets = np.zeros(lengths.size + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            scores = np.concatenate([scores for _, _, scores in pending])
+        labels = self.stats.add_rounds(names, offsets, scores)
+        matrix = padded_matrix(offsets, scores)
+        totals = np.nansum(matrix, axis=1).astype(np.int64).tolist()
+        for label, total, countback in zip(labels, totals, countback_sums(matrix).tolist()):
+            self.board.update(label, sums=(total, *countback))
+        if self._changed is not None:
+            self._changed.set()
+
+    def leaderboard(self, k=None):
+        """The k best rounds as [(player, total)], ties broken by countback."""
+        self.flush()
+        return self.board.top(self.top_k if k is None else k)
+
+    def holes(self):
+        self.flush()
+        averages = self.stats.hole_mean.tolist()
+        if not averages:
+            return {'hole_averages': [], 'hardest_hole': None, 'easiest_hole': None}
+        hardest = int(np.argmax(self.stats.hole_mean))
+        easiest = int(np.argmin(self.stats.hole_mean))
+        return {
+            'hole_averages': averages,
+            'hardest_hole': [hardest + 1, averages[hardest]],
+            'easiest_hole': [easiest + 1, averages[easiest]],
+        }
+
+    def update_message(self):
+        leaderboard = self.leaderboard()
+        return dict({'type': 'update', 'rounds': self.stats.n_rounds, 'leaderboard': leaderboard},
+                    **self.holes())
+
+    # HTTP
+
+    def _respond(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+                     + body)
+
+    def _route(self, method, target, headers, body):
+        url = urlsplit(target)
+        if url.path == '/rounds':
+            if method != 'POST':
+                return 405, {'error': 'use POST'}
+            try:
+                added = self.submit(*parse_submission(body, headers.get('content-type', 'application/json')))
+            except SubmissionError as error:
+                return 400, {'error': str(error)}
+            return 200, {'accepted': added, 'rounds': self.n_rounds}
+        if method != 'GET':
+            return 405, {'error': 'use GET'}
+        if url.path == '/leaderboard':
+            query = parse_qs(url.query)
+            try:
+                k = int(query['k'][0]) if 'k' in query else None
+            except ValueError:
+                return 400, {'error': 'k must be a whole number'}
+            if 'player' in query:
+                self.flush()
+                player = query['player'][0]
+                if player not in self.board:
+                    return 404, {'error': f"no rounds for {player}"}
+                return 200, {'player': player, 'rank': self.board.rank(player),
+                             'total': self.board.total(player), 'rounds': self.stats.n_rounds}
+            leaderboard = self.leaderboard(k)
+            return 200, {'rounds': self.stats.n_rounds, 'leaderboard': leaderboard}
+        if url.path == '/holes':
+            return 200, self.holes()
+        if url.path == '/stats':
+            from crazy_golf_analysis import analysis_to_json
+
+            self.flush()
+            return 200, json.loads(analysis_to_json(self.stats.report()))
+        return 404, {'error': f"no such endpoint: {url.path}"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_message(reader)
+                except SubmissionError as error:
+                    self._respond(writer, 413, {'error': str(error)}, keep_alive=False)
+                    break
+                except (ValueError, asyncio.LimitOverrunError):
+                    self._respond(writer, 400, {'error': 'malformed request'}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                start_line, headers, body = request
+                try:
+                    method, target, _ = start_line.split(' ', 2)
+                except ValueError:
+                    self._respond(writer, 400, {'error': 'malformed request line'}, keep_alive=False)
+                    break
+                if urlsplit(target).path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                    await self._websocket(reader, writer, headers)
+                    break
+                try:
+                    status, payload = self._route(method, target, headers, body)
+                except Exception as error:
+                    # A bug in one request must not leave the client without an answer
+                    status, payload = 500, {'error': f"internal error: {type(error).__name__}: {error}"}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # WebSocket
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get('sec-websocket-key', '').encode('latin-1')
+        accept = base64.b64encode(hashlib.sha1(key + _WEBSOCKET_GUID).digest()).decode('ascii')
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                      f"Connection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n").encode('latin-1'))
+        writer.write(_websocket_frame(json.dumps(self.update_message()).encode('utf-8')))
+        await writer.drain()
+        self._clients.add(writer)
+        try:
+            while True:
+                opcode, payload = await _read_websocket_frame(reader)
+                if opcode == 0x8:
+                    writer.write(_websocket_frame(payload[:2], opcode=0x8))
+                    break
+                if opcode == 0x9:
+                    writer.write(_websocket_frame(payload, opcode=0xA))
+        finally:
+            self._clients.discard(writer)
+
+    async def _push_updates(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            if self._clients:
+                frame = _websocket_frame(json.dumps(self.update_message()).encode('utf-8'))
+                for client in list(self._clients):
+                    if client.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                        self._clients.discard(client)
+                        client.close()
+                    else:
+                        client.write(frame)
+            await asyncio.sleep(self.push_interval)
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """Start listening and pushing updates; returns the asyncio Server."""
+        self._changed = asyncio.Event()
+        self._pusher = asyncio.ensure_future(self._push_updates())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        server.pusher = self._pusher
+        return server
+
+    async def stop(self, server):
+        server.close()
+        self._pusher.cancel()
+        for client in list(self._clients):
+            client.close()
+        # Let the WebSocket handlers see their connections close
+        await asyncio.sleep(0)
+        await server.wait_closed()
+
+
+class ScoringClient:
+    """Minimal keep-alive HTTP client for the service, for scripts and tests."""
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self._reader = self._writer = None
+
+    async def _request(self, method, path, body=b'', content_type='application/json'):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                           f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n"
+                           .encode('latin-1') + body)
+        status_line, _, payload = await _read_message(self._reader)
+        return int(status_line.split(' ', 2)[1]), json.loads(payload)
+
+    async def submit(self, player, scores):
+        return await self._request('POST', '/rounds', json.dumps({'player': player, 'scores': scores}).encode())
+
+    async def submit_text(self, text):
+        return await self._request('POST', '/rounds', text.encode('utf-8'), 'text/plain')
+
+    async def get(self, path):
+        return await self._request('GET', path)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+async def websocket_updates(host='127.0.0.1', port=DEFAULT_PORT):
+    """Connect to /ws and yield each update message as a dict."""
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode('ascii')
+    writer.write((f"GET /ws HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode('latin-1'))
+    try:
+        status = await reader.readuntil(b'\r\n\r\n')
+        if b' 101 ' not in status.split(b'\r\n', 1)[0]:
+            raise ConnectionError("WebSocket upgrade refused")
+        while True:
+            opcode, payload = await _read_websocket_frame(reader)
+            if opcode == 0x8:
+                return
+            if opcode == 0x1:
+                yield json.loads(payload)
+    finally:
+        writer.close()
+
+
+async def run_benchmark(n_rounds=20000, clients=50, n_holes=18, seed=0):
+    """
+    Start a service in this process and submit n_rounds single-round
+    requests over `clients` keep-alive connections while a WebSocket client
+    listens. Returns submissions per second, the update count and the
+    final leaderboard. Checks the result against compute_analysis.
+    """
+    from golf_engine import compute_analysis
+    from golf_parser import round_label
+
+    rng = np.random.default_rng(seed)
+    scores = rng.integers(1, 7, (n_rounds, n_holes)).tolist()
+    names = [f"Player {i % 500 + 1}" for i in range(n_rounds)]
+
+    service = ScoringService()
+    server = await service.start('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    updates = []
+
+    async def listen():
+        async for message in websocket_updates('127.0.0.1', port):
+            updates.append(message)
+
+    listener = asyncio.ensure_future(listen())
+    await asyncio.sleep(0.05)
+
+    async def scorer(worker):
+        client = ScoringClient('127.0.0.1', port)
+        for i in range(worker, n_rounds, clients):
+            status, reply = await client.submit(names[i], scores[i])
+            if status != 200:
+                raise RuntimeError(reply)
+        await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(scorer(worker) for worker in range(clients)))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(service.push_interval * 2)
+    listener.cancel()
+    await service.stop(server)
+
+    # Concurrent clients may interleave one player's rounds differently from
+    # the list, so compare the round totals as a whole
+    service.flush()
+    report = service.stats.report()
+    counts = {}
+    expected = {}
+    for name, row in zip(names, scores):
+        counts[name] = counts.get(name, 0) + 1
+        expected[round_label(name, counts[name])] = row
+    full = compute_analysis(expected)
+    totals_match = (sorted(total for _, total in report['rankings'])
+                    == sorted(total for _, total in full['rankings']))
+    return {
+        'benchmark': 'service',
+        'rounds': n_rounds,
+        'clients': clients,
+        'seconds': elapsed,
+        'submissions_per_second': n_rounds / elapsed,
+        'websocket_updates': len(updates),
+        'hole_averages_match': bool(np.allclose(report['hole_averages'], full['hole_averages'])),
+        'totals_match': totals_match,
+        'leaderboard': service.leaderboard(5),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crazy golf live scoring service")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="run the service")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve.add_argument('--top', type=int, default=DEFAULT_TOP_K, help="leaderboard size pushed to clients")
+
+    bench = commands.add_parser('bench', help="load-test an in-process service with local clients")
+    bench.add_argument('--rounds', type=int, default=20000)
+    bench.add_argument('--clients', type=int, default=50)
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        async def serve_forever():
+            service = ScoringService(top_k=args.top)
+            server = await service.start(args.host, args.port)
+            print(f"Scoring service on http://{args.host}:{args.port} (WebSocket: /ws)")
+            async with server:
+                await server.serve_forever()
+
+        try:
+            asyncio.run(serve_forever())
+        except KeyboardInterrupt:
+            pass
+    else:
+        results = asyncio.run(run_benchmark(args.rounds, args.clients))
+        print(f"{results['rounds']} rounds from {results['clients']} clients in {results['seconds']:.2f}s: "
+              f"{results['submissions_per_second']:.0f} submissions/s, "
+              f"{results['websocket_updates']} WebSocket updates")
+        print(f"Matches a full analysis: totals {results['totals_match']}, "
+              f"hole averages {results['hole_averages_match']}")
+
+
+if __name__ == "__main__":
+    main()
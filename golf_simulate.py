@@ -0,0 +1,258 @@
+"""
+Monte Carlo tournament simulator.
+
+Every player's hole scores are drawn from their own empirical score
+distribution: the score-frequency counts behind the frequency heatmap,
+pooled over all of the player's rounds, or with per_hole=True one
+distribution per hole, smoothed towards the player's overall one. Because
+holes are drawn independently, a player's round total follows the
+convolution of those distributions over the course, so each simulated
+round costs one alias-table draw per player rather than one per hole.
+
+Simulations run in chunks small enough to stay in cache; every chunk is
+reduced straight away to win shares, rank sums and a per-player histogram
+of totals, so 1,000 players x 1,000,000 tournaments never exist as one
+array. Chunk i always uses the i-th child of the seed, so results depend
+on the seed only, never on the number of workers:
+
+    python golf_simulate.py golf_scores.txt --simulations 1000000 --workers 8 --seed 1
+"""
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from golf_analytics import score_frequencies
+from golf_engine import score_matrix
+from golf_parser import pooled_rows
+
+DEFAULT_SIMULATIONS = 100000
+DEFAULT_SMOOTHING = 2.0
+PERCENTILES = (5, 25, 50, 75, 95)
+# Player-simulations per chunk: every per-chunk array is sims x players,
+# whatever the range of round totals, so a chunk takes a few tens of MB at most
+CHUNK_ELEMENTS = 1 << 20
+
+
+def player_distributions(scores, per_hole=False, smoothing=DEFAULT_SMOOTHING):
+    """
+    Empirical hole-score distributions from a {player: [scores]} mapping.
+    Rounds of the same player ('Name (round 2)', ...) are pooled.
+
+    Returns (players, n_holes, pmf): pmf[p, v - 1] is the chance of
+    player p taking v strokes on a hole, or with per_hole=True
+    pmf[p, h, v - 1] the chance on hole h + 1. Per-hole counts are mixed
+    with smoothing holes' worth of the player's overall distribution so a
+    hole played once does not become a certainty.
+    """
+    _, matrix = score_matrix(scores)
+    players, rows = pooled_rows(scores)
+    max_score = int(np.nanmax(matrix))
+    n_players = len(players)
+    n_holes = matrix.shape[1]
+
+    # The heatmap's per-round frequencies, with no "max+" bucket, pooled by player
+    counts = np.zeros((n_players, max_score))
+    np.add.at(counts, rows, score_frequencies(matrix, max_score)[:, :max_score])
+    overall = counts / counts.sum(axis=1, keepdims=True)
+    if not per_hole:
+        return players, n_holes, overall
+
+    round_ids, holes = np.nonzero(~np.isnan(matrix))
+    values = np.clip(matrix[round_ids, holes], 1, max_score).astype(np.int64) - 1
+    cells = (rows[round_ids] * n_holes + holes) * max_score + values
+    hole_counts = np.bincount(cells, minlength=n_players * n_holes * max_score).reshape(
+        n_players, n_holes, max_score)
+    mixed = hole_counts + smoothing * overall[:, None, :]
+    return players, n_holes, mixed / mixed.sum(axis=2, keepdims=True)
+
+
+def total_distributions(pmf, n_holes):
+    """
+    Round-total distributions: totals[p, t] is the chance of player p
+    finishing the n_holes-hole round in t strokes.
+    """
+    n_players = pmf.shape[0]
+    per_hole = pmf.ndim == 3
+    max_score = pmf.shape[-1]
+    totals = np.zeros((n_players, n_holes * max_score + 1))
+    totals[:, 0] = 1.0
+    width = 1
+    for hole in range(n_holes):
+        hole_pmf = pmf[:, hole] if per_hole else pmf
+        # Convolve every player's running total with this hole's 1..max_score strokes
+        shifted = np.zeros((n_players, width + max_score))
+        for value in range(max_score):
+            shifted[:, value + 1:value + 1 + width] += totals[:, :width] * hole_pmf[:, value, None]
+        width += max_score
+        totals[:, :width] = shifted
+    return totals
+
+
+def alias_tables(pmf):
+    """
+    Walker/Vose alias tables for each row of pmf: a draw is bin k with
+    probability prob[p, k], else alias[p, k], for k uniform.
+    """
+    n_rows, n_bins = pmf.shape
+    prob = np.ones((n_rows, n_bins))
+    alias = np.tile(np.arange(n_bins), (n_rows, 1))
+    scaled = pmf * n_bins / pmf.sum(axis=1, keepdims=True)
+    for row in range(n_rows):
+        weights = scaled[row].tolist()
+        small = [k for k, weight in enumerate(weights) if weight < 1.0]
+        large = [k for k, weight in enumerate(weights) if weight >= 1.0]
+        row_prob = prob[row]
+        row_alias = alias[row]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            row_prob[less] = weights[less]
+            row_alias[less] = more
+            weights[more] -= 1.0 - weights[less]
+            (small if weights[more] < 1.0 else large).append(more)
+    return prob, alias
+
+
+def _simulate_chunks(job):
+    """
+    Worker entry point: run chunks of tournaments and reduce them to
+    (win shares per chunk, rank sums, total histograms).
+    """
+    prob, alias, seeds, chunk_sims, n_simulations, first_chunk = job
+    n_players, n_bins = prob.shape
+    wins = np.zeros((len(seeds), n_players))
+    rank_sums = np.zeros(n_players, dtype=np.int64)
+    histograms = np.zeros(n_players * n_bins, dtype=np.int64)
+    players = np.arange(n_players)
+
+    for offset, seed in enumerate(seeds):
+        sims = min(chunk_sims, n_simulations - (first_chunk + offset) * chunk_sims)
+        draws = np.random.default_rng(seed).random((sims, n_players)) * n_bins
+        bins = draws.astype(np.int64)
+        # The fraction left over is itself uniform: use it for the alias test
+        keep = (draws - bins) < prob[players, bins]
+        totals = np.where(keep, bins, alias[players, bins])
+
+        # Rank by sorting each tournament: 1 + the number of players with a
+        # lower total, i.e. the sorted position where a run of ties starts
+        order = np.argsort(totals, axis=1)
+        ordered = np.take_along_axis(totals, order, axis=1)
+        starts = np.zeros((sims, n_players), dtype=np.int64)
+        starts[:, 1:] = np.where(ordered[:, 1:] != ordered[:, :-1], players[1:], 0)
+        np.maximum.accumulate(starts, axis=1, out=starts)
+        ranks = np.empty_like(starts)
+        np.put_along_axis(ranks, order, starts + 1, axis=1)
+        rank_sums += ranks.sum(axis=0)
+
+        # Players tied for the lowest total share the win
+        leaders = totals == ordered[:, :1]
+        wins[offset] = (leaders / leaders.sum(axis=1, keepdims=True)).sum(axis=0)
+        histograms += np.bincount((players * n_bins + totals).ravel(), minlength=n_players * n_bins)
+    return wins, rank_sums, histograms.reshape(n_players, n_bins)
+
+
+def _percentiles(histograms, quantiles):
+    """Percentiles of each row's distribution of totals (lower nearest value)."""
+    cumulative = np.cumsum(histograms, axis=1)
+    targets = np.asarray(quantiles, dtype=float)[:, None] / 100 * cumulative[:, -1]
+    return {q: (cumulative < targets[i][:, None]).sum(axis=1) for i, q in enumerate(quantiles)}
+
+
+def simulate_tournament(scores, n_simulations=DEFAULT_SIMULATIONS, per_hole=False, seed=0, workers=None,
+                        smoothing=DEFAULT_SMOOTHING, chunk_elements=CHUNK_ELEMENTS):
+    """
+    Play n_simulations tournaments of one round each between every player
+    in scores. workers=1 runs in this process; otherwise chunks are spread
+    over a ProcessPoolExecutor.
+
+    Returns a dict with 'players', 'simulations', 'n_holes' and per-player
+    arrays 'win_probability' (ties for first share the win),
+    'expected_rank' (1 + players with a strictly lower total),
+    'expected_score' and 'percentiles' ({q: totals} for PERCENTILES).
+    """
+    if n_simulations < 1:
+        raise ValueError(f"n_simulations must be at least 1, got {n_simulations}")
+    if workers is not None and workers < 1:
+        raise ValueError(f"workers must be at least 1 or None, got {workers}")
+    players, n_holes, pmf = player_distributions(scores, per_hole, smoothing)
+    totals = total_distributions(pmf, n_holes)
+    prob, alias = alias_tables(totals)
+
+    n_players = len(players)
+    chunk_sims = max(1, chunk_elements // n_players)
+    n_chunks = -(-n_simulations // chunk_sims)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    n_jobs = 1 if workers == 1 else min(n_chunks, workers or os.cpu_count() or 1)
+    bounds = np.linspace(0, n_chunks, n_jobs + 1).astype(int).tolist()
+    jobs = [(prob, alias, seeds[start:stop], chunk_sims, n_simulations, start)
+            for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+    if len(jobs) == 1:
+        partials = [_simulate_chunks(jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+            partials = list(executor.map(_simulate_chunks, jobs))
+    # Win shares are fractions: add them chunk by chunk, in order, so the
+    # float sum does not depend on how chunks were split between workers
+    wins = np.zeros(len(players))
+    for chunk_wins in itertools.chain.from_iterable(partial[0] for partial in partials):
+        wins += chunk_wins
+    rank_sums = sum(partial[1] for partial in partials)
+    histograms = sum(partial[2] for partial in partials)
+
+    return {
+        'players': players,
+        'simulations': n_simulations,
+        'n_holes': n_holes,
+        'win_probability': wins / n_simulations,
+        'expected_rank': rank_sums / n_simulations,
+        'expected_score': histograms @ np.arange(histograms.shape[1]) / n_simulations,
+        'percentiles': _percentiles(histograms, PERCENTILES),
+    }
+
+
+def print_simulation(simulation, top=None):
+    order = np.lexsort((simulation['expected_rank'], -simulation['win_probability']))
+    percentiles = simulation['percentiles']
+    header = ' / '.join(f"p{q}" for q in percentiles)
+    lines = [f"TOURNAMENT SIMULATION ({simulation['simulations']:,} simulated {simulation['n_holes']}-hole rounds):",
+             f"Player: win chance, expected rank, expected score ({header})"]
+    for i in order[:top].tolist():
+        spread = ' / '.join(str(int(values[i])) for values in percentiles.values())
+        lines.append(f"{simulation['players'][i]}: {simulation['win_probability'][i]:.1%}, "
+                     f"rank {simulation['expected_rank'][i]:.2f}, "
+                     f"score {simulation['expected_score'][i]:.1f} ({spread})")
+    print('\n'.join(lines))
+
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def main(argv=None):
+    from crazy_golf_analysis import load_scores
+
+    parser = argparse.ArgumentParser(description="Monte Carlo crazy golf tournament simulator")
+    parser.add_argument('scores_file', nargs='?', default='golf_scores.txt')
+    parser.add_argument('--simulations', type=positive_int, default=DEFAULT_SIMULATIONS)
+    parser.add_argument('--per-hole', action='store_true',
+                        help="use each player's per-hole distributions instead of one per player")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=positive_int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument('--top', type=int, default=None, help="players to list")
+    args = parser.parse_args(argv)
+
+    simulation = simulate_tournament(load_scores(args.scores_file), args.simulations, args.per_hole,
+                                     args.seed, args.workers)
+    print_simulation(simulation, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,543 @@
+"""
+Mergeable score-distribution sketches: medians, p90/p99 and most common
+scores per player and per hole, in constant memory per player and hole.
+
+Hole scores are small integers, so a sketch is mostly an exact histogram
+of the scores 0..EXACT_VALUES - 1: quantiles read from it are exactly
+np.quantile's, and merging is adding counts. Anything else (a 70 on a
+windmill, a fractional handicap-adjusted score) goes to a t-digest in
+O(compression) memory. Up to compression scores it holds them exactly;
+beyond that its quantiles sit within a small fraction of a percentile of
+the requested rank (see TDigest). Sketches are built per file or per
+worker, saved as JSON and merged in any grouping:
+
+    python golf_sketch.py build scores/ --out season.json --workers 8
+    python golf_sketch.py merge season.json extra.json --out all.json
+    python golf_sketch.py show all.json --player "Player 2" --hole 7
+"""
+import argparse
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from golf_parser import iter_score_batches, pooled_rows
+
+# Scores 0..EXACT_VALUES - 1 are counted exactly
+EXACT_VALUES = 64
+# Up to ~200 centroids: p99 of a heavy-tailed sample within ~2% of its value
+DEFAULT_COMPRESSION = 200
+# Buffered t-digest points, in multiples of the compression, before merging
+BUFFER_FACTOR = 20
+QUANTILES = {'median': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+
+def histogram_quantiles(counts, quantiles):
+    """
+    Quantiles of each row of a value histogram (counts[i, v] scores of v
+    in row i), interpolated like np.quantile's default. Returns an array
+    of shape (rows, len(quantiles)), NaN for empty rows.
+    """
+    counts = np.asarray(counts)
+    cumulative = np.cumsum(counts, axis=1)
+    n = cumulative[:, -1] if counts.shape[1] else np.zeros(counts.shape[0], dtype=np.int64)
+    result = np.full((counts.shape[0], len(quantiles)), math.nan)
+    for column, q in enumerate(quantiles):
+        position = q * (n - 1)
+        lower = np.floor(position)
+        # The value at sorted index k is the number of values whose running count is <= k
+        below = (cumulative <= lower[:, None]).sum(axis=1)
+        above = (cumulative <= np.ceil(position)[:, None]).sum(axis=1)
+        result[:, column] = below + (position - lower) * (above - below)
+    result[n == 0] = math.nan
+    return result
+
+
+def _weighted_quantile(values, weights, q):
+    """np.quantile's default interpolation over sorted values[i] repeated weights[i] times."""
+    cumulative = np.cumsum(weights)
+    position = q * (cumulative[-1] - 1)
+    lower = math.floor(position)
+    last = values.size - 1
+    below = values[min(int(np.searchsorted(cumulative, lower, side='right')), last)]
+    above = values[min(int(np.searchsorted(cumulative, math.ceil(position), side='right')), last)]
+    return float(below + (position - lower) * (above - below))
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning): weighted centroids, small at the tails and
+    larger in the middle. The guarantee is on rank: at the default
+    compression quantile(q) is a value whose rank is within about 0.2
+    percentile of q around the median and a few hundredths of a percentile
+    from p99 outwards. Far out in a long, sparse tail one centroid spans a
+    wide range of values, so p99.9 of a heavy-tailed sample can still be
+    several percent off in value; raise the compression if that matters.
+    Up to compression points in all are kept exactly, one centroid per
+    distinct value, and quantile() then interpolates like np.quantile.
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+        self._buffered = 0
+
+    @property
+    def count(self):
+        return float(self.weights.sum()) + sum(float(weights.sum()) for _, weights in self._buffer)
+
+    def add(self, values, weights=None):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not values.size:
+            return
+        weights = np.ones(values.size) if weights is None else np.asarray(weights, dtype=np.float64).ravel()
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._buffer.append((values, weights))
+        self._buffered += values.size
+        if self._buffered > BUFFER_FACTOR * self.compression:
+            self._compress()
+
+    def merge(self, other):
+        """Add another digest's centroids into this one and return self."""
+        other._compress()
+        if other.weights.size:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._buffer.append((other.means, other.weights))
+            self._buffered += other.means.size
+            self._compress()
+        return self
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        means = np.concatenate([self.means] + [values for values, _ in self._buffer])
+        weights = np.concatenate([self.weights] + [weights for _, weights in self._buffer])
+        self._buffer = []
+        self._buffered = 0
+        if weights.sum() <= self.compression:
+            self.means, index = np.unique(means, return_inverse=True)
+            self.weights = np.bincount(index, weights=weights)
+            return
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+
+        # Points whose left edge falls in the same unit of the k1 scale
+        # function k(q) = compression / pi * asin(2q - 1) share a centroid,
+        # which leaves at most compression + 1 centroids
+        cumulative = np.cumsum(weights)
+        left = (cumulative - weights) / cumulative[-1]
+        k = np.floor(self.compression / math.pi * np.arcsin(np.clip(2 * left - 1, -1, 1)))
+        groups = np.cumsum(np.r_[True, k[1:] != k[:-1]]) - 1
+        self.weights = np.bincount(groups, weights=weights)
+        self.means = np.bincount(groups, weights=weights * means) / self.weights
+
+    def quantile(self, q):
+        self._compress()
+        if not self.weights.size:
+            return math.nan
+        total = self.weights.sum()
+        if total <= self.compression:
+            return _weighted_quantile(self.means, self.weights, q)
+        # Interpolate between centroid centres, pinned to the extremes at either end
+        centres = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * total, np.r_[0.0, centres, total], np.r_[self.min, self.means, self.max]))
+
+    def copy(self):
+        self._compress()
+        digest = TDigest(self.compression)
+        digest.means, digest.weights = self.means.copy(), self.weights.copy()
+        digest.min, digest.max = self.min, self.max
+        return digest
+
+    def to_dict(self):
+        self._compress()
+        return {'compression': self.compression, 'means': self.means.tolist(),
+                'weights': self.weights.tolist(), 'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        digest = cls(data['compression'])
+        digest.means = np.asarray(data['means'], dtype=np.float64)
+        digest.weights = np.asarray(data['weights'], dtype=np.float64)
+        digest.min, digest.max = data['min'], data['max']
+        return digest
+
+
+class ScoreSketch:
+    """
+    One score distribution: exact counts of the scores 0..EXACT_VALUES - 1
+    plus a TDigest (or None) for every other score.
+    """
+
+    def __init__(self, counts=None, digest=None):
+        self.counts = np.zeros(EXACT_VALUES, dtype=np.int64) if counts is None else counts
+        self.digest = digest
+
+    @property
+    def count(self):
+        return int(self.counts.sum()) + (int(round(self.digest.count)) if self.digest is not None else 0)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        exact = _exact(values)
+        self.counts += np.bincount(values[exact].astype(np.int64), minlength=EXACT_VALUES)
+        if not exact.all():
+            if self.digest is None:
+                self.digest = TDigest()
+            self.digest.add(values[~exact])
+
+    def merge(self, other):
+        self.counts += other.counts
+        if other.digest is not None:
+            self.digest = (self.digest or TDigest(other.digest.compression)).merge(other.digest)
+        return self
+
+    def quantile(self, q):
+        """
+        Exact while every score was a small integer or there are at most
+        the digest's compression scores in all, otherwise t-digest.
+        """
+        if self.digest is None:
+            return float(histogram_quantiles(self.counts[None, :], [q])[0, 0])
+        combined = self.digest.copy()
+        values = np.flatnonzero(self.counts)
+        combined.add(values, self.counts[values])
+        return combined.quantile(q)
+
+    def mode(self):
+        """The most common score (the lowest of equals); only exactly counted scores compete."""
+        if self.counts.any():
+            return int(np.argmax(self.counts))
+        if self.digest is not None and self.digest.count:
+            self.digest._compress()
+            return float(self.digest.means[np.argmax(self.digest.weights)])
+        return None
+
+    def summary(self):
+        entry = {'scores': self.count}
+        entry.update((name, self.quantile(q)) for name, q in QUANTILES.items())
+        entry['mode'] = self.mode()
+        return entry
+
+
+def _exact(values):
+    return (values >= 0) & (values < EXACT_VALUES) & (values == np.floor(values))
+
+
+def _exact_mask(values):
+    """_exact(values), or None when every value is exact."""
+    exact = _exact(values)
+    return None if exact.all() else exact
+
+
+def _grow(counts, rows):
+    if rows <= counts.shape[0]:
+        return counts
+    return np.vstack([counts, np.zeros((rows - counts.shape[0], EXACT_VALUES), dtype=np.int64)])
+
+
+class SketchSet:
+    """
+    A ScoreSketch per player and per hole. The exact counts live in two
+    dense arrays (player_counts indexed like ``players``, hole_counts by
+    hole - 1); t-digests exist only for players and holes that had a score
+    outside the exact range.
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.players = []
+        self._player_index = {}
+        self.player_counts = np.zeros((0, EXACT_VALUES), dtype=np.int64)
+        self.hole_counts = np.zeros((0, EXACT_VALUES), dtype=np.int64)
+        self.player_digests = {}
+        self.hole_digests = {}
+
+    def _player_ids(self, names):
+        index = self._player_index
+        ids = np.fromiter((index.setdefault(name, len(index)) for name in names),
+                          dtype=np.int64, count=len(names))
+        self.players = list(index)
+        self.player_counts = _grow(self.player_counts, len(index))
+        return ids
+
+    def _add(self, counts, digests, ids, values, weights, exact):
+        """
+        Count values (weights times each) into the rows ids of counts;
+        exact is _exact_mask(values), and values outside it go to digests.
+        """
+        if exact is not None:
+            outside = ~exact
+            self._add_digests(digests, ids[outside], values[outside],
+                              None if weights is None else weights[outside])
+            ids, values = ids[exact], values[exact]
+            weights = None if weights is None else weights[exact]
+        counts += np.bincount(ids * EXACT_VALUES + values.astype(np.int64), weights=weights,
+                              minlength=counts.size).astype(np.int64).reshape(counts.shape)
+
+    def _add_digests(self, digests, ids, values, weights):
+        order = np.argsort(ids, kind='stable')
+        starts = np.flatnonzero(np.r_[True, np.diff(ids[order]) != 0])
+        for group in np.split(order, starts[1:]):
+            digest = digests.setdefault(int(ids[group[0]]), TDigest(self.compression))
+            digest.add(values[group], None if weights is None else weights[group])
+
+    def add_values(self, player_ids, holes, values, weights=None):
+        """
+        Add scores given as parallel arrays: player indices (from
+        _player_ids), hole indices from 0 and score values, each counted
+        weights times (default once).
+        """
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        holes = np.asarray(holes, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+        if holes.size:
+            self.hole_counts = _grow(self.hole_counts, int(holes.max()) + 1)
+        exact = _exact_mask(values)
+        self._add(self.player_counts, self.player_digests, player_ids, values, weights, exact)
+        self._add(self.hole_counts, self.hole_digests, holes, values, weights, exact)
+
+    def add_batch(self, batch):
+        """Fold in a golf_parser.ScoreBatch."""
+        if not batch.names:
+            return
+        lengths = np.diff(batch.offsets)
+        player_ids = np.repeat(self._player_ids(batch.names), lengths)
+        holes = np.arange(batch.scores.size) - np.repeat(batch.offsets[:-1], lengths)
+        self.add_values(player_ids, holes, batch.scores)
+
+    def add_matrix(self, labels, matrix, pooled=None):
+        """
+        Fold in a golf_engine score matrix; rounds of the same player are
+        pooled. pooled is golf_parser.pooled_rows(labels), if already known.
+        """
+        players, row_players = pooled or pooled_rows(labels)
+        row_players = self._player_ids(players)[row_players]
+        rows, cols = np.nonzero(~np.isnan(matrix))
+        self.add_values(row_players[rows], cols, matrix[rows, cols])
+
+    def add_scores(self, scores):
+        """Fold in a {player: [scores]} mapping."""
+        from golf_engine import score_matrix
+
+        self.add_matrix(*score_matrix(scores), pooled_rows(scores))
+
+    def add_player_counts(self, names, values, counts):
+        """Add counts[i] scores of values[i] by player names[i]."""
+        ids = self._player_ids(names)
+        values = np.asarray(values, dtype=np.float64)
+        self._add(self.player_counts, self.player_digests, ids, values,
+                  np.asarray(counts, dtype=np.float64), _exact_mask(values))
+
+    def add_hole_counts(self, holes, values, counts):
+        """Add counts[i] scores of values[i] on hole holes[i] (numbered from 1)."""
+        holes = np.asarray(holes, dtype=np.int64) - 1
+        if holes.size:
+            self.hole_counts = _grow(self.hole_counts, int(holes.max()) + 1)
+        values = np.asarray(values, dtype=np.float64)
+        self._add(self.hole_counts, self.hole_digests, holes, values,
+                  np.asarray(counts, dtype=np.float64), _exact_mask(values))
+
+    def add_histograms(self, players, player_hist, hole_hist):
+        """
+        Fold in value histograms (player_hist[i, v] scores of v by
+        players[i], hole_hist[h, v] on hole h + 1), such as those of
+        golf_batch.PartialAggregate.
+        """
+        self._player_ids(players)
+        self.hole_counts = _grow(self.hole_counts, len(hole_hist))
+        rows, values = np.nonzero(player_hist)
+        self.add_player_counts([players[row] for row in rows.tolist()], values, player_hist[rows, values])
+        rows, values = np.nonzero(hole_hist)
+        self.add_hole_counts(rows + 1, values, hole_hist[rows, values])
+
+    def merge(self, other):
+        """Add another SketchSet into this one in place and return self."""
+        mapping = self._player_ids(other.players)
+        np.add.at(self.player_counts, mapping, other.player_counts)
+        self.hole_counts = _grow(self.hole_counts, other.hole_counts.shape[0])
+        self.hole_counts[:other.hole_counts.shape[0]] += other.hole_counts
+        for index, digest in other.player_digests.items():
+            player = int(mapping[index])
+            self.player_digests.setdefault(player, TDigest(self.compression)).merge(digest)
+        for hole, digest in other.hole_digests.items():
+            self.hole_digests.setdefault(hole, TDigest(self.compression)).merge(digest)
+        return self
+
+    def player(self, name):
+        index = self._player_index[name]
+        return ScoreSketch(self.player_counts[index].copy(), _copy(self.player_digests.get(index)))
+
+    def hole(self, number):
+        """The sketch of hole number (from 1)."""
+        return ScoreSketch(self.hole_counts[number - 1].copy(), _copy(self.hole_digests.get(number - 1)))
+
+    def _summaries(self, counts, digests):
+        quantiles = histogram_quantiles(counts, list(QUANTILES.values())).tolist()
+        totals = counts.sum(axis=1).tolist()
+        modes = np.argmax(counts, axis=1).tolist()
+        entries = []
+        for i, total in enumerate(totals):
+            if i in digests:
+                entries.append(ScoreSketch(counts[i], digests[i]).summary())
+                continue
+            entry = {'scores': total}
+            entry.update(zip(QUANTILES, quantiles[i]))
+            entry['mode'] = modes[i] if total else None
+            entries.append(entry)
+        return entries
+
+    def summary(self):
+        """
+        {'players': {player: entry}, 'holes': [entry per hole]}, where an
+        entry holds the number of 'scores', the QUANTILES ('median', 'p90',
+        'p99') and the 'mode'.
+        """
+        return {
+            'players': dict(zip(self.players, self._summaries(self.player_counts, self.player_digests))),
+            'holes': self._summaries(self.hole_counts, self.hole_digests),
+        }
+
+    def to_dict(self):
+        # Trailing all-zero columns are dropped; from_dict pads them back
+        width = max(_width(self.player_counts), _width(self.hole_counts))
+        return {
+            'exact_values': EXACT_VALUES,
+            'compression': self.compression,
+            'players': self.players,
+            'player_counts': self.player_counts[:, :width].tolist(),
+            'hole_counts': self.hole_counts[:, :width].tolist(),
+            'player_digests': {str(i): digest.to_dict() for i, digest in self.player_digests.items()},
+            'hole_digests': {str(i): digest.to_dict() for i, digest in self.hole_digests.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data['exact_values'] != EXACT_VALUES:
+            raise ValueError(f"sketch counts scores below {data['exact_values']}, expected {EXACT_VALUES}")
+        sketches = cls(data['compression'])
+        sketches._player_ids(data['players'])
+        for name, rows in (('player_counts', data['player_counts']), ('hole_counts', data['hole_counts'])):
+            counts = _grow(np.zeros((0, EXACT_VALUES), dtype=np.int64), len(rows))
+            if rows:
+                counts[:, :len(rows[0])] = rows
+            setattr(sketches, name, counts)
+        sketches.player_digests = {int(i): TDigest.from_dict(d) for i, d in data['player_digests'].items()}
+        sketches.hole_digests = {int(i): TDigest.from_dict(d) for i, d in data['hole_digests'].items()}
+        return sketches
+
+
+def _copy(digest):
+    return digest.copy() if digest is not None else None
+
+
+def _width(counts):
+    columns = np.flatnonzero(counts.any(axis=0))
+    return int(columns[-1]) + 1 if columns.size else 0
+
+
+def save_sketches(sketches, path):
+    with open(path, 'w') as file:
+        json.dump(sketches.to_dict(), file)
+    return path
+
+
+def load_sketches(path):
+    with open(path, 'r') as file:
+        return SketchSet.from_dict(json.load(file))
+
+
+def sketch_file(path, strict=False):
+    """Worker entry point: stream one score file into a SketchSet."""
+    sketches = SketchSet()
+    for batch in iter_score_batches(path, strict=strict):
+        sketches.add_batch(batch)
+    return sketches
+
+
+def sketch_score_files(sources, workers=None, strict=False):
+    """
+    Build one SketchSet over every score file matched by sources
+    (directories or globs), a file per worker task, merged in file order.
+    Returns (sketches, files).
+    """
+    from golf_batch import find_score_files
+
+    files = find_score_files(sources)
+    if not files:
+        raise FileNotFoundError(f"No score files found in {', '.join(sources)}")
+    merged = SketchSet()
+    if workers == 1 or len(files) == 1:
+        for path in files:
+            merged.merge(sketch_file(path, strict))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for sketches in executor.map(sketch_file, files, [strict] * len(files)):
+                merged.merge(sketches)
+    return merged, files
+
+
+def _format(entry):
+    values = ' / '.join('-' if entry[name] is None or math.isnan(entry[name]) else f"{entry[name]:g}"
+                        for name in QUANTILES)
+    return f"{values}, most often {entry['mode']} ({entry['scores']} scores)"
+
+
+def distribution_lines(summary, players=None, holes=None):
+    """Console lines for a SketchSet.summary(), optionally only some players/holes."""
+    header = ' / '.join(QUANTILES)
+    lines = [f"HOLE SCORE DISTRIBUTION ({header}, most common score):"]
+    for hole, entry in enumerate(summary['holes'], 1):
+        if entry['scores'] and (holes is None or hole in holes):
+            lines.append(f"Hole {hole}: {_format(entry)}")
+    lines += ["", f"PLAYER SCORE DISTRIBUTION ({header}, most common score):"]
+    for player, entry in summary['players'].items():
+        if players is None or player in players:
+            lines.append(f"{player}: {_format(entry)}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mergeable per-player and per-hole score distribution sketches")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="sketch score files (directories or globs)")
+    build.add_argument('sources', nargs='+')
+    build.add_argument('--out', required=True, help="sketch JSON to write")
+    build.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    build.add_argument('--strict', action='store_true', help="fail on malformed lines")
+
+    merge = commands.add_parser('merge', help="merge saved sketches")
+    merge.add_argument('sketches', nargs='+')
+    merge.add_argument('--out', required=True)
+
+    show = commands.add_parser('show', help="print medians, p90, p99 and most common scores")
+    show.add_argument('sketch')
+    show.add_argument('--player', action='append', default=None, help="only this player (repeatable)")
+    show.add_argument('--hole', type=int, action='append', default=None, help="only this hole (repeatable)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        sketches, files = sketch_score_files(args.sources, workers=args.workers, strict=args.strict)
+        save_sketches(sketches, args.out)
+        print(f"Sketched {len(files)} score files into {args.out}")
+    elif args.command == 'merge':
+        merged = SketchSet()
+        for path in args.sketches:
+            merged.merge(load_sketches(path))
+        save_sketches(merged, args.out)
+        print(f"Merged {len(args.sketches)} sketches into {args.out}")
+    else:
+        print('\n'.join(distribution_lines(load_sketches(args.sketch).summary(), args.player, args.hole)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Compact round storage for crazy golf scores.
+
+RoundStore keeps rounds in memory as one uint8 score buffer with CSR
+offsets and interned player ids, about a tenth of the memory of the
+{player: [scores]} dict it stands in for, and rounds of any length:
+
+    scores = RoundStore.from_file('golf_scores.txt')
+
+A .grs file holds every round from a golf_scores.txt-style file in a form
+that can be opened with numpy.memmap, so nothing is parsed or copied at
+startup. Layout (little endian):
+
+    header      magic, version and the position/size of each section below
+    scores      uint8, every hole score of every round back to back
+    offsets     int64, n_rounds + 1 CSR offsets into the score block
+    player_ids  uint32, index into the player table for each round
+    players     UTF-8 player names separated by newlines (interned, so each
+                name is stored once however many rounds it has)
+
+RoundFile opens one as a RoundStore. Convert a text file with:
+
+    python golf_store.py import golf_scores.txt golf_scores.grs
+"""
+import argparse
+import os
+import struct
+from collections.abc import Mapping, Sequence
+from itertools import chain
+
+import numpy as np
+
+from golf_parser import DEFAULT_BATCH_SIZE, iter_score_batches, pooled_rows, round_label
+
+STORE_EXTENSION = '.grs'
+MAGIC = b'GOLFRS\r\n'
+VERSION = 1
+
+# magic, version, max holes, rounds, players, scores,
+# then the byte position of scores/offsets/player_ids/players and the
+# size of the player table
+_HEADER = struct.Struct('<8sIIQQQQQQQQ')
+_ALIGN = 8
+
+
+def _pad_to_alignment(file):
+    remainder = file.tell() % _ALIGN
+    if remainder:
+        file.write(b'\0' * (_ALIGN - remainder))
+
+
+def write_round_store(batches, path):
+    """
+    Write a stream of golf_parser.ScoreBatch chunks to a .grs file.
+
+    Scores are streamed straight to disk; only the per-round index and the
+    player table are held in memory until the end. The file is written to
+    a temporary name and moved into place once complete.
+    """
+    player_index = {}
+    round_lengths = []
+    round_players = []
+    n_scores = 0
+    max_holes = 0
+
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as file:
+            file.write(b'\0' * _HEADER.size)
+            scores_pos = file.tell()
+
+            for batch in batches:
+                if batch.scores.size and (batch.scores.min() < 0 or batch.scores.max() > 255):
+                    bad = np.flatnonzero((batch.scores < 0) | (batch.scores > 255))[0]
+                    row = np.searchsorted(batch.offsets, bad, side='right') - 1
+                    raise ValueError(f"line {batch.line_numbers[row]}: score {batch.scores[bad]} "
+                                     "does not fit the store's 0-255 score range")
+                file.write(batch.scores.astype(np.uint8).tobytes())
+
+                lengths = np.diff(batch.offsets)
+                round_lengths.append(lengths)
+                round_players.append(np.fromiter(
+                    (player_index.setdefault(name, len(player_index)) for name in batch.names),
+                    dtype=np.uint32, count=len(batch.names)))
+                n_scores += int(batch.offsets[-1])
+                if lengths.size:
+                    max_holes = max(max_holes, int(lengths.max()))
+
+            lengths = np.concatenate(round_lengths) if round_lengths else np.zeros(0, dtype=np.int64)
+            offsets = np.zeros(lengths.size + 1, dtype='<i8')
+            np.cumsum(lengths, out=offsets[1:])
+            player_ids = (np.concatenate(round_players) if round_players
+                          else np.zeros(0, dtype=np.uint32)).astype('<u4')
+
+            _pad_to_alignment(file)
+            offsets_pos = file.tell()
+            file.write(offsets.tobytes())
+            player_ids_pos = file.tell()
+            file.write(player_ids.tobytes())
+            players_pos = file.tell()
+            players_blob = '\n'.join(player_index).encode('utf-8')
+            file.write(players_blob)
+
+            file.seek(0)
+            file.write(_HEADER.pack(MAGIC, VERSION, max_holes, lengths.size, len(player_index), n_scores,
+                                    scores_pos, offsets_pos, player_ids_pos, players_pos,
+                                    len(players_blob)))
+    except BaseException:
+        # A half-written store is never left behind
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def import_score_file(text_path, store_path=None, strict=False, batch_size=DEFAULT_BATCH_SIZE):
+    """Convert a golf_scores.txt-style file into a .grs store and return its path."""
+    if store_path is None:
+        store_path = os.path.splitext(text_path)[0] + STORE_EXTENSION
+    write_round_store(iter_score_batches(text_path, batch_size=batch_size, strict=strict), store_path)
+    return store_path
+
+
+def _compact_scores(values):
+    """Scores as uint8, or a wider integer type when some fall outside 0-255."""
+    values = np.asarray(values)
+    if not values.size:
+        return values.astype(np.uint8)
+    return values.astype(np.result_type(np.uint8, np.min_scalar_type(int(values.min())),
+                                        np.min_scalar_type(int(values.max()))))
+
+
+class Round(Sequence):
+    """
+    Lightweight view of one round of a RoundStore. Nothing is copied: the
+    scores are sliced out of the store's buffer when they are read.
+    """
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def scores(self):
+        """The round's scores as a zero-copy NumPy slice."""
+        return self.store.round_scores(self.index)
+
+    @property
+    def player(self):
+        return self.store.names[int(self.store.player_ids[self.index])]
+
+    @property
+    def label(self):
+        return self.store.round_labels()[self.index]
+
+    def total(self):
+        return int(self.scores.sum())
+
+    def __len__(self):
+        offsets = self.store.offsets
+        return int(offsets[self.index + 1] - offsets[self.index])
+
+    def __getitem__(self, hole):
+        return self.scores[hole].tolist()
+
+    def __iter__(self):
+        return iter(self.scores.tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.scores, dtype=dtype)
+
+    def __repr__(self):
+        return f"Round({self.label!r}, {self.scores.tolist()})"
+
+
+class RoundStore(Mapping):
+    """
+    Compact in-memory rounds: every score in one contiguous uint8 buffer,
+    CSR offsets (round i is scores[offsets[i]:offsets[i + 1]], so rounds
+    can have any number of holes) and an interned player id per round.
+
+    It behaves like the {player: [scores]} dict used throughout the
+    analyser: keys are player names (repeated players get 'Name (round N)'
+    labels, matching read_scores_from_file) and values are Round views.
+    ``csr`` exposes (offsets, scores) so the NumPy engine can work on the
+    whole buffer at once. Scores outside 0-255 widen the buffer's type.
+    """
+    __slots__ = ('names', 'scores', 'offsets', 'player_ids', 'max_holes', '_labels', '_label_index')
+
+    def __init__(self, names, offsets, scores, player_ids, max_holes=None):
+        self.names = list(names)
+        self.offsets = offsets
+        self.scores = scores
+        self.player_ids = player_ids
+        if max_holes is None:
+            max_holes = int(np.diff(offsets).max()) if len(offsets) > 1 else 0
+        self.max_holes = max_holes
+        self._labels = None
+        self._label_index = None
+
+    @classmethod
+    def from_batches(cls, batches):
+        """Pack a stream of golf_parser.ScoreBatch chunks."""
+        player_index = {}
+        lengths = []
+        player_ids = []
+        scores = []
+        for batch in batches:
+            lengths.append(np.diff(batch.offsets))
+            player_ids.append(np.fromiter(
+                (player_index.setdefault(name, len(player_index)) for name in batch.names),
+                dtype=np.uint32, count=len(batch.names)))
+            scores.append(_compact_scores(batch.scores[batch.offsets[0]:batch.offsets[-1]]))
+        offsets = np.zeros(sum(map(len, lengths)) + 1, dtype=np.int64)
+        if lengths:
+            np.cumsum(np.concatenate(lengths), out=offsets[1:])
+        return cls(player_index, offsets,
+                   np.concatenate(scores) if scores else np.zeros(0, dtype=np.uint8),
+                   np.concatenate(player_ids) if player_ids else np.zeros(0, dtype=np.uint32))
+
+    @classmethod
+    def from_file(cls, path, strict=False, batch_size=DEFAULT_BATCH_SIZE):
+        """Parse a golf_scores.txt-style file straight into a RoundStore."""
+        return cls.from_batches(iter_score_batches(path, batch_size=batch_size, strict=strict))
+
+    @classmethod
+    def from_scores(cls, scores):
+        """Pack a {player: [scores]} mapping."""
+        if isinstance(scores, RoundStore):
+            return scores
+        labels = list(scores)
+        lengths = np.fromiter((len(values) for values in scores.values()), dtype=np.int64, count=len(labels))
+        offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        values = _compact_scores(np.fromiter(chain.from_iterable(scores.values()), dtype=np.int64,
+                                             count=int(offsets[-1])))
+        players, player_ids = pooled_rows(labels)
+        store = cls(players, offsets, values, player_ids.astype(np.uint32))
+        # Keys stay as given, even ones round_label would not have made
+        store._labels = labels
+        return store
+
+    @property
+    def csr(self):
+        return self.offsets, self.scores
+
+    @property
+    def n_rounds(self):
+        return self.player_ids.size
+
+    @property
+    def nbytes(self):
+        """Bytes held by the score, offset and player id arrays."""
+        return self.scores.nbytes + self.offsets.nbytes + self.player_ids.nbytes
+
+    def round_labels(self):
+        """Per-round display names, built on first use."""
+        if self._labels is None:
+            ids = np.asarray(self.player_ids, dtype=np.int64)
+            order = np.argsort(ids, kind='stable')
+            sorted_ids = ids[order]
+            group_starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+            group_sizes = np.diff(np.append(group_starts, ids.size))
+            occurrence = np.empty_like(ids)
+            occurrence[order] = np.arange(ids.size) - np.repeat(group_starts, group_sizes)
+
+            names = self.names
+            self._labels = [round_label(names[p], n + 1)
+                            for p, n in zip(ids.tolist(), occurrence.tolist())]
+        return self._labels
+
+    def round_scores(self, index):
+        return self.scores[self.offsets[index]:self.offsets[index + 1]]
+
+    def __len__(self):
+        return self.n_rounds
+
+    def __iter__(self):
+        return iter(self.round_labels())
+
+    def __getitem__(self, label):
+        if self._label_index is None:
+            self._label_index = {name: i for i, name in enumerate(self.round_labels())}
+        return Round(self, self._label_index[label])
+
+    def values(self):
+        return (Round(self, i) for i in range(self.n_rounds))
+
+    def items(self):
+        return zip(self.round_labels(), self.values())
+
+
+class RoundFile(RoundStore):
+    """
+    Read-only RoundStore backed by a .grs file through numpy.memmap, so
+    nothing is read until it is used.
+    """
+    __slots__ = ('path',)
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{path} is not a crazy golf round store")
+            (magic, version, max_holes, n_rounds, n_players, n_scores, scores_pos,
+             offsets_pos, player_ids_pos, players_pos, players_size) = _HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a crazy golf round store")
+            if version != VERSION:
+                raise ValueError(f"{path} uses unsupported store version {version}")
+            file.seek(players_pos)
+            blob = file.read(players_size).decode('utf-8')
+
+        # max_holes comes from the header, so the offsets are never scanned
+        super().__init__(blob.split('\n') if n_players else [], self._map('<i8', offsets_pos, n_rounds + 1),
+                         self._map(np.uint8, scores_pos, n_scores), self._map('<u4', player_ids_pos, n_rounds),
+                         max_holes)
+
+    def _map(self, dtype, offset, count):
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+
+def open_round_store(path):
+    """Open a .grs file without reading its score block into memory."""
+    return RoundFile(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crazy golf binary round store")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_cmd = commands.add_parser('import', help="convert a golf_scores.txt-style file")
+    import_cmd.add_argument('source')
+    import_cmd.add_argument('destination', nargs='?')
+    import_cmd.add_argument('--strict', action='store_true', help="fail on malformed lines")
+
+    info_cmd = commands.add_parser('info', help="summarise a .grs file")
+    info_cmd.add_argument('store')
+
+    args = parser.parse_args(argv)
+    if args.command == 'import':
+        destination = import_score_file(args.source, args.destination, strict=args.strict)
+        store = open_round_store(destination)
+        print(f"Imported {store.n_rounds} rounds for {len(store.names)} players into {destination}")
+    else:
+        store = open_round_store(args.store)
+        print(f"{args.store}: {store.n_rounds} rounds, {len(store.names)} players, "
+              f"{store.scores.size} hole scores, up to {store.max_holes} holes per round")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import math
+
+import numpy as np
+import pytest
+
+from golf_analytics import bounce_back, longest_streaks, score_frequencies, segment_bounds, segment_means
+from golf_engine import score_matrix
+
+
+def _rounds(seed):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(1, 9, n).tolist() for n in rng.integers(1, 19, 40)]
+
+
+def _matrix(rounds):
+    return score_matrix({f"Player {i}": scores for i, scores in enumerate(rounds)})[1]
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else math.nan
+
+
+def _longest(flags):
+    longest = run = 0
+    for flag in flags:
+        run = run + 1 if flag else 0
+        longest = max(longest, run)
+    return longest
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_kernels_match_naive_loops(seed):
+    rounds = _rounds(seed)
+    matrix = _matrix(rounds)
+
+    frequencies = score_frequencies(matrix, max_score=6)
+    for row, scores in zip(frequencies.tolist(), rounds):
+        assert row == [scores.count(s) for s in range(1, 7)] + [sum(s > 6 for s in scores)]
+
+    bounce = bounce_back(matrix)
+    streaks = longest_streaks(matrix)
+    for i, scores in enumerate(rounds):
+        pairs = list(zip(scores, scores[1:]))
+        after_bad = [after for before, after in pairs if before >= 4]
+        after_good = [after for before, after in pairs if before <= 2]
+        assert bounce['after_bad'][i] == pytest.approx(_mean(after_bad), nan_ok=True)
+        assert bounce['after_good'][i] == pytest.approx(_mean(after_good), nan_ok=True)
+        assert (bounce['bad_count'][i], bounce['good_count'][i]) == (len(after_bad), len(after_good))
+        assert streaks['good'][i] == _longest(s <= 2 for s in scores)
+        assert streaks['bad'][i] == _longest(s >= 4 for s in scores)
+
+    segments = segment_means(matrix)
+    for i, scores in enumerate(rounds):
+        expected = [_mean(scores[start:end]) for start, end in segment_bounds(matrix.shape[1])]
+        assert segments[i].tolist() == pytest.approx(expected, nan_ok=True)
+
+
+def test_even_segments_use_the_reshape_path():
+    rounds = [list(range(1, 19)), [3] * 18]
+    assert segment_bounds(18) == [(0, 6), (6, 12), (12, 18)]
+    assert segment_means(_matrix(rounds)).tolist() == [[3.5, 9.5, 15.5], [3.0, 3.0, 3.0]]
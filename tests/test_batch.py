@@ -0,0 +1,55 @@
+import pytest
+
+from golf_batch import PartialAggregate, analyze_score_files
+from golf_engine import compute_analysis, empty_analysis
+from golf_parser import parse_score_lines
+
+
+def _aggregate(text):
+    partial = PartialAggregate()
+    for batch in parse_score_lines(text.splitlines()):
+        partial.add_batch(batch)
+    return partial
+
+
+def test_rankings_use_average_round_total():
+    # Alice plays twice and has more strokes in all, but the better rounds
+    partial = _aggregate("Alice: 2, 2, 2\nBob: 3, 3, 3\nAlice: 2, 3, 2\n")
+    analysis = partial.to_analysis()
+    assert analysis['results']['Alice']['total'] == 13
+    assert analysis['results']['Alice']['rounds'] == 2
+    assert analysis['rankings'] == [('Alice', 6.5), ('Bob', 9.0)]
+
+
+def test_empty_input_matches_single_file_analysis():
+    analysis = _aggregate("# no rounds yet\n").to_analysis()
+    assert analysis == empty_analysis() == compute_analysis({})
+
+
+def test_comment_only_files(tmp_path):
+    (tmp_path / 'a.txt').write_text("# nothing\n")
+    analysis, files = analyze_score_files([str(tmp_path)], workers=1)
+    assert len(files) == 1
+    assert analysis['rankings'] == [] and analysis['hardest_hole'] is None
+
+
+def test_no_files(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        analyze_score_files([str(tmp_path)], workers=1)
+
+
+def test_tied_averages_go_to_countback():
+    # Same average round total; Bob has the lower back half on average
+    partial = _aggregate("Alice: 2, 2, 3, 3\nBob: 3, 3, 2, 2\nAlice: 3, 3, 2, 2\nBob: 2, 3, 3, 2\n")
+    analysis = partial.to_analysis()
+    assert [player for player, _ in analysis['rankings']] == ['Bob', 'Alice']
+    assert analysis['rankings'][0][1] == analysis['rankings'][1][1] == 10.0
+
+
+def test_negative_scores_are_dropped_on_both_paths(tmp_path):
+    (tmp_path / 'a.txt').write_text("Alice: 2, -3, 4\nBob: 3, 3\n")
+    (tmp_path / 'b.txt').write_text("Bob: 2, 2\n")
+    batched, _ = analyze_score_files([str(tmp_path)], workers=2)
+    serial, _ = analyze_score_files([str(tmp_path)], workers=1)
+    assert batched['results'] == serial['results']
+    assert batched['results']['Alice']['total'] == 6
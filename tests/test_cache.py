@@ -0,0 +1,85 @@
+import os
+
+import matplotlib
+import pytest
+
+import golf_cache
+from golf_cache import ResultCache, analysis_key, cached_analysis, render_key
+
+SCORES = {'Alice': [2, 3, 4], 'Bob': [3, 3, 3]}
+
+
+def test_render_key_changes_with_drawing_version(monkeypatch):
+    parent = analysis_key(SCORES)
+    key = render_key(parent, 'all', 'full')
+    assert render_key(parent, 'all', 'full') == key
+    monkeypatch.setattr(golf_cache, 'RENDER_VERSION', golf_cache.RENDER_VERSION + 1)
+    assert render_key(parent, 'all', 'full') != key
+
+
+def test_render_key_depends_on_layout_and_mode():
+    parent = analysis_key(SCORES)
+    keys = {render_key(parent, layout, mode) for layout in ('all', 'summary') for mode in ('full', 'preview')}
+    assert len(keys) == 4
+
+
+def test_analysis_hits_after_a_miss_and_misses_after_a_version_bump(tmp_path, monkeypatch):
+    calls = []
+    compute_analysis = golf_cache.compute_analysis
+    monkeypatch.setattr(golf_cache, 'compute_analysis', lambda scores: calls.append(1) or compute_analysis(scores))
+    cache = ResultCache(str(tmp_path))
+
+    first, key = cached_analysis(SCORES, cache)
+    second, again = cached_analysis(dict(SCORES), cache)
+    assert len(calls) == 1 and key == again
+    assert second == first == compute_analysis(SCORES)
+
+    cached_analysis({'Alice': [2, 3, 5], 'Bob': [3, 3, 3]}, cache)
+    assert len(calls) == 2
+    monkeypatch.setattr(golf_cache, 'ANALYSIS_VERSION', golf_cache.ANALYSIS_VERSION + 1)
+    _, bumped = cached_analysis(SCORES, cache)
+    assert len(calls) == 3 and bumped != key
+
+
+def test_eviction_drops_the_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 6)
+    for age, key in enumerate(['c', 'b', 'a']):
+        cache.put_json(key, 'x' * 100)
+        os.utime(cache._path(key, '.json'), (1000 - age, 1000 - age))
+    # Reading 'a', the oldest, makes it the most recently used
+    assert cache.get_json('a') == 'x' * 100
+    cache.max_bytes = 3 * 102
+    cache.put_json('d', 'x' * 100)
+    assert cache.get_json('b') is None
+    assert [cache.get_json(key) is not None for key in 'acd'] == [True, True, True]
+    assert cache.size() <= cache.max_bytes
+
+
+def test_shown_chart_is_drawn_once_and_cached(tmp_path, monkeypatch):
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    import golf_render
+    from crazy_golf_analysis import create_visualizations
+    from golf_engine import compute_analysis
+
+    draws = []
+    draw_layout = golf_render.draw_layout
+    monkeypatch.setattr(golf_render, 'draw_layout', lambda *args: draws.append(args) or draw_layout(*args))
+    monkeypatch.setattr(golf_render, 'render_report', lambda *args, **kwargs: pytest.fail("rendered twice"))
+    monkeypatch.setattr(plt, 'show', lambda: None)
+    analysis = compute_analysis(SCORES)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    output = str(tmp_path / 'summary.png')
+    create_visualizations(analysis['results'], analysis['hole_averages'], SCORES, show=True,
+                          mode='preview', output_path=output, cache=cache)
+    plt.close('all')
+    assert len(draws) == 1
+    assert cache.get_path(render_key(analysis_key(SCORES), 'summary', 'preview'), '.png') is not None
+
+    # A later headless run is a cache hit and never renders
+    copy = str(tmp_path / 'again.png')
+    create_visualizations(analysis['results'], analysis['hole_averages'], SCORES, show=False,
+                          mode='preview', output_path=copy, cache=cache)
+    with open(output, 'rb') as first, open(copy, 'rb') as second:
+        assert first.read() == second.read()
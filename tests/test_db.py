@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from golf_db import ScoreDatabase
+from golf_engine import compute_analysis
+
+
+def _assert_same(actual, expected):
+    if isinstance(expected, dict):
+        assert actual.keys() == expected.keys()
+        for key in expected:
+            _assert_same(actual[key], expected[key])
+    elif isinstance(expected, (list, tuple)):
+        assert len(actual) == len(expected)
+        for a, b in zip(actual, expected):
+            _assert_same(a, b)
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected, nan_ok=True, abs=1e-9)
+    else:
+        assert actual == expected
+
+
+@pytest.fixture
+def database(tmp_path):
+    rng = np.random.default_rng(11)
+    with ScoreDatabase(str(tmp_path / 'scores.db')) as db:
+        for course, played_on in (('Pier', '2026-05-01'), ('Park', '2026-06-01')):
+            names = [f"Player {i}" for i in rng.integers(0, 8, 25)]
+            lengths = rng.integers(1, 19, len(names))
+            offsets = np.r_[0, np.cumsum(lengths)]
+            db.add_rounds(names, offsets, rng.integers(1, 7, offsets[-1]), course=course, played_on=played_on)
+        yield db
+
+
+@pytest.mark.parametrize('filters', [{}, {'course': 'Park'}, {'player': 'Player 3'}, {'since': '2026-05-15'},
+                                     {'until': '2026-05-15', 'player': ['Player 1', 'Player 2']}])
+def test_analysis_matches_compute_analysis(database, filters):
+    scores = database.scores(**filters)
+    assert scores
+    _assert_same(database.analysis(**filters), compute_analysis(scores))
+
+
+def test_no_matching_rounds(database):
+    assert database.analysis(course='Nowhere') is None
@@ -0,0 +1,69 @@
+import math
+import statistics
+
+import numpy as np
+import pytest
+
+from golf_engine import compute_analysis, empty_analysis
+
+
+def _baseline(scores):
+    """The original per-player, per-hole loops, extended to ragged rounds."""
+    results = {}
+    for player, player_scores in scores.items():
+        results[player] = {
+            'total': sum(player_scores),
+            'average': statistics.mean(player_scores),
+            'best_hole': min(player_scores),
+            'worst_hole': max(player_scores),
+            'consistency': statistics.stdev(player_scores) if len(player_scores) > 1 else math.nan,
+        }
+    n_holes = max(map(len, scores.values()))
+    hole_averages = [statistics.mean(s[hole] for s in scores.values() if hole < len(s)) for hole in range(n_holes)]
+    aces = {player: [hole for hole, score in enumerate(s, 1) if score == 1] for player, s in scores.items()}
+    return results, hole_averages, {player: holes for player, holes in aces.items() if holes}
+
+
+def _random_scores(seed, ragged):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, 19, 12) if ragged else np.full(12, 18)
+    return {f"Player {i}": rng.integers(1, 7, n).tolist() for i, n in enumerate(lengths)}
+
+
+@pytest.mark.parametrize('ragged', [False, True])
+@pytest.mark.parametrize('seed', range(3))
+def test_matches_the_baseline_loops(seed, ragged):
+    scores = _random_scores(seed, ragged)
+    results, hole_averages, aces = _baseline(scores)
+    analysis = compute_analysis(scores)
+
+    assert analysis['results'].keys() == results.keys()
+    for player, expected in results.items():
+        for key, value in expected.items():
+            assert analysis['results'][player][key] == pytest.approx(value, nan_ok=True)
+    assert analysis['hole_averages'] == pytest.approx(hole_averages)
+    assert analysis['aces'] == aces
+
+    hardest = max(range(len(hole_averages)), key=lambda hole: hole_averages[hole])
+    easiest = min(range(len(hole_averages)), key=lambda hole: hole_averages[hole])
+    assert analysis['hardest_hole'] == (hardest + 1, pytest.approx(hole_averages[hardest]))
+    assert analysis['easiest_hole'] == (easiest + 1, pytest.approx(hole_averages[easiest]))
+
+    totals = [total for _, total in analysis['rankings']]
+    assert totals == sorted(totals)
+    assert sorted(player for player, _ in analysis['rankings']) == sorted(scores)
+
+
+def test_single_hole_rounds_have_no_consistency():
+    analysis = compute_analysis({'Ann': [2, 3, 1, 4], 'Bob': [3, 3], 'Cy': [5]})
+    assert math.isnan(analysis['results']['Cy']['consistency'])
+    # NaN never wins or loses the consistency ranking
+    assert analysis['most_consistent'] == ('Bob', 0.0)
+    assert analysis['least_consistent'][0] == 'Ann'
+
+    analysis = compute_analysis({'Cy': [5], 'Di': [2]})
+    assert analysis['most_consistent'] is None and analysis['least_consistent'] is None
+
+
+def test_no_rounds():
+    assert compute_analysis({}) == empty_analysis()
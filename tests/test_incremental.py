@@ -0,0 +1,74 @@
+import threading
+import time
+
+from golf_engine import compute_analysis
+from golf_incremental import IncrementalStats, ScoreFileTail, watch_scores
+
+# Equal totals throughout; the back half, then the last hole, decides
+ROUNDS = [
+    ('Carol', [2, 2, 3, 3, 2, 4]),
+    ('Alice', [3, 3, 2, 2, 3, 3]),
+    ('Bob', [3, 3, 2, 3, 2, 3]),
+    ('Alice', [2, 3, 3, 2, 3, 3]),
+]
+
+
+def _stats(rounds):
+    stats = IncrementalStats()
+    for name, scores in rounds:
+        stats.add_round(name, scores)
+    return stats
+
+
+def test_tied_totals_are_ranked_by_countback():
+    rankings = _stats(ROUNDS).report()['rankings']
+    assert rankings == [('Bob', 16), ('Alice', 16), ('Alice (round 2)', 16), ('Carol', 16)]
+
+
+def test_rankings_match_a_full_analysis():
+    report = _stats(ROUNDS).report()
+    full = compute_analysis(dict(zip(report['results'], (scores for _, scores in ROUNDS))))
+    assert report['rankings'] == full['rankings']
+
+
+def test_tail_keeps_a_partial_line_across_idle_polls(tmp_path):
+    path = tmp_path / 'scores.txt'
+    path.write_text("Alice: 2, 3, 4\nBob: 3, ")
+    tail = ScoreFileTail(str(path))
+    assert tail.read_new_lines() == ['Alice: 2, 3, 4']
+    assert tail.read_new_lines() == []
+    assert tail.read_new_lines() == []
+    with open(path, 'a') as file:
+        file.write("3, 3\nCarol: 2")
+    assert tail.read_new_lines() == ['Bob: 3, 3, 3']
+    assert tail.read_new_lines(final=True) == ['Carol: 2']
+
+
+def test_watch_waits_for_a_slow_writer(tmp_path):
+    path = tmp_path / 'scores.txt'
+    path.write_text("Alice: 2, 3, 4\n")
+
+    def write_slowly():
+        with open(path, 'a') as file:
+            file.write("Bob: 3, 3, ")
+            file.flush()
+            time.sleep(0.3)
+            file.write("3, 4\n")
+
+    writer = threading.Thread(target=write_slowly)
+    writer.start()
+    try:
+        stats = watch_scores(str(path), lambda stats: None, interval=0.05, strict=True, max_polls=20)
+    finally:
+        writer.join()
+    assert stats.report()['results']['Bob']['total'] == 13
+    assert stats.n_rounds == 2
+
+
+def test_report_matches_full_analysis_with_suffixed_names():
+    rounds = [('Ann (round 2)', [1, 2, 3]), ('Ann', [1, 2, 3]), ('Ann', [2, 2, 3])]
+    report = _stats(rounds).report()
+    assert list(report['results']) == ['Ann (round 2) (round 1)', 'Ann', 'Ann (round 2)']
+    full = compute_analysis(dict(zip(report['results'], (scores for _, scores in rounds))))
+    assert report['rankings'] == full['rankings']
+    assert report['skill_model']['skill'].keys() == {'Ann', 'Ann (round 2)'}
@@ -0,0 +1,60 @@
+import json
+
+import golf_instrument
+from golf_instrument import Instrument, report_path, stage
+
+
+def _work():
+    with stage('outer'):
+        with stage('inner'):
+            block = bytearray(4 * 1024 * 1024)
+            del block
+        with stage('inner'):
+            sum(range(1000))
+
+
+def test_stages_are_reported_with_paths_and_memory(tmp_path):
+    with Instrument(profile_stage='outer/inner') as instrument:
+        _work()
+    path = instrument.write_report(str(tmp_path / 'run.profile.json'))
+    with open(path) as file:
+        report = json.load(file)
+
+    assert [record['stage'] for record in report['stages']] == ['outer/inner', 'outer/inner', 'outer']
+    first, second, outer = report['stages']
+    assert first['peak_bytes'] >= 4 * 1024 * 1024
+    assert outer['peak_bytes'] >= first['peak_bytes']
+    assert report['total_peak_bytes'] >= outer['peak_bytes']
+    assert report['memory_traced'] is True
+    for record in report['stages']:
+        assert 0 <= record['wall_seconds'] <= report['total_wall_seconds']
+    # Both 'inner' stages match the profiled path
+    assert first['profile']['cprofile'] and 'allocations' in second['profile']
+    assert 'profile' not in outer
+
+
+def test_untraced_reports_have_no_memory(tmp_path):
+    with Instrument(trace_memory=False) as instrument:
+        _work()
+    report = instrument.report()
+    assert report['memory_traced'] is False and 'total_peak_bytes' not in report
+    assert all('peak_bytes' not in record for record in report['stages'])
+
+
+def test_stages_do_nothing_without_an_instrument():
+    assert golf_instrument._active is golf_instrument._DISABLED
+    _work()
+    assert report_path('out/summary.png') == 'out/summary.profile.json'
+
+
+def test_command_line_run_report(tmp_path, capsys):
+    from crazy_golf_analysis import main
+
+    scores = tmp_path / 'scores.txt'
+    scores.write_text("Ann: 2, 3, 4\nBob: 3, 3, 2\n")
+    report_file = str(tmp_path / 'run.json')
+    main(['stats', str(scores), '--quiet', '--profile', '--profile-report', report_file])
+    assert f"Run report written to {report_file}" in capsys.readouterr().err
+    with open(report_file) as file:
+        stages = [record['stage'] for record in json.load(file)['stages']]
+    assert 'load_scores' in stages
@@ -0,0 +1,23 @@
+import numpy as np
+
+from golf_model import fit_scores, model_summary
+
+
+def test_complete_grid_reproduces_raw_hole_averages():
+    rng = np.random.default_rng(1)
+    matrix = rng.integers(1, 7, size=(6, 18))
+    scores = {f"Player {i}": row.tolist() for i, row in enumerate(matrix)}
+    summary = model_summary(fit_scores(scores))
+    assert summary['converged']
+    np.testing.assert_allclose(summary['hole_difficulty'], matrix.mean(axis=0), atol=1e-5)
+    # Skills keep their order and sit just inside the raw player averages
+    raw = matrix.mean(axis=1) - matrix.mean()
+    skill = np.array(list(summary['skill'].values()))
+    np.testing.assert_allclose(skill, raw * 18 / 19, atol=1e-5)
+
+
+def test_players_with_few_scores_are_shrunk():
+    scores = {'Alice': [3] * 18, 'Bob': [3] * 18, 'Lucky': [1, 1]}
+    fit = fit_scores(scores)
+    skill = dict(zip(fit['players'], fit['skill'].tolist()))
+    assert -2 < skill['Lucky'] < 0
@@ -0,0 +1,48 @@
+import pytest
+
+from golf_parser import (ScoreParseError, parse_score_lines, pooled_rows, read_score_dict, round_label,
+                         round_player)
+from golf_store import RoundStore
+
+# A repeated player and a real player whose name looks like a repeat label
+TEXT = "Ann: 1 2 3\nAnn (round 2): 4 5 6\nAnn: 7, 8, 9\n"
+
+
+def test_repeated_rounds_and_suffixed_names_are_all_kept(tmp_path):
+    path = tmp_path / 'scores.txt'
+    path.write_text(TEXT)
+    scores = read_score_dict(str(path))
+    assert scores == {'Ann': [1, 2, 3], 'Ann (round 2) (round 1)': [4, 5, 6], 'Ann (round 2)': [7, 8, 9]}
+    assert dict(RoundStore.from_file(str(path)).items()).keys() == scores.keys()
+
+    players, rows = pooled_rows(list(scores))
+    assert players == ['Ann', 'Ann (round 2)']
+    assert rows.tolist() == [0, 1, 0]
+
+
+@pytest.mark.parametrize('name', ['Ann', 'Ann (round 2)', 'Ann (round 1)', 'Ann (round x)', 'Ann (rounds 2)'])
+def test_round_player_undoes_round_label(name):
+    labels = [round_label(name, occurrence) for occurrence in (1, 2, 3)]
+    assert len(set(labels)) == 3
+    assert [round_player(label) for label in labels] == [name] * 3
+
+
+def test_batches_keep_line_numbers_and_skip_comments():
+    batches = list(parse_score_lines(["# header", "", "Ann: 1, 2", "Bob: 3 4 5"], batch_size=1))
+    assert [batch.names for batch in batches] == [['Ann'], ['Bob']]
+    assert [batch.line_numbers.tolist() for batch in batches] == [[3], [4]]
+    assert batches[1].scores.tolist() == [3, 4, 5]
+
+
+def test_strict_mode_reports_every_bad_line():
+    with pytest.raises(ScoreParseError) as error:
+        list(parse_score_lines(["Ann 1 2", "Bob: 1, x", ": 3"], strict=True))
+    assert [line for line, _ in error.value.errors] == [1, 2, 3]
+
+
+def test_negative_scores_are_rejected_when_parsing():
+    with pytest.raises(ScoreParseError) as error:
+        list(parse_score_lines(["Ann: 3, -1, 4"], strict=True))
+    assert error.value.errors == [(1, "negative score '-1'")]
+    batch, = parse_score_lines(["Ann: 3, -1, 4"])
+    assert batch.scores.tolist() == [3, 4]
@@ -0,0 +1,50 @@
+import json
+import os
+
+import pytest
+
+from golf_parser import ScoreParseError
+from golf_report import stream_score_file
+
+GOOD = "Alice: 2, 3, 4, 2\nBob: 3, 3, 3, 3\n"
+BAD = "Alice: 2, 3, 4, 2\nCarol 2, 2, 2, 2\nBob: 3, 3, 3, 3\n"
+
+
+def _write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_json_report_round_trip(tmp_path):
+    source = _write(tmp_path / 'scores.txt', GOOD)
+    report = str(tmp_path / 'report.json')
+    assert stream_score_file(source, report) == 2
+    with open(report) as file:
+        tables = json.load(file)
+    assert [row['player'] for row in tables['players']] == ['Alice', 'Bob']
+    assert sorted(os.listdir(tmp_path)) == ['report.json', 'scores.txt']
+
+
+def test_failed_json_stream_keeps_previous_report(tmp_path):
+    report = str(tmp_path / 'report.json')
+    stream_score_file(_write(tmp_path / 'good.txt', GOOD), report)
+    with open(report) as file:
+        previous = file.read()
+
+    with pytest.raises(ScoreParseError):
+        stream_score_file(_write(tmp_path / 'bad.txt', BAD), report, batch_size=1, strict=True)
+    with open(report) as file:
+        assert file.read() == previous
+    assert sorted(os.listdir(tmp_path)) == ['bad.txt', 'good.txt', 'report.json']
+
+
+def test_failed_csv_stream_keeps_previous_report(tmp_path):
+    report = str(tmp_path / 'report')
+    stream_score_file(_write(tmp_path / 'good.txt', GOOD), report, report_format='csv')
+    previous = {name: (tmp_path / 'report' / name).read_text() for name in os.listdir(report)}
+    assert 'players.csv' in previous
+
+    with pytest.raises(ScoreParseError):
+        stream_score_file(_write(tmp_path / 'bad.txt', BAD), report, report_format='csv',
+                          batch_size=1, strict=True)
+    assert {name: (tmp_path / 'report' / name).read_text() for name in os.listdir(report)} == previous
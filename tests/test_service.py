@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from golf_engine import compute_analysis, empty_analysis
+from golf_parser import parse_score_lines
+from golf_service import ScoringService, SubmissionError, parse_submission
+
+
+def _submit(service, rounds):
+    names = [name for name, _ in rounds]
+    lengths = [len(scores) for _, scores in rounds]
+    offsets = np.zeros(len(rounds) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    service.submit(names, offsets, np.array([s for _, scores in rounds for s in scores], dtype=np.int64))
+
+
+def test_stats_and_leaderboard_agree_on_ties():
+    service = ScoringService()
+    _submit(service, [('Carol', [2, 2, 3, 3, 2, 4]), ('Alice', [3, 3, 2, 2, 3, 3]),
+                      ('Bob', [3, 3, 2, 3, 2, 3]), ('Alice', [2, 3, 3, 2, 3, 3])])
+    rankings = service.stats.report()['rankings']
+    assert [tuple(entry) for entry in service.leaderboard(4)] == rankings
+
+
+@pytest.mark.parametrize('body, content_type', [
+    (b'{"player": "Ann", "scores": [3, 99999999999999999999999]}', 'application/json'),
+    (b'{"player": "Ann", "scores": [3, 256]}', 'application/json'),
+    (b'{"player": "Ann", "scores": [3, true]}', 'application/json'),
+    (b'Ann: 3, 4294967297\n', 'text/plain'),
+    (b'Ann: 3, 99999999999999999999999\n', 'text/plain'),
+    (b'Ann: 3, 4\n\xff\xfe\n', 'text/plain'),
+    (b'\xff{"player": "Ann", "scores": [3]}', 'application/json'),
+])
+def test_out_of_range_scores_are_rejected(body, content_type):
+    with pytest.raises(SubmissionError):
+        parse_submission(body, content_type)
+
+
+def test_long_digit_runs_do_not_wrap():
+    batch, = parse_score_lines(['Ann: 3, 4294967297, 2'])
+    assert batch.scores.tolist() == [3, 2]
+
+
+async def _exchange(requests, service=None):
+    service = service or ScoringService()
+    server = await service.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+    statuses = []
+    try:
+        for request in requests:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            statuses.append(int(response.split(b' ', 2)[1]))
+        # The server is still answering after the bad requests
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /holes HTTP/1.1\r\nConnection: close\r\n\r\n')
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        statuses.append(int(response.split(b' ', 2)[1]))
+        assert json.loads(response.partition(b'\r\n\r\n')[2]) == \
+            {'hole_averages': [], 'hardest_hole': None, 'easiest_hole': None}
+    finally:
+        await service.stop(server)
+    return statuses
+
+
+def _post(body, content_type='application/json'):
+    return (b'POST /rounds HTTP/1.1\r\nContent-Type: %s\r\nContent-Length: %d\r\nConnection: close\r\n\r\n%s'
+            % (content_type.encode(), len(body), body))
+
+
+def test_bad_requests_get_400():
+    statuses = asyncio.run(_exchange([
+        b'GET\r\n\r\n',
+        _post(b'{"player": "Ann", "scores": [99999999999999999999999]}'),
+        _post(b'Ann: 3, 4\n\xff\n', 'text/plain'),
+    ]))
+    assert statuses == [400, 400, 400, 200]
+
+
+def test_unexpected_errors_get_500():
+    service = ScoringService()
+    original = service._route
+
+    def route(method, target, headers, body):
+        if target == '/boom':
+            raise RuntimeError("boom")
+        return original(method, target, headers, body)
+
+    service._route = route
+    statuses = asyncio.run(_exchange([b'GET /boom HTTP/1.1\r\nConnection: close\r\n\r\n'], service))
+    assert statuses == [500, 200]
+
+
+def test_stats_is_the_full_analysis():
+    service = ScoringService()
+    rounds = [('Ann', [3, 2, 4, 1]), ('Bob', [2, 2, 3, 3]), ('Ann', [4, 3, 2, 2]), ('Cy', [5, 1, 2])]
+    _submit(service, rounds)
+    report = service.stats.report()
+    full = compute_analysis(dict(zip(report['results'], (scores for _, scores in rounds))))
+    assert report.keys() == full.keys() == empty_analysis().keys()
+    assert report['distributions'] == full['distributions']
+    assert report['skill_model']['skill'].keys() == full['skill_model']['skill'].keys()
+    np.testing.assert_allclose(report['skill_model']['hole_difficulty'],
+                               full['skill_model']['hole_difficulty'], atol=1e-4)
+    assert ScoringService().stats.report() == empty_analysis()
+
+
+def test_suffixed_names_do_not_collide_with_repeat_rounds():
+    service = ScoringService()
+    for name, scores in [('Ann (round 2)', [1, 2, 3]), ('Ann', [1, 2, 3]), ('Ann', [2, 2, 3])]:
+        _submit(service, [(name, scores)])
+    totals = dict(service.stats.report()['rankings'])
+    assert totals == {'Ann (round 2) (round 1)': 6, 'Ann': 6, 'Ann (round 2)': 7}
+    assert dict(tuple(entry) for entry in service.leaderboard(3)) == totals
@@ -0,0 +1,55 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import crazy_golf_analysis
+import golf_simulate
+from golf_simulate import simulate_tournament
+
+
+def test_ties_share_the_win_and_the_rank():
+    scores = {'Alice': [2] * 9, 'Bob': [2] * 9, 'Carol': [3] * 9}
+    result = simulate_tournament(scores, 1000, seed=1, workers=1, chunk_elements=64)
+    assert result['win_probability'].tolist() == [0.5, 0.5, 0.0]
+    assert result['expected_rank'].tolist() == [1.0, 1.0, 3.0]
+    assert result['expected_score'].tolist() == [18.0, 18.0, 27.0]
+
+
+def test_results_do_not_depend_on_workers():
+    rng = np.random.default_rng(0)
+    scores = {f"Player {i}": rng.integers(1, 7, 18).tolist() for i in range(6)}
+    one = simulate_tournament(scores, 5000, seed=2, workers=1, chunk_elements=600)
+    two = simulate_tournament(scores, 5000, seed=2, workers=2, chunk_elements=600)
+    for key in ('win_probability', 'expected_rank', 'expected_score'):
+        assert np.array_equal(one[key], two[key])
+    assert abs(one['win_probability'].sum() - 1) < 1e-9
+
+
+def test_chunk_memory_does_not_grow_with_the_range_of_totals():
+    # Four players whose round totals span ~150 strokes: ranking through a
+    # dense sims x totals table would need ~40x the chunk's own arrays
+    scores = {f"Player {i}": [1 + (i + hole) % 9 for hole in range(18)] for i in range(4)}
+    chunk_elements = 1 << 14
+    tracemalloc.start()
+    try:
+        simulate_tournament(scores, 100000, seed=1, workers=1, chunk_elements=chunk_elements)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 32 * 8 * chunk_elements
+
+
+@pytest.mark.parametrize('arguments', [{'n_simulations': 0}, {'n_simulations': -5}, {'workers': 0}])
+def test_rejects_non_positive_counts(arguments):
+    with pytest.raises(ValueError, match="at least 1"):
+        simulate_tournament({'Ann': [2, 3], 'Bob': [3, 3]}, **arguments)
+
+
+@pytest.mark.parametrize('option', ['--simulations', '--workers'])
+@pytest.mark.parametrize('command', [['golf_scores.txt'], ['simulate', 'golf_scores.txt']])
+def test_command_line_rejects_non_positive_counts(option, command, capsys):
+    main = golf_simulate.main if command[0] != 'simulate' else crazy_golf_analysis.main
+    with pytest.raises(SystemExit):
+        main(command + [option, '0'])
+    assert "must be at least 1" in capsys.readouterr().err
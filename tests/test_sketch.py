@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from golf_sketch import QUANTILES, ScoreSketch, TDigest
+
+QS = (0.5, 0.9, 0.99, 0.999)
+
+
+def _samples():
+    rng = np.random.default_rng(7)
+    return {'pareto': rng.pareto(1.5, 100000) + 1, 'lognormal': rng.lognormal(0, 1.5, 100000)}
+
+
+def _digests(values):
+    whole = TDigest()
+    whole.add(values)
+    streamed = TDigest()
+    for chunk in np.array_split(values, 500):
+        streamed.add(chunk)
+    merged = TDigest()
+    for chunk in np.array_split(values, 20):
+        part = TDigest()
+        part.add(chunk)
+        merged.merge(part)
+    return {'whole': whole, 'streamed': streamed, 'merged': merged}
+
+
+@pytest.mark.parametrize('name', ['pareto', 'lognormal'])
+def test_tail_quantiles_against_np_quantile(name):
+    values = _samples()[name]
+    for digest in _digests(values).values():
+        for q in QS:
+            # Rank error: a few tenths of a percentile in the middle, far less in the tails
+            estimate = digest.quantile(q)
+            assert abs((values < estimate).mean() - q) < (0.003 if q < 0.99 else 0.0005)
+        expected = np.quantile(values, QUANTILES['p99'])
+        assert abs(digest.quantile(QUANTILES['p99']) - expected) < 0.03 * expected
+
+
+def test_small_integer_scores_are_exact():
+    values = np.random.default_rng(3).integers(1, 8, 5000)
+    sketch = ScoreSketch()
+    sketch.add(values)
+    for q in QS:
+        assert sketch.quantile(q) == np.quantile(values, q)
+
+
+@pytest.mark.parametrize('values', [[1, 2, 3, 100, 200], [-1, 2, 3, 4], [2.5, 3, 3, 70, 4, 1]])
+def test_small_mixed_samples_are_exact(values):
+    sketch = ScoreSketch()
+    sketch.add(values)
+    for q in QS:
+        assert sketch.quantile(q) == pytest.approx(np.quantile(values, q))
+    assert sketch.summary()['p90'] == pytest.approx(np.quantile(values, 0.9))
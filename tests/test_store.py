@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from golf_engine import compute_analysis
+from golf_parser import pooled_rows
+from golf_store import RoundStore, import_score_file, open_round_store
+
+TEXT = ("Alice: 2, 3, 4, 2\nBob: 3, 3, 3\nAlice: 2, 2, 2, 2, 5\n"
+        "Carol: 1, 4\nBob: 2, 2, 2, 2\nAlice: 3, 3\n")
+
+
+def _store(tmp_path):
+    path = tmp_path / 'scores.txt'
+    path.write_text(TEXT)
+    return RoundStore.from_file(str(path))
+
+
+def test_pooled_rows_uses_store_ids(tmp_path):
+    store = _store(tmp_path)
+    players, rows = pooled_rows(store)
+    assert players == ['Alice', 'Bob', 'Carol']
+    assert rows.tolist() == [0, 1, 0, 2, 1, 0]
+    expected_players, expected_rows = pooled_rows(store.round_labels())
+    assert players == expected_players and np.array_equal(rows, expected_rows)
+
+
+def test_pooled_rows_on_a_memory_mapped_store(tmp_path):
+    store = _store(tmp_path)
+    mapped = open_round_store(import_score_file(str(tmp_path / 'scores.txt')))
+    players, rows = pooled_rows(mapped)
+    assert (players, rows.tolist()) == (pooled_rows(store)[0], pooled_rows(store)[1].tolist())
+
+
+def test_from_scores_keeps_labels_round_label_would_not_make():
+    store = RoundStore.from_scores({'Alice (round 2)': [2, 3], 'Bob': [3, 3]})
+    assert list(store) == ['Alice (round 2)', 'Bob']
+    assert store['Alice (round 2)'].scores.tolist() == [2, 3]
+    players, rows = pooled_rows(store)
+    assert (players, rows.tolist()) == (['Alice', 'Bob'], [0, 1])
+
+
+def test_store_and_dict_analyses_match(tmp_path):
+    store = _store(tmp_path)
+    plain = {label: list(round_) for label, round_ in store.items()}
+    from_store, from_dict = compute_analysis(store), compute_analysis(plain)
+    assert from_store['rankings'] == from_dict['rankings']
+    assert from_store['skill_model'] == from_dict['skill_model']
+    assert from_store['distributions'] == from_dict['distributions']
+
+
+def test_grs_round_trip(tmp_path):
+    (tmp_path / 'scores.txt').write_text(TEXT + "# a comment\nDave: 255, 0, 1\n")
+    store = RoundStore.from_file(str(tmp_path / 'scores.txt'))
+    path = import_score_file(str(tmp_path / 'scores.txt'))
+    assert path == str(tmp_path / 'scores.grs')
+    mapped = open_round_store(path)
+    assert list(mapped) == list(store)
+    assert mapped.n_rounds == store.n_rounds == 7
+    for label, round_ in store.items():
+        assert mapped[label].player == round_.player
+        assert mapped[label].scores.tolist() == round_.scores.tolist()
+    assert mapped['Dave'].scores.tolist() == [255, 0, 1]
+    assert mapped['Alice (round 3)'].total() == 6
+    assert compute_analysis(mapped)['results'] == compute_analysis(store)['results']
+
+
+def test_grs_rejects_scores_it_cannot_store(tmp_path):
+    (tmp_path / 'scores.txt').write_text(TEXT + "Dave: 300, 2\n")
+    with pytest.raises(ValueError, match="line 7: score 300"):
+        import_score_file(str(tmp_path / 'scores.txt'))
+    assert not (tmp_path / 'scores.grs').exists()
@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+import pytest
+
+from crazy_golf_analysis import main
+from golf_analytics import compare_windows, ewma, rolling_means, running_means
+from golf_engine import score_matrix
+
+
+def _rows(seed):
+    rng = np.random.default_rng(seed)
+    rounds = {f"Player {i}": rng.integers(1, 7, n).tolist() for i, n in enumerate(rng.integers(1, 19, 30))}
+    matrix = score_matrix(rounds)[1]
+    # Gaps inside rows too: NaN holes must be skipped, not treated as the end
+    matrix[rng.random(matrix.shape) < 0.1] = np.nan
+    return matrix
+
+
+def _naive(row, window, alpha, split):
+    present = [(col, value) for col, value in enumerate(row) if not math.isnan(value)]
+    running, rolling, weighted = [math.nan] * len(row), [math.nan] * len(row), [math.nan] * len(row)
+    average = None
+    for n, (col, value) in enumerate(present, 1):
+        running[col] = sum(v for _, v in present[:n]) / n
+        average = value if average is None else average + alpha * (value - average)
+        weighted[col] = average
+    for col in range(window - 1, len(row)):
+        values = row[col - window + 1:col + 1]
+        if not any(math.isnan(value) for value in values):
+            rolling[col] = sum(values) / window
+    before = [v for col, v in present if col < split]
+    after = [v for col, v in present if col >= split]
+    first = sum(before) / len(before) if before else math.nan
+    last = sum(after) / len(after) if after else math.nan
+    return running, rolling, weighted, first, last
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('window', [1, 3, 5])
+def test_trend_kernels_match_naive_loops(seed, window):
+    matrix = _rows(seed)
+    alpha, split = 0.3, 7
+    running, rolling, weighted = running_means(matrix), rolling_means(matrix, window), ewma(matrix, alpha)
+    comparison = compare_windows(matrix, split)
+    for i, row in enumerate(matrix.tolist()):
+        expected = _naive(row, window, alpha, split)
+        assert running[i].tolist() == pytest.approx(expected[0], nan_ok=True)
+        assert rolling[i].tolist() == pytest.approx(expected[1], nan_ok=True)
+        assert weighted[i].tolist() == pytest.approx(expected[2], nan_ok=True)
+        assert comparison['first'][i] == pytest.approx(expected[3], nan_ok=True)
+        assert comparison['last'][i] == pytest.approx(expected[4], nan_ok=True)
+
+
+def test_windows_longer_than_the_course_are_all_nan():
+    assert np.isnan(rolling_means(np.ones((2, 4)), 5)).all()
+
+
+@pytest.fixture
+def scores_file(tmp_path):
+    path = tmp_path / 'scores.txt'
+    path.write_text("Ann: 2, 3, 4, 2\nBob: 3, 3, 2, 2, 4, 3\n")
+    return str(path)
+
+
+@pytest.mark.parametrize('split', ['0', '4', '6'])
+def test_split_must_leave_holes_on_both_sides(scores_file, split, capsys):
+    with pytest.raises(SystemExit):
+        main(['trends', scores_file, '--split', split])
+    assert "the shortest round has 4 holes" in capsys.readouterr().err
+
+
+def test_split_inside_every_round(scores_file, capsys):
+    main(['trends', scores_file, '--split', '3'])
+    assert "First 3 avg" in capsys.readouterr().out